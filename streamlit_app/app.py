@@ -7,6 +7,8 @@ from trans_author import AuthorRatingMapper
 import film_prediction
 import recommendations
 import start
+from rerun_timing import timed
+from profiling import profiled
 
 st.sidebar.title("📘 Projekt-Navigation")
 st.sidebar.info("📚 Buchmarkt analysieren – Empfehlungen & Filmchance inklusive.")
@@ -15,10 +17,13 @@ page = st.sidebar.radio(
     ["Startseite", "Empfehlungssystem", "Verfilmungsprognose"],
 )
 
-if page == "Startseite":
-    start.show()
-elif page == "Empfehlungssystem":
-    recommendations.show()
-elif page == "Verfilmungsprognose":
-    film_prediction.show()
+# Laufzeit eines kompletten Skriptlaufs pro Seite (siehe rerun_timing.py);
+# mit ?profile=1 in der URL wird der Lauf profiliert (siehe profiling.py)
+with profiled(f"app/{page}"), timed(f"app/{page}"):
+    if page == "Startseite":
+        start.show()
+    elif page == "Empfehlungssystem":
+        recommendations.show()
+    elif page == "Verfilmungsprognose":
+        film_prediction.show()
 
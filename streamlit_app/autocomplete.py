@@ -0,0 +1,106 @@
+# autocomplete.py
+
+import re
+import unicodedata
+from bisect import bisect_left
+import numpy as np
+
+# Search-as-you-type index for the book and author pickers. Instead of sending
+# every title to a selectbox, the pages ask this index for the 20 best matches
+# of what the user typed:
+#   1. prefix matches on the normalized value (binary search on sorted keys)
+#   2. typo-tolerant matches via shared character trigrams, if the prefix
+#      matches do not fill the result list
+
+DEFAULT_LIMIT = 20
+
+# Minimum share of the query trigrams a value must contain to count as a match
+MIN_TRIGRAM_SCORE = 0.4
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    """
+    Lowercase, without accents and punctuation, single spaces ("Émile Zola!" -> "emile zola").
+    """
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def trigrams(key):
+    """Character trigrams of a normalized key, padded at the word borders."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AutocompleteIndex:
+    """
+    Prefix and trigram index over a list of display values (titles or authors).
+    """
+
+    def __init__(self, values):
+        self.values = sorted({v for v in values if isinstance(v, str) and v.strip()})
+        keys = [normalize(v) for v in self.values]
+
+        # prefix search: keys sorted, with the position of their display value
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.sorted_keys = [keys[i] for i in order]
+        self.sorted_ids = np.asarray(order, dtype=np.int32)
+
+        # trigram search: trigram -> ids of all values containing it
+        postings = {}
+        for value_id, key in enumerate(keys):
+            for gram in trigrams(key):
+                postings.setdefault(gram, []).append(value_id)
+        self.postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.trigram_counts = np.asarray([len(trigrams(k)) for k in keys], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.values)
+
+    def _prefix_ids(self, key, limit):
+        start = bisect_left(self.sorted_keys, key)
+        stop = start
+        while stop < len(self.sorted_keys) and stop - start < limit and self.sorted_keys[stop].startswith(key):
+            stop += 1
+        return self.sorted_ids[start:stop].tolist()
+
+    def _trigram_ids(self, key, limit):
+        grams = [self.postings[g] for g in trigrams(key) if g in self.postings]
+        if not grams:
+            return []
+        n_query = len(trigrams(key))
+        shared = np.bincount(np.concatenate(grams))
+        candidates = np.flatnonzero(shared >= MIN_TRIGRAM_SCORE * n_query)
+        if len(candidates) == 0:
+            return []
+        # Rank by the share of the query found in the value plus the Jaccard similarity,
+        # so values of about the query's length win among equally good matches
+        shared = shared[candidates]
+        containment = shared / n_query
+        jaccard = shared / (n_query + self.trigram_counts[candidates] - shared)
+        order = np.argsort(-(containment + jaccard), kind="stable")
+        return candidates[order[:limit]].tolist()
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Finds the best matching values for a (partial, possibly misspelled) input.
+
+        Parameters:
+            query (str): What the user typed so far.
+            limit (int): Maximum number of results (default=20).
+
+        Returns:
+            list: Display values, prefix matches first, then fuzzy matches.
+        """
+        key = normalize(query or "")
+        if not key:
+            return self.values[:limit]
+
+        ids = self._prefix_ids(key, limit)
+        if len(ids) < limit:
+            seen = set(ids)
+            ids += [i for i in self._trigram_ids(key, limit) if i not in seen][:limit - len(ids)]
+        return [self.values[i] for i in ids]
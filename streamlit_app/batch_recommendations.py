@@ -0,0 +1,208 @@
+# batch_recommendations.py
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+from embedding_projection import to_numpy
+from neighbour_table import DEFAULT_MEMORY_MB, block_rows, blocked_top_k
+
+# Batch version of find_similar_books: recommendations for many seed books at
+# once (e.g. for feeds or e-mail digests). The seed embeddings are gathered into
+# one matrix and compared with the whole corpus in blocked matrix-matrix
+# products, the top-k is selected per row. No Streamlit needed, so the module can
+# be used from scripts and services.
+#
+# With workers > 1 the seeds are split over worker processes, each with a
+# single-threaded BLAS. The thread limit of threadpoolctl applies to the whole
+# process, so it is only set inside these workers: a batch never throttles the
+# other sessions or requests of the calling server.
+
+# Extra neighbours fetched per seed to make up for other editions of the same
+# title; seeds with more editions are searched again with a wider candidate set
+TITLE_MARGIN = 5
+
+
+def resolve_seeds(seeds, df):
+    """
+    Converts seed titles or row positions into row positions of df.
+
+    Parameters:
+        seeds (list): Book titles (str) or row positions (int). For titles with several
+            editions the first row is used.
+        df (pd.DataFrame): The complete book dataset.
+
+    Returns:
+        np.ndarray: Row positions (int64), -1 for unknown titles or invalid positions.
+    """
+    seeds = pd.Series(list(seeds), dtype=object)
+    rows = np.full(len(seeds), -1, dtype=np.int64)
+
+    is_title = seeds.map(lambda s: isinstance(s, str)).to_numpy(dtype=bool)
+    if is_title.any():
+        first_rows = pd.Series(np.arange(len(df)), index=df['title'].to_numpy())
+        first_rows = first_rows[~first_rows.index.duplicated()]
+        rows[is_title] = first_rows.reindex(seeds[is_title].to_numpy()).fillna(-1).to_numpy(dtype=np.int64)
+    if (~is_title).any():
+        positions = seeds[~is_title].to_numpy(dtype=np.int64)
+        rows[~is_title] = np.where((positions >= 0) & (positions < len(df)), positions, -1)
+    return rows
+
+
+def _top_k_rows(matrix, corpus_norms, seed_rows, k, rows_per_block):
+    return blocked_top_k(
+        matrix[seed_rows],
+        matrix,
+        k,
+        query_ids=seed_rows,
+        rows_per_block=rows_per_block,
+        corpus_norms=corpus_norms,
+    )
+
+
+# Worker state, set once per process by _init_worker
+_matrix = None
+_corpus_norms = None
+
+
+def _init_worker(matrix, corpus_norms):
+    global _matrix, _corpus_norms
+    # a stored .npy matrix is mapped by path instead of being copied to every worker
+    _matrix = np.load(matrix, mmap_mode="r") if isinstance(matrix, str) else matrix
+    _corpus_norms = corpus_norms
+    # process-wide, but this process only serves the pool
+    threadpool_limits(limits=1)
+
+
+def _worker_rows(args):
+    seed_rows, k, rows_per_block = args
+    return _top_k_rows(_matrix, _corpus_norms, seed_rows, k, rows_per_block)
+
+
+def _matrix_source(embeddings, matrix):
+    """Path of the embeddings if they are a mapped .npy file, otherwise the array itself."""
+    path = getattr(embeddings, "filename", None)
+    if path and str(path).endswith(".npy") and np.load(path, mmap_mode="r").shape == matrix.shape:
+        return str(path)
+    return matrix
+
+
+def _drop_seed_title(ids, scores, titles, seed_rows, top_n):
+    """
+    Drops other editions of the seed title (the seed row itself is already excluded)
+    and moves the remaining neighbours to the front, keeping their order.
+
+    Returns:
+        tuple: ids and scores (n_seeds x top_n, -1 / nan where missing) and the
+        number of neighbours found per seed.
+    """
+    same_title = titles[ids] == titles[seed_rows][:, None]
+    found = (~same_title).sum(axis=1)
+    order = np.argsort(same_title, axis=1, kind="stable")[:, :top_n]
+    keep = ~np.take_along_axis(same_title, order, axis=1)
+    ids = np.where(keep, np.take_along_axis(ids, order, axis=1), -1)
+    scores = np.where(keep, np.take_along_axis(scores, order, axis=1), np.nan)
+    return ids, scores, found
+
+
+def recommend_batch(
+    seeds,
+    df,
+    embeddings,
+    top_n=5,
+    workers=1,
+    memory_mb=DEFAULT_MEMORY_MB,
+    as_frame=True,
+    corpus_norms=None,
+):
+    """
+    Finds similar books for many seed books at once.
+
+    Parameters:
+        seeds (list): Book titles or row positions (see resolve_seeds).
+        df (pd.DataFrame): The complete book dataset.
+        embeddings: Computed embeddings of all book descriptions (tensor or array).
+        top_n (int): Number of similar books per seed (default=5).
+        workers (int): Number of worker processes; each one processes a share of the
+            seeds with a single-threaded BLAS (default=1: in the calling process
+            with its multi-threaded BLAS).
+        memory_mb (int): Memory limit for one similarity block per worker.
+        as_frame (bool): Return a DataFrame (default) instead of arrays.
+        corpus_norms (np.ndarray): Precomputed row norms of the embeddings (optional,
+            e.g. from embedding_store.load_or_compute_norms).
+
+    Returns:
+        pd.DataFrame: One row per recommendation with the columns seed, seed_index,
+        rank, index, title and score. Unknown seeds are left out.
+        Or, with as_frame=False, a tuple of arrays: seed row positions (n_seeds),
+        recommended row positions and scores (both n_seeds x top_n, -1 / nan where a
+        seed is unknown or has fewer results).
+    """
+    seeds = list(seeds)
+    seed_rows = resolve_seeds(seeds, df)
+    valid = seed_rows >= 0
+
+    matrix = to_numpy(embeddings)
+    if corpus_norms is None:
+        corpus_norms = np.linalg.norm(matrix, axis=1)
+    titles = df['title'].to_numpy(dtype=object)
+
+    rows = seed_rows[valid]
+    rows_per_block = block_rows(len(matrix), memory_mb)
+    max_k = len(matrix) - 1
+    top_n = min(top_n, max_k)
+
+    pool = None
+    if workers > 1 and len(rows) > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=min(workers, len(rows)),
+            initializer=_init_worker,
+            initargs=(_matrix_source(embeddings, matrix), corpus_norms),
+        )
+
+    def top_k(seed_rows, k):
+        if pool is None or len(seed_rows) < 2:
+            return _top_k_rows(matrix, corpus_norms, seed_rows, k, rows_per_block)
+        chunks = np.array_split(seed_rows, min(workers, len(seed_rows)))
+        parts = list(pool.map(_worker_rows, [(chunk, k, rows_per_block) for chunk in chunks]))
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    ids = np.full((len(rows), top_n), -1, dtype=np.int32)
+    scores = np.full((len(rows), top_n), np.nan, dtype=np.float32)
+    pending = np.arange(len(rows))
+    k = min(top_n + TITLE_MARGIN, max_k)
+    try:
+        # widen the candidate set for seeds whose editions fill it, until top_n
+        # other books are found (or the whole catalogue was searched)
+        while len(pending):
+            found_ids, found_scores = top_k(rows[pending], k)
+            found_ids, found_scores, found = _drop_seed_title(
+                found_ids, found_scores, titles, rows[pending], top_n
+            )
+            ids[pending] = found_ids
+            scores[pending] = found_scores
+            if k >= max_k:
+                break
+            pending = pending[found < top_n]
+            k = min(k * 2, max_k)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    all_ids = np.full((len(seeds), top_n), -1, dtype=np.int32)
+    all_scores = np.full((len(seeds), top_n), np.nan, dtype=np.float32)
+    all_ids[valid] = ids
+    all_scores[valid] = scores
+    if not as_frame:
+        return seed_rows, all_ids, all_scores
+
+    seed_pos, rank = np.nonzero(all_ids >= 0)
+    result_ids = all_ids[seed_pos, rank]
+    return pd.DataFrame({
+        "seed": np.asarray(seeds, dtype=object)[seed_pos],
+        "seed_index": seed_rows[seed_pos],
+        "rank": rank + 1,
+        "index": result_ids,
+        "title": titles[result_ids],
+        "score": all_scores[seed_pos, rank],
+    })
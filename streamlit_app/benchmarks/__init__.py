@@ -0,0 +1,2 @@
+# Benchmarks for the book market app.
+# Run from the streamlit_app directory, e.g. "python -m benchmarks.bench_projection".
@@ -0,0 +1,70 @@
+# bench_batch.py
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+
+from batch_recommendations import recommend_batch
+from benchmarks.bench_projection import synthetic_embeddings
+
+# Throughput of the batch recommendation API in seeds per second, for a growing
+# number of worker processes, compared with one call per seed.
+#
+#   python -m benchmarks.bench_batch --n-books 100000 --seeds 5000 --workers 1 2 4 8
+
+
+def single_seed_baseline(matrix, seed_rows, top_n):
+    """One ranking per seed, like repeated find_similar_books calls (seeds per second)."""
+    start = time.perf_counter()
+    for row in seed_rows:
+        scores = matrix @ matrix[row]
+        scores[row] = -np.inf
+        top = np.argpartition(-scores, top_n)[:top_n]
+        top[np.argsort(-scores[top])]
+    return len(seed_rows) / (time.perf_counter() - start)
+
+
+def run(matrix, n_seeds, top_n, worker_counts, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"title": [f"Buch {i}" for i in range(len(matrix))]})
+    seed_rows = rng.choice(len(matrix), size=min(n_seeds, len(matrix)), replace=False)
+
+    baseline_rows = seed_rows[: min(len(seed_rows), 500)]
+    results = [{"mode": "einzeln", "workers": 1,
+                "seeds_per_s": single_seed_baseline(matrix, baseline_rows, top_n)}]
+    for workers in worker_counts:
+        start = time.perf_counter()
+        recommend_batch(seed_rows, df, matrix, top_n=top_n, workers=workers, as_frame=False)
+        elapsed = time.perf_counter() - start
+        results.append({"mode": "batch", "workers": workers, "seeds_per_s": len(seed_rows) / elapsed})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the batch recommendation API")
+    parser.add_argument("--n-books", type=int, default=50_000)
+    parser.add_argument("--seeds", type=int, default=2_000)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    matrix = synthetic_embeddings(args.n_books)
+    results = run(matrix, args.seeds, args.top_n, args.workers)
+
+    print(f"{len(matrix)} Bücher, {args.seeds} Seeds, top-{args.top_n}")
+    print(f"{'Modus':<10}{'Worker':>8}{'Seeds/s':>12}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['workers']:>8}{r['seeds_per_s']:>12.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# bench_embedding_cache.py
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import streamlit as st
+from streamlit import logger as streamlit_logger
+
+from embedding_store import content_fingerprint, load_or_compute_embeddings
+from encoder_backends import encoder_dir
+
+# Per-rerun overhead of the embedding cache, before and after keying it by a
+# precomputed fingerprint, timed on the real Streamlit caches (outside a server run
+# they keep their entries in memory just the same):
+#   vorher   compute_embeddings as it was on the page, st.cache_data over
+#            (_model, descriptions): every rerun hashes the whole description list
+#            and unpickles a copy of the matrix
+#   nachher  embedding_cache.load_embeddings, st.cache_resource keyed by the
+#            fingerprint: every rerun hashes one short string and returns the shared
+#            mapped matrix
+# The random matrix is stored once in a temporary data directory and returned by a
+# stand-in model, so nothing is encoded; the one-off fingerprint is reported too.
+# "nachher" needs torch (the loader returns a tensor) and is skipped without it.
+#
+#   python -m benchmarks.bench_embedding_cache --sizes 10000 100000 1000000 --dim 768
+
+
+def synthetic_descriptions(n_books, chars=400, seed=0):
+    """n_books different texts of about `chars` characters."""
+    rng = np.random.default_rng(seed)
+    words = np.array(["magic", "dragon", "love", "war", "city", "secret", "family", "journey",
+                      "detective", "school", "ocean", "kingdom", "murder", "future", "friend"])
+    base = " ".join(rng.choice(words, size=chars // 6))
+    return [f"{i} {base}" for i in range(n_books)]
+
+
+@st.cache_data
+def compute_embeddings(_model, descriptions):
+    """compute_embeddings of the recommendation page before the fingerprint cache."""
+    return _model.encode(descriptions, convert_to_tensor=True)
+
+
+class StoredModel:
+    """Stands in for the SentenceTransformer: encode returns a precomputed matrix."""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def encode(self, texts, convert_to_tensor=False, **kwargs):
+        if convert_to_tensor:
+            try:
+                import torch
+                return torch.from_numpy(self.matrix)
+            except ImportError:
+                pass
+        return self.matrix
+
+
+def import_load_embeddings():
+    """The cached loader of the page, or the reason why it cannot be imported."""
+    try:
+        from embedding_cache import load_embeddings
+        return load_embeddings, None
+    except ImportError as e:
+        return None, str(e)
+
+
+def timed(func, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def run(sizes, dim, repeats, chars):
+    load_embeddings, reason = import_load_embeddings()
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        # load_embeddings stores and maps the matrix under data/ of the working directory
+        os.chdir(scratch)
+        try:
+            for n_books in sizes:
+                descriptions = synthetic_descriptions(n_books, chars)
+                matrix = np.random.default_rng(0).standard_normal((n_books, dim), dtype=np.float32)
+                model = StoredModel(matrix)
+
+                compute_embeddings(model, descriptions)
+                before = timed(lambda: compute_embeddings(model, descriptions), repeats)
+                compute_embeddings.clear()
+
+                start = time.perf_counter()
+                fingerprint = content_fingerprint(descriptions)
+                fingerprint_s = time.perf_counter() - start
+                after = None
+                if load_embeddings is not None:
+                    load_or_compute_embeddings(descriptions, model.encode, fingerprint, encoder_dir())
+                    load_embeddings(fingerprint, model, descriptions)
+                    after = timed(lambda: load_embeddings(fingerprint, model, descriptions), repeats)
+                    load_embeddings.clear()
+
+                results.append({
+                    "n_books": n_books,
+                    "dim": dim,
+                    "before_ms": before * 1000,
+                    "after_ms": after * 1000 if after is not None else None,
+                    "fingerprint_once_ms": fingerprint_s * 1000,
+                })
+        finally:
+            os.chdir(cwd)
+    return results, reason
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-rerun overhead of the embedding cache")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--chars", type=int, default=400, help="Length of a description")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    # outside a server run every cached call warns about the missing script context
+    streamlit_logger.set_log_level("error")
+    results, reason = run(args.sizes, args.dim, args.repeats, args.chars)
+
+    print(f"Overhead pro Rerun (Median aus {args.repeats}), Embeddings mit {args.dim} Dimensionen")
+    print(f"{'Bücher':>10}{'vorher ms':>14}{'nachher ms':>14}{'Fingerprint einmalig ms':>26}")
+    for r in results:
+        after = f"{r['after_ms']:>14.4f}" if r["after_ms"] is not None else f"{'–':>14}"
+        print(f"{r['n_books']:>10}{r['before_ms']:>14.1f}{after}{r['fingerprint_once_ms']:>26.1f}")
+    if reason:
+        print(f"⚠️ nachher übersprungen: {reason}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# bench_encoder.py
+
+import argparse
+import json
+import threading
+import time
+import numpy as np
+
+from encoder_service import EncoderService
+
+# Encode throughput with many concurrent callers, each encoding single queries:
+#   direkt   every caller runs its own forward pass of batch size 1 (model.encode)
+#   service  all callers go through one EncoderService (micro-batches)
+# Without --model a stand-in is used: the feed-forward block of MPNet (two dense
+# layers) in numpy over 32 token vectors per text, mean pooled.
+#
+#   python -m benchmarks.bench_encoder --callers 1 4 16 --queries 50
+#   python -m benchmarks.bench_encoder --model all-mpnet-base-v2 --callers 1 8
+
+
+class StandInModel:
+    """Two dense layers (dim -> hidden -> dim) over `tokens` token vectors per text, mean pooled."""
+
+    def __init__(self, dim=768, hidden=3072, tokens=32, seed=0):
+        rng = np.random.default_rng(seed)
+        self.w1 = rng.normal(scale=dim ** -0.5, size=(dim, hidden)).astype(np.float32)
+        self.w2 = rng.normal(scale=hidden ** -0.5, size=(hidden, dim)).astype(np.float32)
+        self.dim = dim
+        self.tokens = tokens
+
+    def encode(self, texts, **kwargs):
+        x = np.concatenate([
+            np.random.default_rng(abs(hash(text)) % 2**32).normal(size=(self.tokens, self.dim)).astype(np.float32)
+            for text in texts
+        ])
+        hidden = np.maximum(x @ self.w1, 0) @ self.w2
+        return hidden.reshape(len(texts), self.tokens, self.dim).mean(axis=1)
+
+
+def load_model(name):
+    if name is None:
+        return StandInModel()
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(name)
+
+
+def run_callers(callers, queries, encode_one):
+    """Runs `callers` threads with `queries` single-text calls each; texts per second and p95 latency."""
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(callers + 1)
+
+    def caller(i):
+        barrier.wait()
+        own = []
+        for q in range(queries):
+            start = time.perf_counter()
+            encode_one(f"query {i} {q} about dragons and magic schools")
+            own.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    return callers * queries / wall, float(np.percentile(latencies, 95))
+
+
+def run(model, callers_list, queries, max_batch, max_wait_ms):
+    def direct(text):
+        return model.encode([text], convert_to_numpy=True, show_progress_bar=False)[0]
+
+    service = EncoderService(
+        lambda texts: model.encode(texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False),
+        max_batch=max_batch,
+        max_wait_ms=max_wait_ms,
+    )
+    # warm-up (first forward pass, BLAS threads)
+    direct("warm up")
+    service.encode("warm up")
+
+    results = []
+    for callers in callers_list:
+        direct_rate, direct_p95 = run_callers(callers, queries, direct)
+        before = service.stats()
+        service_rate, service_p95 = run_callers(callers, queries, service.encode)
+        after = service.stats()
+        batches = after["batches"] - before["batches"]
+        results.append({
+            "callers": callers,
+            "direct_per_s": direct_rate,
+            "direct_p95_ms": direct_p95,
+            "service_per_s": service_rate,
+            "service_p95_ms": service_p95,
+            "mean_batch": (after["texts"] - before["texts"]) / batches if batches else 0.0,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode throughput: direct calls vs. micro-batching service")
+    parser.add_argument("--model", help="SentenceTransformer name (default: numpy stand-in)")
+    parser.add_argument("--callers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--queries", type=int, default=50, help="Single-text calls per caller")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, help="torch threads (only with --model)")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.model and args.threads:
+        from encoder_service import configure_torch_threads
+
+        configure_torch_threads(args.threads)
+    model = load_model(args.model)
+    results = run(model, args.callers, args.queries, args.max_batch, args.max_wait_ms)
+
+    print(f"Modell: {args.model or 'Stand-in (numpy)'}, {args.queries} Texte pro Aufrufer, "
+          f"Batch <= {args.max_batch}, Wartezeit <= {args.max_wait_ms} ms")
+    print(f"{'Aufrufer':>9}{'direkt/s':>11}{'p95 ms':>9}{'Service/s':>11}{'p95 ms':>9}{'Ø Batch':>9}")
+    for r in results:
+        print(f"{r['callers']:>9}{r['direct_per_s']:>11.0f}{r['direct_p95_ms']:>9.1f}"
+              f"{r['service_per_s']:>11.0f}{r['service_p95_ms']:>9.1f}{r['mean_batch']:>9.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
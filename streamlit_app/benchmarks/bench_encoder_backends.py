@@ -0,0 +1,143 @@
+# bench_encoder_backends.py
+
+import argparse
+import json
+import time
+import numpy as np
+
+from encoder_backends import BACKENDS, ENCODER, load_sentence_encoder
+from encoder_service import TORCH_THREADS, configure_torch_threads
+from schema import BOOKS_CSV, read_books
+
+# CPU variants of the description encoder (encoder_backends.py) on a sample of
+# the catalogue, each compared with the float model:
+#   Korpus     descriptions per second when encoding in batches (embedding store,
+#              neighbour_table.py)
+#   Anfrage    latency of a single short text (search query of one session)
+#   Cos        cosine similarity between the embedding of a variant and the float
+#              embedding of the same description: mean, 1st percentile and minimum
+#   Top-k      mean overlap of the k most similar books of a description, ranked
+#              with the variant's embeddings vs. the float embeddings
+# A variant whose runtime is missing (e.g. onnx without optimum[onnxruntime]) is
+# reported and skipped.
+#
+#   python -m benchmarks.bench_encoder_backends --sample 2000 --threads 4
+#   python -m benchmarks.bench_encoder_backends --backends float int8 --queries 200
+
+
+def sample_texts(books_csv, sample, queries, seed=0):
+    """Random descriptions of the catalogue and short query texts (the first words of other descriptions)."""
+    books, _ = read_books(books_csv)
+    descriptions = books["description"].fillna("").astype(str)
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(descriptions), size=min(sample, len(descriptions)), replace=False)
+    corpus = descriptions.iloc[rows].tolist()
+    query_rows = rng.choice(len(descriptions), size=queries)
+    query_texts = [" ".join(descriptions.iloc[row].split()[:6]) or "book" for row in query_rows]
+    return corpus, query_texts
+
+
+def unit_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def top_k_overlap(reference, variant, k, n_rows=200):
+    """Mean share of the top-k neighbours (by cosine) the variant has in common with the reference."""
+    rows = np.arange(min(n_rows, len(reference)))
+
+    def neighbours(embeddings):
+        scores = embeddings[rows] @ embeddings.T
+        scores[rows, rows] = -np.inf
+        return np.argpartition(-scores, k, axis=1)[:, :k]
+
+    pairs = zip(neighbours(reference), neighbours(variant))
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in pairs]))
+
+
+def measure(backend, corpus, query_texts, batch_size, encoder=ENCODER):
+    start = time.perf_counter()
+    model = load_sentence_encoder(encoder, backend)
+    load_s = time.perf_counter() - start
+
+    model.encode(corpus[:batch_size], batch_size=batch_size)  # warm-up
+    start = time.perf_counter()
+    embeddings = model.encode(corpus, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    corpus_s = time.perf_counter() - start
+
+    latencies = []
+    for text in query_texts:
+        start = time.perf_counter()
+        model.encode(text, convert_to_numpy=True, show_progress_bar=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "corpus_per_s": len(corpus) / corpus_s,
+        "query_p50_ms": float(np.percentile(latencies, 50)),
+        "query_p95_ms": float(np.percentile(latencies, 95)),
+    }, unit_rows(embeddings)
+
+
+def run(backends, corpus, query_texts, batch_size, k):
+    """Measures every variant; the float model is always measured first as the reference."""
+    results, skipped = [], {}
+    reference = None
+    for backend in ["float"] + [b for b in backends if b != "float"]:
+        try:
+            result, embeddings = measure(backend, corpus, query_texts, batch_size)
+        except (ImportError, OSError, RuntimeError) as e:
+            if backend == "float":
+                raise
+            skipped[backend] = f"{type(e).__name__}: {e}"
+            continue
+        if reference is None:
+            reference = result, embeddings
+        base, base_embeddings = reference
+        cosines = np.einsum("ij,ij->i", embeddings, base_embeddings)
+        result.update(
+            corpus_speedup=result["corpus_per_s"] / base["corpus_per_s"],
+            query_speedup=base["query_p50_ms"] / result["query_p50_ms"],
+            cos_mean=float(cosines.mean()),
+            cos_p1=float(np.percentile(cosines, 1)),
+            cos_min=float(cosines.min()),
+            top_k_overlap=top_k_overlap(base_embeddings, embeddings, k),
+        )
+        results.append(result)
+    return results, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speed and cosine drift of the CPU encoder variants vs. the float model")
+    parser.add_argument("--books", default=BOOKS_CSV, help="Catalogue CSV")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--sample", type=int, default=1000, help="Descriptions to encode")
+    parser.add_argument("--queries", type=int, default=100, help="Single short texts for the latency")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10, help="Neighbours for the top-k overlap")
+    parser.add_argument("--threads", type=int, help="torch threads (default: BOOK_MARKET_TORCH_THREADS)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    configure_torch_threads(args.threads or TORCH_THREADS)
+    corpus, query_texts = sample_texts(args.books, args.sample, args.queries, args.seed)
+    results, skipped = run(args.backends, corpus, query_texts, args.batch_size, args.k)
+
+    print(f"{len(corpus)} Beschreibungen, {len(query_texts)} Anfragen, Batch {args.batch_size}")
+    print(f"{'Variante':<11}{'Laden s':>9}{'Korpus/s':>10}{'Speedup':>9}{'Anfrage ms':>12}{'Speedup':>9}"
+          f"{'Cos Ø':>8}{'Cos p1':>8}{'Cos min':>9}{f'Top-{args.k}':>8}")
+    for r in results:
+        print(f"{r['backend']:<11}{r['load_s']:>9.1f}{r['corpus_per_s']:>10.1f}{r['corpus_speedup']:>8.2f}x"
+              f"{r['query_p50_ms']:>12.1f}{r['query_speedup']:>8.2f}x"
+              f"{r['cos_mean']:>8.4f}{r['cos_p1']:>8.4f}{r['cos_min']:>9.4f}{r['top_k_overlap']:>8.1%}")
+    for backend, reason in skipped.items():
+        print(f"⚠️ {backend} übersprungen: {reason}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "skipped": skipped}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
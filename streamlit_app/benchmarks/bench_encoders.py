@@ -0,0 +1,110 @@
+# bench_encoders.py
+
+import argparse
+import json
+import time
+import numpy as np
+
+from benchmarks.bench_encoder_backends import measure, sample_texts, top_k_overlap
+from embedding_store import cosine_scores
+from encoder_backends import BACKENDS, ENCODER_BACKEND, ENCODERS, model_name
+from encoder_service import TORCH_THREADS, configure_torch_threads
+from schema import BOOKS_CSV, read_books
+
+# Registered description encoders (encoder_backends.ENCODERS) on a sample of the
+# catalogue, to pick a cost/quality point per deployment:
+#   Korpus     descriptions per second when encoding in batches
+#   Index      size of the stored embeddings and norms for the whole catalogue
+#   Encode     latency of a single short text (search query of one session)
+#   Suche      latency of one cosine ranking over a matrix of the catalogue's size
+#              in the encoder's dimension (embedding_store.cosine_scores)
+#   Top-k      mean overlap of the k most similar books of a description with the
+#              neighbours of the reference encoder (the first one, mpnet by default)
+# An encoder that cannot be loaded (e.g. no network for the download) is reported
+# and skipped.
+#
+#   python -m benchmarks.bench_encoders --sample 2000 --threads 4
+#   python -m benchmarks.bench_encoders --encoders mpnet minilm-l6 --backend int8
+
+
+def search_latency(n_books, dim, queries, top_n=50, seed=0):
+    """Median milliseconds of one cosine ranking (top_n) over an n_books x dim matrix."""
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((n_books, dim), dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1)
+    latencies = []
+    for row in rng.integers(n_books, size=queries):
+        start = time.perf_counter()
+        scores = cosine_scores(embeddings[row], embeddings, norms)
+        np.argpartition(-scores, min(top_n, n_books - 1))[:top_n]
+        latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.median(latencies))
+
+
+def run(encoders, backend, corpus, query_texts, n_books, batch_size, k):
+    """Measures every encoder; the first one that loads is the reference of the overlap."""
+    results, skipped = [], {}
+    reference = None
+    for encoder in encoders:
+        try:
+            result, embeddings = measure(backend, corpus, query_texts, batch_size, encoder=encoder)
+        except (ImportError, OSError, RuntimeError) as e:
+            skipped[encoder] = f"{type(e).__name__}: {e}"
+            continue
+        if reference is None:
+            reference = encoder, embeddings
+        dim = embeddings.shape[1]
+        result.update(
+            encoder=encoder,
+            model=model_name(encoder),
+            dim=dim,
+            index_bytes=n_books * (dim + 1) * 4,
+            search_ms=search_latency(n_books, dim, min(len(query_texts), 50)),
+            reference=reference[0],
+            top_k_overlap=top_k_overlap(reference[1], embeddings, k),
+        )
+        results.append(result)
+    return results, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput, index size, latency and neighbour overlap per encoder")
+    parser.add_argument("--books", default=BOOKS_CSV, help="Catalogue CSV")
+    parser.add_argument("--encoders", nargs="+", choices=list(ENCODERS), default=list(ENCODERS),
+                        help="Encoders to compare, the first one is the reference")
+    parser.add_argument("--backend", choices=BACKENDS, default=ENCODER_BACKEND, help="CPU variant of all encoders")
+    parser.add_argument("--sample", type=int, default=1000, help="Descriptions to encode")
+    parser.add_argument("--queries", type=int, default=100, help="Single short texts for the latency")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10, help="Neighbours for the top-k overlap")
+    parser.add_argument("--threads", type=int, help="torch threads (default: BOOK_MARKET_TORCH_THREADS)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    configure_torch_threads(args.threads or TORCH_THREADS)
+    n_books = len(read_books(args.books)[0])
+    corpus, query_texts = sample_texts(args.books, args.sample, args.queries, args.seed)
+    results, skipped = run(args.encoders, args.backend, corpus, query_texts, n_books, args.batch_size, args.k)
+
+    mb = 2 ** 20
+    print(f"{len(corpus)} Beschreibungen, {len(query_texts)} Anfragen, Katalog {n_books} Bücher, "
+          f"Variante {args.backend}")
+    print(f"{'Encoder':<21}{'Dim':>5}{'Laden s':>9}{'Korpus/s':>10}{'Index MB':>10}"
+          f"{'Encode ms':>11}{'Suche ms':>10}{f'Top-{args.k}':>8}")
+    for r in results:
+        print(f"{r['encoder']:<21}{r['dim']:>5}{r['load_s']:>9.1f}{r['corpus_per_s']:>10.1f}"
+              f"{r['index_bytes'] / mb:>10.1f}{r['query_p50_ms']:>11.1f}{r['search_ms']:>10.2f}"
+              f"{r['top_k_overlap']:>8.1%}")
+    if results:
+        print(f"Top-{args.k}: Überlappung mit den Nachbarn von {results[0]['reference']}")
+    for encoder, reason in skipped.items():
+        print(f"⚠️ {encoder} übersprungen: {reason}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "skipped": skipped}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# bench_metrics.py
+
+import argparse
+import json
+import timeit
+
+import metrics
+
+# Overhead of the instrumentation per call, switched off and on, compared with the
+# bare function:
+#   @instrumented   off: the function itself, on: one timer around each call
+#   stage()         off: a shared null context, on: one timer around the block
+#
+#   python -m benchmarks.bench_metrics --calls 1000000
+
+
+def work(x):
+    return x + 1
+
+
+def run(calls):
+    results = {"bare_ns": timeit.timeit(lambda: work(1), number=calls) / calls * 1e9}
+    for enabled in (False, True):
+        metrics.ENABLED = enabled
+        metrics.REGISTRY.reset()
+        decorated = metrics.instrumented("bench")(work)
+
+        def block():
+            with metrics.stage("bench"):
+                work(1)
+
+        state = "on" if enabled else "off"
+        results[f"decorator_{state}_ns"] = timeit.timeit(lambda: decorated(1), number=calls) / calls * 1e9
+        results[f"stage_{state}_ns"] = timeit.timeit(block, number=calls) / calls * 1e9
+    metrics.REGISTRY.reset()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead of the metrics instrumentation")
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    enabled = metrics.ENABLED
+    results = run(args.calls)
+    metrics.ENABLED = enabled
+
+    print(f"Overhead pro Aufruf ({args.calls} Aufrufe), ohne Messung: {results['bare_ns']:.0f} ns")
+    print(f"{'':<14}{'aus ns':>10}{'an ns':>10}")
+    for kind in ("decorator", "stage"):
+        print(f"{kind:<14}{results[f'{kind}_off_ns'] - results['bare_ns']:>10.0f}"
+              f"{results[f'{kind}_on_ns'] - results['bare_ns']:>10.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
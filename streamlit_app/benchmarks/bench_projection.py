@@ -0,0 +1,115 @@
+# bench_projection.py
+
+import argparse
+import json
+import time
+import numpy as np
+
+from embedding_projection import (
+    BENCHMARK_DIMS,
+    candidate_count,
+    fit_projection,
+    normalize_rows,
+)
+
+# Benchmark for the reduced-dimension first stage of find_similar_books.
+# For every target dimension it reports the fit time, the query latency and the
+# overlap of the top-k neighbours with the exact search on the full embeddings.
+#
+#   python -m benchmarks.bench_projection --n-books 100000
+#   python -m benchmarks.bench_projection --embeddings data/embeddings.npy --method umap
+
+
+def synthetic_embeddings(n_books, dim=768, n_topics=50, seed=42):
+    """
+    Creates random embeddings with topic structure (clusters), similar to real
+    sentence embeddings of book descriptions.
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(n_topics, dim)).astype(np.float32)
+    assignment = rng.integers(0, n_topics, size=n_books)
+    noise = rng.normal(scale=0.8, size=(n_books, dim)).astype(np.float32)
+    return normalize_rows(topics[assignment] + noise)
+
+
+def exact_top_k(matrix, query_ids, k):
+    """Exact top-k neighbours (without the query itself) and the mean latency in ms."""
+    neighbours = []
+    start = time.perf_counter()
+    for idx in query_ids:
+        scores = matrix @ matrix[idx]
+        scores[idx] = -np.inf
+        top = np.argpartition(-scores, k)[:k]
+        neighbours.append(set(top[np.argsort(-scores[top])].tolist()))
+    latency = (time.perf_counter() - start) * 1000 / len(query_ids)
+    return neighbours, latency
+
+
+def projected_top_k(projection, matrix, query_ids, k):
+    """Two-stage top-k neighbours (reduced space, then full re-ranking) and the mean latency in ms."""
+    neighbours = []
+    start = time.perf_counter()
+    for idx in query_ids:
+        candidates = projection.search(matrix[idx], candidate_count(k))
+        candidates = candidates[candidates != idx]
+        scores = matrix[candidates] @ matrix[idx]
+        neighbours.append(set(candidates[np.argsort(-scores)[:k]].tolist()))
+    latency = (time.perf_counter() - start) * 1000 / len(query_ids)
+    return neighbours, latency
+
+
+def run(matrix, dims, method, n_queries, top_n, seed=0):
+    """
+    Runs the benchmark for all target dimensions.
+
+    Returns:
+        list: One result dict per dimension (plus the exact baseline).
+    """
+    rng = np.random.default_rng(seed)
+    query_ids = rng.choice(len(matrix), size=min(n_queries, len(matrix)), replace=False)
+    exact, exact_latency = exact_top_k(matrix, query_ids, top_n)
+
+    results = [{"method": "exact", "dim": matrix.shape[1], "fit_s": 0.0,
+                "latency_ms": exact_latency, "overlap": 1.0}]
+    for dim in dims:
+        start = time.perf_counter()
+        projection = fit_projection(matrix, n_components=dim, method=method)
+        fit_seconds = time.perf_counter() - start
+
+        approx, latency = projected_top_k(projection, matrix, query_ids, top_n)
+        overlap = np.mean([len(a & e) / top_n for a, e in zip(approx, exact)])
+        results.append({"method": method, "dim": dim, "fit_s": fit_seconds,
+                        "latency_ms": latency, "overlap": float(overlap)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the embedding projections")
+    parser.add_argument("--embeddings", help=".npy file with embeddings (default: synthetic)")
+    parser.add_argument("--n-books", type=int, default=10_000)
+    parser.add_argument("--dims", type=int, nargs="+", default=list(BENCHMARK_DIMS))
+    parser.add_argument("--method", default="pca", choices=["pca", "umap"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        matrix = normalize_rows(np.load(args.embeddings))
+    else:
+        matrix = synthetic_embeddings(args.n_books)
+
+    results = run(matrix, args.dims, args.method, args.queries, args.top_n)
+
+    print(f"{len(matrix)} Bücher, top-{args.top_n}, {args.queries} Abfragen")
+    print(f"{'Methode':<8}{'Dim':>6}{'Fit [s]':>10}{'Latenz [ms]':>14}{'Overlap':>10}")
+    for r in results:
+        print(f"{r['method']:<8}{r['dim']:>6}{r['fit_s']:>10.2f}{r['latency_ms']:>14.3f}{r['overlap']:>10.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
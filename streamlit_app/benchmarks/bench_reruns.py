@@ -0,0 +1,149 @@
+# bench_reruns.py
+
+import argparse
+import json
+import os
+import tempfile
+import numpy as np
+
+import rerun_timing
+
+# Rerun latency per widget of the app, before and after splitting the pages into
+# fragments:
+#   vorher   every widget change reran the whole script (scope "app/<page>")
+#   nachher  a widget inside a fragment only reruns that fragment (its scope);
+#            widgets outside a fragment still rerun the whole script
+# AppTest always executes the whole script, so every interaction is one full run
+# in which rerun_timing logs both durations (the fragment runs inside the script).
+# Needs the data files and models of the pages (run from streamlit_app/).
+#
+#   python -m benchmarks.bench_reruns --repeats 5 --json reruns.json
+
+APP_SCRIPT = "app.py"
+
+
+def _select_page(at, page):
+    at.sidebar.radio[0].set_value(page).run()
+
+
+def _select_option(at, option):
+    at.radio(key="empfehlung_option_radio_main").set_value(option).run()
+
+
+def _click(at, label):
+    next(button for button in at.button if button.label == label).click().run()
+
+
+def prepare_film(at):
+    _select_page(at, "Verfilmungsprognose")
+
+
+def prepare_filter_mode(at):
+    _select_page(at, "Empfehlungssystem")
+    _select_option(at, "Finde Bücher nach Genre, Bewertung und mehr")
+    _click(at, "Bücher finden")
+
+
+def prepare_similar(at):
+    _select_page(at, "Empfehlungssystem")
+    _select_option(at, "Finde ähnliche Bücher zu deinem Favoriten")
+    titles = at.selectbox(key="book_selectbox")
+    titles.set_value(titles.options[0]).run()
+    _click(at, "Ähnliche Bücher finden")
+
+
+def prepare_search(at):
+    _select_page(at, "Empfehlungssystem")
+    _select_option(at, "Suche nach Themen und Stichwörtern")
+    at.text_input(key="keyword_query").set_value("magic school").run()
+
+
+def set_rating(at, i):
+    at.slider(key="min_avg_rating").set_value([3.5, 4.0][i % 2])
+
+
+def set_genres(at, i):
+    genres = at.multiselect(key="filter_genres")
+    genres.set_value(genres.options[:1] if i % 2 == 0 else [])
+
+
+def set_years(at, i):
+    at.slider(key="filter_years").set_value([(1950, 2000), (1811, 2018)][i % 2])
+
+
+def set_threshold(at, i):
+    at.slider(key="threshold_slider").set_value([0.3, 0.7][i % 2])
+
+
+def set_film_author(at, i):
+    at.sidebar.text_input[0].set_value(["a", "b"][i % 2])
+
+
+# (widget, preparation, change, fragment of the widget or None)
+INTERACTIONS = [
+    ("Threshold (Verfilmung)", prepare_film, set_threshold, "film/threshold_panel"),
+    ("Autor-Suche (Verfilmung)", prepare_film, set_film_author, None),
+    ("Mindestbewertung (Filter)", prepare_filter_mode, set_rating, "recommendations/filter_results"),
+    ("Genres (Filter)", prepare_filter_mode, set_genres, "recommendations/filter_results"),
+    ("Jahre (Filter)", prepare_filter_mode, set_years, "recommendations/filter_results"),
+    ("Mindestbewertung (ähnliche Bücher)", prepare_similar, set_rating, "recommendations/similar_books"),
+    ("Mindestbewertung (Stichwortsuche)", prepare_search, set_rating, "recommendations/search_results"),
+]
+
+
+def measure(name, prepare, change, fragment, repeats, timeout):
+    """Median durations of the whole script and of the widget's fragment (ms)."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_SCRIPT, default_timeout=timeout).run()
+    if at.exception:
+        raise RuntimeError(f"{APP_SCRIPT}: {at.exception[0].message}")
+    prepare(at)
+    # one warm-up run fills the caches of the page
+    change(at, 1)
+    at.run()
+
+    full, partial = [], []
+    for i in range(repeats):
+        seen = len(rerun_timing.read_log())
+        change(at, i)
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].message}")
+        records = rerun_timing.read_log()[seen:]
+        full.append(next(r["ms"] for r in records if r["scope"].startswith("app/")))
+        if fragment is not None:
+            partial.append(next(r["ms"] for r in records if r["scope"] == fragment))
+    full_ms = float(np.median(full))
+    return {
+        "widget": name,
+        "fragment": fragment,
+        "before_ms": full_ms,
+        "after_ms": float(np.median(partial)) if partial else full_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rerun latency per widget (whole script vs. fragment)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds per script run")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rerun_timing.LOG_PATH = os.path.join(tmp, "reruns.jsonl")
+        results = [measure(name, prepare, change, fragment, args.repeats, args.timeout)
+                   for name, prepare, change, fragment in INTERACTIONS]
+
+    print(f"Rerun-Latenz pro Widget (Median aus {args.repeats})")
+    print(f"{'Widget':<38}{'vorher ms':>12}{'nachher ms':>12}  Fragment")
+    for r in results:
+        print(f"{r['widget']:<38}{r['before_ms']:>12.1f}{r['after_ms']:>12.1f}  {r['fragment'] or '-'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
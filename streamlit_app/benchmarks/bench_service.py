@@ -0,0 +1,201 @@
+# bench_service.py
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from benchmarks.load_test import percentiles
+from service_client import ServiceClient, ServiceError, to_records
+
+# Load client of book_service.py: N client threads send a mix of requests to the
+# service for a fixed time, each over its own kept-alive connection (or with
+# --no-keep-alive one connection per request). Without --url the service is
+# started locally (python book_service.py --port 0 --workers W) and stopped again.
+#
+#   similar        /recommend, similar books of a random book
+#   similar_filter /recommend with rating and year filters
+#   filter         /recommend without title (best books for the filters)
+#   batch          /recommend/batch with BATCH_SIZE random books
+#   predict        /predict, one new book
+#   predict_batch  /predict/batch with BATCH_SIZE new books
+#
+#   python -m benchmarks.bench_service --workers 4 --clients 16 --duration 20
+#   python -m benchmarks.bench_service --url http://127.0.0.1:8765 --clients 8
+
+MIX = {
+    "similar": 4,
+    "similar_filter": 2,
+    "filter": 2,
+    "batch": 1,
+    "predict": 3,
+    "predict_batch": 1,
+}
+BATCH_SIZE = 16
+NEW_BOOKS_CSV = "data/new_books_2024.csv"
+SERVICE_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "book_service.py")
+
+
+def make_requests(n_books, records, health):
+    """Request functions per kind: client, rng -> answer."""
+    similar = health["similar_books"]
+    predict = health["model_version"] is not None and bool(records)
+
+    def seed(rng):
+        return int(rng.integers(n_books))
+
+    kinds = {
+        "filter": lambda client, rng: client.recommend(
+            top_n=10, min_rating=float(rng.choice([3.0, 3.5, 4.0])), years=[1950, 2018]
+        ),
+    }
+    if similar:
+        kinds["similar"] = lambda client, rng: client.recommend(index=seed(rng), top_n=5)
+        kinds["similar_filter"] = lambda client, rng: client.recommend(
+            index=seed(rng), top_n=5, min_rating=3.5, years=[1980, 2018]
+        )
+        kinds["batch"] = lambda client, rng: client.recommend_batch(
+            [{"index": seed(rng), "top_n": 5} for _ in range(BATCH_SIZE)]
+        )
+    if predict:
+        kinds["predict"] = lambda client, rng: client.predict(records[int(rng.integers(len(records)))])
+        kinds["predict_batch"] = lambda client, rng: client.predict_batch(
+            [records[i] for i in rng.integers(len(records), size=BATCH_SIZE)]
+        )
+    return kinds
+
+
+def run_clients(url, kinds, clients, duration, keep_alive=True, seed=0):
+    """
+    Runs the client threads for `duration` seconds.
+
+    Returns:
+        dict: Per kind and "gesamt": count and p50/p95/p99 in ms; plus errors and
+        requests per second.
+    """
+    names = list(kinds)
+    weights = np.array([MIX[name] for name in names], dtype=float)
+    weights /= weights.sum()
+    latencies = {name: [] for name in names}
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients + 1)
+    stop_at = [0.0]
+
+    def client_loop(i):
+        client = ServiceClient(url, keep_alive=keep_alive)
+        rng = np.random.default_rng(seed + i)
+        own = {name: [] for name in names}
+        own_errors = []
+        barrier.wait()
+        while time.perf_counter() < stop_at[0]:
+            name = names[rng.choice(len(names), p=weights)]
+            start = time.perf_counter()
+            try:
+                kinds[name](client, rng)
+            except (ServiceError, OSError) as e:
+                own_errors.append(f"{name}: {e}")
+                continue
+            own[name].append((time.perf_counter() - start) * 1000)
+        client.close()
+        with lock:
+            for name in names:
+                latencies[name] += own[name]
+            errors.extend(own_errors)
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    stop_at[0] = time.perf_counter() + duration
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    steps = {name: percentiles(values) for name, values in latencies.items() if values}
+    everything = [value for values in latencies.values() for value in values]
+    if everything:
+        steps["gesamt"] = percentiles(everything)
+    return {
+        "steps": steps,
+        "requests_per_s": len(everything) / wall,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+    }
+
+
+def start_service(workers):
+    """Starts book_service.py on a free port; returns the process and its URL."""
+    process = subprocess.Popen(
+        [sys.executable, "-u", SERVICE_SCRIPT, "--port", "0", "--workers", str(workers)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    for line in process.stdout:
+        match = re.search(r"http://[\d.]+:\d+", line)
+        if match:
+            return process, match.group(0)
+        print(line, end="")
+    raise RuntimeError("book_service.py wurde beendet, bevor es bereit war")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load client of the recommendation/prediction service")
+    parser.add_argument("--url", help="Running service (default: start book_service.py locally)")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes of the local service")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--no-keep-alive", action="store_true", help="One connection per request")
+    parser.add_argument("--compare", action="store_true", help="Run with and without keep-alive")
+    parser.add_argument("--new-books", default=NEW_BOOKS_CSV, help="Records for /predict")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_service(args.workers)
+    try:
+        health = ServiceClient(url).health()
+        try:
+            new_books = pd.read_csv(args.new_books, encoding="utf-8")
+            new_books.columns = new_books.columns.str.strip()
+            records = to_records(new_books)
+        except FileNotFoundError:
+            records = []
+        kinds = make_requests(health["books"], records, health)
+
+        modes = [True, False] if args.compare else [not args.no_keep_alive]
+        results = {}
+        for keep_alive in modes:
+            label = "keep-alive" if keep_alive else "neue Verbindung"
+            results[label] = run_clients(url, kinds, args.clients, args.duration, keep_alive, args.seed)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"{url}: {health['books']} Bücher, {args.clients} Clients, {args.duration:.0f} s pro Lauf"
+          + (f", {args.workers} Worker" if args.url is None else ""))
+    for label, result in results.items():
+        print(f"\n{label}: {result['requests_per_s']:.0f} Anfragen/s, Fehler: {result['errors']}")
+        for sample in result["error_samples"]:
+            print(f"  {sample}")
+        print(f"{'Anfrage':<16}{'Anzahl':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, stats in result["steps"].items():
+            print(f"{name:<16}{stats['count']:>8}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# bench_shared_memory.py
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+
+from benchmarks.synthetic import write_catalogue
+from catalog_index import CatalogIndex
+from embedding_store import cosine_scores, load_or_compute_norms
+from filter_engine import BookQueryEngine, load_shared_engine
+from schema import read_books
+from shared_store import share_numeric_columns
+
+# Memory of a node with N server processes, each holding the search data of a
+# synthetic catalogue (embedding matrix, book frame, query engine):
+#   privat   every process reads the embeddings into its own array and builds its
+#            own query engine (as before shared_store.py)
+#   geteilt  the processes map the embeddings, the numeric columns and the engine
+#            arrays read-only (shared_store.py, embedding_store.py)
+# Every worker runs similarity searches and filter queries (so all pages are
+# touched), then waits while the parent reads its memory from /proc/<pid>/smaps_rollup.
+# PSS splits shared pages between the processes that map them, so the sum of the
+# PSS of all workers is the memory of the node; "Daten" subtracts the PSS of as
+# many idle processes that only imported the same modules.
+#
+#   python -m benchmarks.bench_shared_memory --books 100000 --dim 768 --workers 1 2 4 8
+
+MODES = ("privat", "geteilt")
+
+
+def proc_memory(pid):
+    """PSS and RSS of a process in bytes (Linux, /proc/<pid>/smaps_rollup)."""
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Pss", "Rss"):
+                memory[key.lower()] = int(value.split()[0]) * 1024
+    return memory
+
+
+def load_search_data(mode, paths, shared_dir):
+    books, genre_lists = read_books(paths["books"])
+    if mode == "privat":
+        embeddings = np.load(paths["embeddings"])
+        norms = np.linalg.norm(embeddings, axis=1).astype(np.float32)
+        engine = BookQueryEngine(books, CatalogIndex(books), genre_lists)
+    else:
+        books = share_numeric_columns(books, shared_dir=shared_dir)
+        embeddings = np.load(paths["embeddings"], mmap_mode="r")
+        norms = load_or_compute_norms(embeddings, "bench", shared_dir)
+        engine = load_shared_engine(books, CatalogIndex(books), genre_lists, shared_dir)
+    return books, embeddings, norms, engine
+
+
+def worker(mode, paths, shared_dir, queries, results, done):
+    if mode is None:
+        # idle process: same imports, no data
+        results.put((os.getpid(), 0.0, 0.0))
+        done.wait()
+        return
+    books, embeddings, norms, engine = load_search_data(mode, paths, shared_dir)
+    rng = np.random.default_rng(os.getpid())
+    start = time.perf_counter()
+    for row in rng.integers(0, len(books), size=queries):
+        scores = cosine_scores(embeddings[row], embeddings, norms)
+        np.argpartition(-scores, 50)[:50]
+    search_ms = (time.perf_counter() - start) * 1000 / queries
+    genres = engine.genre_names[:3]
+    start = time.perf_counter()
+    for _ in range(queries):
+        engine.top(50, min_rating=3.5, genres=genres)
+        engine.count(min_rating=3.0, years=(1990, 2010))
+    filter_ms = (time.perf_counter() - start) * 1000 / queries
+    results.put((os.getpid(), search_ms, filter_ms))
+    done.wait()
+
+
+def run_workers(mode, n_workers, paths, shared_dir, queries):
+    """Starts n_workers processes, returns their memory while all of them hold the data."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    done = context.Event()
+    processes = [
+        context.Process(target=worker, args=(mode, paths, shared_dir, queries, results, done))
+        for _ in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        reports = [results.get(timeout=600) for _ in processes]
+        memory = [proc_memory(pid) for pid, _, _ in reports]
+    finally:
+        done.set()
+        for process in processes:
+            process.join()
+    return {
+        "pss": sum(m["pss"] for m in memory),
+        "rss": float(np.mean([m["rss"] for m in memory])),
+        "search_ms": float(np.mean([r[1] for r in reports])),
+        "filter_ms": float(np.mean([r[2] for r in reports])),
+    }
+
+
+def run(paths, workers_list, queries, shared_dir):
+    idle = {n: run_workers(None, n, paths, shared_dir, queries)["pss"] for n in workers_list}
+    results = []
+    for mode in MODES:
+        for n_workers in workers_list:
+            measured = run_workers(mode, n_workers, paths, shared_dir, queries)
+            measured.update(mode=mode, workers=n_workers, data=measured["pss"] - idle[n_workers])
+            results.append(measured)
+    return idle, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Node memory with N worker processes: private vs. shared search data")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768, help="Dimension of the embeddings")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--queries", type=int, default=20, help="Searches per worker")
+    parser.add_argument("--data", help="Directory for the synthetic catalogue (default: temporary)")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    out_dir = args.data or tempfile.mkdtemp(prefix="book_market_shared_")
+    shared_dir = os.path.join(out_dir, "shared")
+    try:
+        paths = write_catalogue(args.books, out_dir, dim=args.dim, words=20)
+        shutil.rmtree(shared_dir, ignore_errors=True)
+        idle, results = run(paths, args.workers, args.queries, shared_dir)
+    finally:
+        if not args.data:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    mb = 2 ** 20
+    print(f"{args.books} Bücher, Embeddings {args.books * args.dim * 4 / mb:.0f} MB, "
+          f"leerer Prozess {idle[args.workers[0]] / args.workers[0] / mb:.0f} MB PSS")
+    print(f"{'Modus':>8}{'Worker':>8}{'Σ PSS MB':>10}{'Daten MB':>10}{'Ø RSS MB':>10}"
+          f"{'Suche ms':>10}{'Filter ms':>11}")
+    for r in results:
+        print(f"{r['mode']:>8}{r['workers']:>8}{r['pss'] / mb:>10.0f}{r['data'] / mb:>10.0f}"
+              f"{r['rss'] / mb:>10.0f}{r['search_ms']:>10.1f}{r['filter_ms']:>11.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"idle_pss": idle, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+# load_test.py
+
+import argparse
+import json
+import os
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Load test with N concurrent sessions of app.py in one process, like a server
+# with N open browser tabs: every session is its own AppTest (own session state,
+# own script thread), all of them share the st.cache_* resources, the model and
+# the BLAS threads of the process. Each session clicks through the three pages in
+# random order (similar books with covers and word clouds, filters, keyword search,
+# film prediction with author/book selection and threshold). Open Library is
+# replaced by a local stub (BOOK_MARKET_COVER_URL) with configurable latency and
+# share of missing covers, so parallel cover fetches can be reproduced offline.
+# Reported: rerun latency p50/p95/p99 per step and overall, reruns per second,
+# errors, cover requests and the peak RSS of the process.
+# Needs the data files and models of the pages (run from streamlit_app/).
+#
+#   python -m benchmarks.load_test --sessions 8 --steps 20 --cover-latency-ms 150
+
+APP_SCRIPT = "app.py"
+PLACEHOLDER = "🔽 Bitte wählen..."
+
+# Smallest valid JPEG (1x1 pixel), served as cover
+COVER_JPEG = bytes.fromhex(
+    "ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c"
+    "140d0c0b0b0c1912130f141d1a1f1e1d1a1c1c20242e2720222c231c1c2837292c30313434341f27"
+    "393d38323c2e333432ffc0000b080001000101011100ffc4001f0000010501010101010100000000"
+    "000000000102030405060708090a0bffc400b5100002010303020403050504040000017d01020300"
+    "041105122131410613516107227114328191a1082342b1c11552d1f02433627282090a161718191a"
+    "25262728292a3435363738393a434445464748494a535455565758595a636465666768696a737475"
+    "767778797a838485868788898a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9ba"
+    "c2c3c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1f2f3f4f5f6f7f8f9faffda"
+    "0008010100003f00fbd3ffd9"
+)
+
+
+class CoverStub:
+    """Local stand-in for covers.openlibrary.org: /b/isbn/<isbn>-M.jpg."""
+
+    def __init__(self, latency_ms=100.0, miss_rate=0.2):
+        self.latency = latency_ms / 1000
+        self.miss_rate = miss_rate
+        self.requests = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests += 1
+                time.sleep(stub.latency)
+                # the same ISBN is always found or always missing
+                if zlib.crc32(self.path.encode()) % 1000 < stub.miss_rate * 1000:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(COVER_JPEG)))
+                self.end_headers()
+                self.wfile.write(COVER_JPEG)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/b/isbn/{{isbn}}-M.jpg"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# Steps of a session. Every step changes widgets and is followed by one timed rerun;
+# a step returns False if it does not apply on the current page state (then skipped).
+
+def go_start(at, rng):
+    at.sidebar.radio[0].set_value("Startseite")
+
+
+def go_recommendations(at, rng):
+    at.sidebar.radio[0].set_value("Empfehlungssystem")
+
+
+def go_film(at, rng):
+    at.sidebar.radio[0].set_value("Verfilmungsprognose")
+
+
+def _on(at, page):
+    return at.sidebar.radio[0].value == page
+
+
+def _option(at, option):
+    if not _on(at, "Empfehlungssystem"):
+        return False
+    at.radio(key="empfehlung_option_radio_main").set_value(option)
+
+
+def option_similar(at, rng):
+    return _option(at, "Finde ähnliche Bücher zu deinem Favoriten")
+
+
+def option_filter(at, rng):
+    return _option(at, "Finde Bücher nach Genre, Bewertung und mehr")
+
+
+def option_search(at, rng):
+    return _option(at, "Suche nach Themen und Stichwörtern")
+
+
+def _keyed(elements, key):
+    return next((e for e in elements if e.key == key), None)
+
+
+def pick_title(at, rng):
+    titles = _keyed(at.selectbox, "book_selectbox")
+    if titles is None or not titles.options:
+        return False
+    titles.set_value(titles.options[rng.integers(len(titles.options))])
+
+
+def _click(at, label):
+    button = next((b for b in at.button if b.label == label), None)
+    if button is None:
+        return False
+    button.click()
+
+
+def find_similar(at, rng):
+    return _click(at, "Ähnliche Bücher finden")
+
+
+def find_filtered(at, rng):
+    return _click(at, "Bücher finden")
+
+
+def change_filters(at, rng):
+    rating = _keyed(at.slider, "min_avg_rating")
+    if rating is None:
+        return False
+    rating.set_value(float(rng.choice([0.0, 3.0, 3.5, 4.0])))
+    genres = _keyed(at.multiselect, "filter_genres")
+    if genres is not None and genres.options:
+        genres.set_value(list(rng.choice(genres.options, size=rng.integers(0, 3), replace=False)))
+
+
+def search_keywords(at, rng):
+    query = _keyed(at.text_input, "keyword_query")
+    if query is None:
+        return False
+    query.set_value(str(rng.choice(["magic school", "war love", "detective murder", "space travel",
+                                    "family secrets", "dragon", "history of europe"])))
+
+
+def pick_film_book(at, rng):
+    if not _on(at, "Verfilmungsprognose"):
+        return False
+    selects = at.sidebar.selectbox
+    options = [o for o in selects[-1].options if o != PLACEHOLDER]
+    if not options:
+        return False
+    selects[-1].set_value(options[rng.integers(len(options))])
+
+
+def change_threshold(at, rng):
+    threshold = _keyed(at.slider, "threshold_slider")
+    if threshold is None:
+        return False
+    threshold.set_value(float(rng.choice([0.3, 0.5, 0.7])))
+
+
+# Click paths per page (sequences of steps), drawn with these weights
+SCENARIOS = [
+    (3, [go_recommendations, option_similar, pick_title, find_similar, change_filters]),
+    (2, [go_recommendations, option_filter, change_filters, find_filtered, change_filters]),
+    (2, [go_recommendations, option_search, search_keywords, change_filters]),
+    (2, [go_film, pick_film_book, pick_film_book, change_threshold]),
+    (1, [go_start]),
+]
+
+
+def share_runtime():
+    """
+    Installs one mock Streamlit runtime for all sessions. AppTest creates a runtime
+    per script run and removes it again afterwards (Runtime._instance = None), which
+    breaks the other sessions running at the same time; a real server also has one
+    runtime (media files, cache storage) for all sessions.
+    """
+    from unittest.mock import MagicMock
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    # AppTest switches this option on and back per run; keep it on for all of them
+    config.set_option("global.appTest", True)
+
+
+def run_session(session, steps, seed, timeout, samples, errors, barrier):
+    """One simulated user: initial page load, then `steps` timed reruns along random click paths."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng(seed + session)
+    weights = np.array([w for w, _ in SCENARIOS], dtype=float)
+    barrier.wait()
+
+    def rerun(label, at):
+        start = time.perf_counter()
+        at.run(timeout=timeout)
+        ms = (time.perf_counter() - start) * 1000
+        samples.append((label, ms))
+        if at.exception:
+            errors.append(f"Sitzung {session}, {label}: {at.exception[0].message}")
+
+    at = AppTest.from_file(APP_SCRIPT, default_timeout=timeout)
+    rerun("initial", at)
+    done = 0
+    while done < steps:
+        _, path = SCENARIOS[rng.choice(len(SCENARIOS), p=weights / weights.sum())]
+        for step in path:
+            if done >= steps:
+                break
+            if step(at, rng) is False:
+                continue
+            rerun(step.__name__, at)
+            done += 1
+
+
+def percentiles(values):
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": len(values), "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def run(sessions, steps, seed=0, timeout=300.0, cover_latency_ms=100.0, cover_miss_rate=0.2):
+    """
+    Runs the load test.
+
+    Returns:
+        dict: Overall and per-step latency percentiles, throughput, errors,
+        cover requests and peak RSS.
+    """
+    from resources import process_memory
+
+    share_runtime()
+    samples, errors = [], []
+    with CoverStub(cover_latency_ms, cover_miss_rate) as stub:
+        # read by recommendations.py at import, i.e. before the first script run
+        os.environ["BOOK_MARKET_COVER_URL"] = stub.url
+        barrier = threading.Barrier(sessions + 1)
+        threads = [
+            threading.Thread(target=run_session, args=(i, steps, seed, timeout, samples, errors, barrier))
+            for i in range(sessions)
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+        cover_requests = stub.requests
+
+    by_step = {}
+    for label, ms in samples:
+        by_step.setdefault(label, []).append(ms)
+    memory = process_memory()
+    return {
+        "sessions": sessions,
+        "steps": steps,
+        "wall_s": wall,
+        "reruns": len(samples),
+        "throughput_per_s": len(samples) / wall if wall else 0.0,
+        "overall": percentiles([ms for _, ms in samples]),
+        "steps_by_name": {label: percentiles(values) for label, values in sorted(by_step.items())},
+        "errors": errors,
+        "cover_requests": cover_requests,
+        "peak_rss_mb": memory["peak_rss"] / 2**20 if memory["peak_rss"] else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of app.py")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=20, help="Timed reruns per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds per script run")
+    parser.add_argument("--cover-latency-ms", type=float, default=100.0)
+    parser.add_argument("--cover-miss-rate", type=float, default=0.2, help="Share of ISBNs without cover")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    result = run(args.sessions, args.steps, args.seed, args.timeout, args.cover_latency_ms, args.cover_miss_rate)
+
+    print(f"{result['sessions']} Sitzungen, {result['reruns']} Reruns in {result['wall_s']:.1f} s "
+          f"({result['throughput_per_s']:.1f} Reruns/s), Cover-Anfragen: {result['cover_requests']}, "
+          f"RSS-Spitze: {result['peak_rss_mb']:.0f} MB")
+    print(f"{'Schritt':<20}{'Anzahl':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = list(result["steps_by_name"].items()) + [("gesamt", result["overall"])]
+    for label, p in rows:
+        print(f"{label:<20}{p['count']:>8}{p['p50_ms']:>10.1f}{p['p95_ms']:>10.1f}{p['p99_ms']:>10.1f}")
+    if result["errors"]:
+        print(f"⚠️ {len(result['errors'])} Fehler, z. B.: {result['errors'][0]}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# suite.py
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from autocomplete import AutocompleteIndex
+from benchmarks.synthetic import write_catalogue
+from catalog_index import CatalogIndex
+from filter_engine import BookQueryEngine
+from keyword_index import build_keyword_index
+from schema import read_books
+from trans_author import AuthorRatingMapper
+
+# Benchmark suite over synthetic catalogues (benchmarks/synthetic.py) of growing
+# size. Per size it measures
+#   load    CSV -> DataFrame (schema.read_books, film CSV), embeddings, index builds
+#   search  similar_books.find_similar_books on the embeddings with their norms
+#           (exact ranking, skipped without torch/sentence-transformers), BM25
+#           keyword search, autocomplete
+#   filter  BookQueryEngine: best books per rating/year/genre, count, author
+#   clean   clean_book_data of notebooks/data_cleaning.py on the raw export
+#   score   AuthorRatingMapper and predict_proba of the film pipeline (same
+#           structure as notebooks/MOdel_LogisticReg.py, fitted on synthetic data)
+# Every case runs --repeats times (fewer once it has used --budget seconds) and
+# reports median and minimum in ms (per query for the search and filter cases).
+# "compare" flags every case whose median got slower than the baseline by more
+# than --threshold (relative) and --min-ms (absolute) and exits with status 1.
+#
+#   python -m benchmarks.suite run --sizes 10000 100000 1000000 --json current.json
+#   python -m benchmarks.suite run --data bench_data --sizes 100000 --only search filter
+#   python -m benchmarks.suite compare baseline.json current.json --threshold 0.2
+
+NOTEBOOKS_DIR = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "notebooks")
+GROUPS = ["load", "search", "filter", "clean", "score"]
+QUERIES = 20
+TOP_N = 10
+FIT_ROWS = 20_000
+
+# Features of the film pipeline (as in notebooks/MOdel_LogisticReg.py)
+NUMERICAL_FEATURES = ["Publishing_Year", "Author_Rating", "Average_Rating", "Rating_Count", "Gross_Sales_EUR"]
+CATEGORICAL_FEATURES = ["Language_Code", "Genre", "Publisher", "Author"]
+
+
+def measure(run, repeats, budget, setup=None, per=1):
+    """
+    Times run() repeatedly.
+
+    Parameters:
+        run (callable): The measured call; receives the result of setup() if given.
+        repeats (int): Maximum number of repetitions.
+        budget (float): Stop repeating once this many seconds were spent (at least one run).
+        setup (callable): Untimed preparation before every run (e.g. a fresh copy).
+        per (int): Divide the durations by this (e.g. the number of queries).
+
+    Returns:
+        dict: median_ms, min_ms and repeats.
+    """
+    durations = []
+    spent = 0.0
+    while len(durations) < repeats and (not durations or spent < budget):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        if setup is not None:
+            run(argument)
+        else:
+            run()
+        elapsed = time.perf_counter() - start
+        spent += elapsed
+        durations.append(elapsed * 1000 / per)
+    return {"median_ms": statistics.median(durations), "min_ms": min(durations), "repeats": len(durations)}
+
+
+def film_pipeline(film):
+    """Fits the film pipeline on the first FIT_ROWS rows (top publishers/authors, rest grouped)."""
+    X = film.drop(columns=["Adapted_to_Film", "Book_Name"]).head(FIT_ROWS).copy()
+    y = film["Adapted_to_Film"].head(FIT_ROWS)
+    for column, other in [("Publisher", "other"), ("Author", "Sonstige")]:
+        top = X[column].value_counts().nlargest(10).index
+        X[column] = X[column].where(X[column].isin(top), other=other)
+    preprocessor = ColumnTransformer(transformers=[
+        ("num", StandardScaler(), NUMERICAL_FEATURES),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL_FEATURES),
+    ])
+    pipeline = Pipeline(steps=[
+        ("rating_mapper", AuthorRatingMapper()),
+        ("preprocessing", preprocessor),
+        ("classifier", LogisticRegression(max_iter=1000, random_state=42)),
+    ])
+    return pipeline.fit(X, y)
+
+
+def import_clean_book_data():
+    """clean_book_data from the notebooks, or the reason why it cannot be imported."""
+    sys.path.insert(0, os.path.abspath(NOTEBOOKS_DIR))
+    try:
+        from data_cleaning import clean_book_data
+        return clean_book_data, None
+    except ImportError as e:
+        return None, str(e)
+    finally:
+        sys.path.pop(0)
+
+
+def import_find_similar_books():
+    """find_similar_books of the embedding backend, or the reason why it cannot be imported."""
+    try:
+        from similar_books import find_similar_books
+        return find_similar_books, None
+    except ImportError as e:
+        return None, str(e)
+
+
+def run_size(n_books, paths, groups, repeats, budget, seed=0):
+    """
+    Runs the cases of the selected groups for one catalogue.
+
+    Returns:
+        list: One result dict per case (case, size, median_ms, min_ms, repeats or skipped).
+    """
+    results = []
+    rng = np.random.default_rng(seed)
+
+    def record(case, run, **options):
+        print(f"  {case:<28}", end="", flush=True)
+        result = {"case": case, "size": n_books, **measure(run, repeats, budget, **options)}
+        print(f"{result['median_ms']:>12.3f} ms  (min {result['min_ms']:.3f}, n={result['repeats']})")
+        results.append(result)
+
+    def skip(case, reason):
+        print(f"  {case:<28}übersprungen: {reason}")
+        results.append({"case": case, "size": n_books, "skipped": reason})
+
+    books, genre_lists = read_books(paths["books"])
+    film = pd.read_csv(paths["film"], sep=";")
+    seeds = rng.choice(n_books, size=min(QUERIES, n_books), replace=False)
+
+    if "load" in groups:
+        record("load/books_csv", lambda: read_books(paths["books"]))
+        record("load/film_csv", lambda: pd.read_csv(paths["film"], sep=";"))
+        record("load/embeddings", lambda: np.load(paths["embeddings"]))
+        record("load/catalog_index", lambda: CatalogIndex(books))
+        record("load/keyword_index", lambda: build_keyword_index(books))
+
+    if "search" in groups:
+        find_similar_books, reason = import_find_similar_books()
+        if find_similar_books is None:
+            skip("search/similar", reason)
+        else:
+            import torch
+
+            matrix = np.load(paths["embeddings"])
+            embeddings = torch.from_numpy(matrix)
+            norms = np.linalg.norm(matrix, axis=1)
+            catalog = CatalogIndex(books)
+            titles = books["title"].iloc[seeds].tolist()
+            record("search/similar", lambda: [
+                find_similar_books(t, books, None, embeddings, TOP_N, catalog=catalog, norms=norms)
+                for t in titles
+            ], per=len(titles))
+        keyword_index = build_keyword_index(books)
+        queries = [" ".join(text.split()[:3]) for text in books["clean_description"].iloc[seeds]]
+        record("search/keyword", lambda: [keyword_index.search(q, TOP_N) for q in queries], per=len(queries))
+        title_index = AutocompleteIndex(books["title"])
+        prefixes = [title[:8] for title in books["title"].iloc[seeds]]
+        record("search/autocomplete", lambda: [title_index.search(p) for p in prefixes], per=len(prefixes))
+
+    if "filter" in groups:
+        catalog = CatalogIndex(books)
+        engine = BookQueryEngine(books, catalog, genre_lists)
+        query = {"min_rating": 4.0, "years": (1990, 2010), "genres": ["Fantasy", "Horror"]}
+        record("filter/top", lambda: engine.top(TOP_N, **query))
+        record("filter/count", lambda: engine.count(**query))
+        authors = books["author"].iloc[seeds].astype(str).tolist()
+        record("filter/author", lambda: [engine.top(TOP_N, author=a) for a in authors], per=len(authors))
+
+    if "clean" in groups:
+        clean_book_data, reason = import_clean_book_data()
+        if clean_book_data is None:
+            skip("clean/clean_book_data", reason)
+        else:
+            raw = pd.read_csv(paths["raw"], sep=";")
+
+            def clean(df):
+                # clean_book_data reports its corrections with print
+                with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+                    warnings.simplefilter("ignore", FutureWarning)
+                    clean_book_data(df)
+
+            record("clean/clean_book_data", clean, setup=raw.copy)
+
+    if "score" in groups:
+        pipeline = film_pipeline(film)
+        X = film.drop(columns=["Adapted_to_Film", "Book_Name"])
+        record("score/author_rating_mapper", lambda: AuthorRatingMapper().transform(X))
+        record("score/predict_proba", lambda: pipeline.predict_proba(X))
+
+    return results
+
+
+def environment():
+    """Interpreter, library versions and commit of the measured tree."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def run(args):
+    meta = {**environment(), "sizes": args.sizes, "groups": args.only, "repeats": args.repeats}
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for n_books in args.sizes:
+            paths = None
+            if args.data:
+                paths = {
+                    "books": os.path.join(args.data, str(n_books), "final_books_recommend.csv"),
+                    "film": os.path.join(args.data, str(n_books), "book_data_clean.csv"),
+                    "raw": os.path.join(args.data, str(n_books), "buch_basisdaten.csv"),
+                    "embeddings": os.path.join(args.data, str(n_books), "embeddings.npy"),
+                }
+                if not all(os.path.exists(p) for p in paths.values()):
+                    paths = None
+            if paths is None:
+                print(f"Erzeuge synthetischen Katalog mit {n_books} Büchern ...")
+                paths = write_catalogue(n_books, scratch, dim=args.dim)
+            print(f"{n_books} Bücher:")
+            results.extend(run_size(n_books, paths, args.only, args.repeats, args.budget))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"Ergebnisse gespeichert: {args.json}")
+    return 0
+
+
+def compare_results(baseline, current, threshold=0.2, min_ms=0.05):
+    """
+    Compares the medians of two result files per case and size.
+
+    Parameters:
+        baseline (dict): Stored results ({"meta": ..., "results": [...]}).
+        current (dict): New results.
+        threshold (float): Relative slowdown counted as regression (0.2 = 20 % slower).
+        min_ms (float): Smaller absolute differences are ignored (timer noise).
+
+    Returns:
+        list: One row per case present in both (case, size, baseline_ms, current_ms, ratio, status).
+    """
+    def index(data):
+        return {(r["case"], r["size"]): r for r in data["results"] if "median_ms" in r}
+
+    old, new = index(baseline), index(current)
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key]["median_ms"], new[key]["median_ms"]
+        ratio = after / before if before > 0 else float("inf")
+        if ratio > 1 + threshold and after - before > min_ms:
+            status = "langsamer"
+        elif ratio < 1 / (1 + threshold) and before - after > min_ms:
+            status = "schneller"
+        else:
+            status = "ok"
+        rows.append({"case": key[0], "size": key[1], "baseline_ms": before, "current_ms": after,
+                     "ratio": ratio, "status": status})
+    return rows
+
+
+def compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    rows = compare_results(baseline, current, args.threshold, args.min_ms)
+    print(f"Basis: {baseline['meta'].get('commit')} ({baseline['meta'].get('time')}), "
+          f"aktuell: {current['meta'].get('commit')} ({current['meta'].get('time')})")
+    print(f"{'Fall':<28}{'Größe':>9}{'Basis ms':>12}{'aktuell ms':>12}{'Faktor':>8}  Status")
+    for r in rows:
+        print(f"{r['case']:<28}{r['size']:>9}{r['baseline_ms']:>12.3f}{r['current_ms']:>12.3f}"
+              f"{r['ratio']:>8.2f}  {r['status']}")
+
+    regressions = [r for r in rows if r["status"] == "langsamer"]
+    if regressions:
+        print(f"⚠️ {len(regressions)} Regression(en) über {args.threshold:.0%}")
+        return 1
+    print("✅ Keine Regressionen")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite over synthetic catalogues")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    run_parser.add_argument("--only", nargs="+", choices=GROUPS, default=GROUPS, help="Groups of cases")
+    run_parser.add_argument("--data", help="Directory of benchmarks.synthetic (default: generate)")
+    run_parser.add_argument("--dim", type=int, default=256, help="Dimension of generated embeddings")
+    run_parser.add_argument("--repeats", type=int, default=5)
+    run_parser.add_argument("--budget", type=float, default=30.0, help="Seconds per case before repeating stops")
+    run_parser.add_argument("--json", help="Write the results to this JSON file")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="Compare results with a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2)
+    compare_parser.add_argument("--min-ms", type=float, default=0.05)
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# synthetic.py
+
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_projection import synthetic_embeddings
+from schema import GENRE_COLUMN, GENRE_DELIMITER
+
+# Synthetic catalogues of any size for the benchmarks, shaped like the real files:
+#   books   final_books_recommend.csv (recommendations, dashboard pages)
+#   film    book_data_clean.csv       (film prediction, ";"-separated)
+#   raw     buch_basisdaten.csv       (input of clean_book_data: German number
+#                                      formats, language variants, "Ja"/"Nein")
+#   embeddings                        (random vectors with topic structure)
+# Titles are unique, authors repeat (Zipf-like), ratings, years and genres follow
+# plausible distributions, descriptions draw words from a skewed vocabulary, so
+# keyword and TF-IDF indexes see realistic posting list lengths.
+#
+#   python -m benchmarks.synthetic --sizes 10000 100000 --out bench_data
+
+GENRES = [
+    "Fantasy", "Science Fiction", "Thriller", "Mystery", "Historical Fiction", "Romance",
+    "Fiction", "Biography", "Memoir", "Young Adult", "Nonfiction", "Horror", "Adventure",
+    "Philosophy", "Politics", "Satire", "Graphic Novel", "Dystopian", "Classic", "Crime",
+]
+NONFICTION = {"Biography", "Memoir", "Nonfiction", "Philosophy", "Politics"}
+AUTHOR_RATINGS = ["Novice", "Intermediate", "Famous", "Excellent"]
+LANGUAGES = ["en", "en", "en", "en", "es", "fr", "de"]
+# Raw language codes of buch_basisdaten.csv and what clean_book_data makes of them
+RAW_LANGUAGES = {"en": ["eng", "en-US", "en-GB", "en"], "es": ["spa"], "fr": ["fre"], "de": ["de"]}
+PUBLISHERS = ["Penguin", "Harper", "Hachette", "Macmillan", "Simon & Schuster", "Crown",
+              "Bloomsbury", "Vintage", "Scholastic", "Tor", "Orbit", "Random House"]
+VOCABULARY_SIZE = 20_000
+
+
+def _vocabulary(rng, size=VOCABULARY_SIZE):
+    """Made-up words of 3 to 10 letters."""
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    lengths = rng.integers(3, 11, size=size)
+    return np.unique(["".join(rng.choice(letters, n)) for n in lengths])
+
+
+def _descriptions(rng, n_books, words):
+    """One text per book, word counts around `words`, words drawn Zipf-like."""
+    vocabulary = _vocabulary(rng)
+    counts = np.clip(rng.normal(words, words / 3, size=n_books).astype(int), 5, None)
+    ids = (rng.zipf(1.2, size=int(counts.sum())) - 1) % len(vocabulary)
+    tokens = vocabulary[ids]
+    ends = np.cumsum(counts)
+    return [" ".join(tokens[end - count:end]) for end, count in zip(ends, counts)]
+
+
+def _authors(rng, n_books):
+    """Author names with a long tail: a few prolific authors (Zipf), most with a handful of books."""
+    n_authors = max(1, n_books // 4)
+    ids = rng.integers(0, n_authors, size=n_books)
+    prolific = rng.random(n_books) < 0.2
+    ids[prolific] = (rng.zipf(1.5, size=int(prolific.sum())) - 1) % n_authors
+    return np.char.add("Author ", ids.astype(str)).astype(object), ids
+
+
+def synthetic_books(n_books, words=60, seed=0):
+    """
+    Creates a recommendation catalogue with the columns of final_books_recommend.csv.
+
+    Parameters:
+        n_books (int): Number of books.
+        words (int): Mean number of words per description.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: The catalogue (genre lists in the "Fantasy|Fiction" format).
+    """
+    rng = np.random.default_rng(seed)
+    authors, _ = _authors(rng, n_books)
+    n_genres = rng.integers(1, 4, size=n_books)
+    # distinct genres per book: the first k of a random permutation
+    permutations = np.argsort(rng.random((n_books, len(GENRES))), axis=1)[:, :3]
+    genre_lists = [[GENRES[g] for g in row[:k]] for row, k in zip(permutations.tolist(), n_genres)]
+    descriptions = _descriptions(rng, n_books, words)
+    return pd.DataFrame({
+        "title": [f"Book {i}" for i in range(n_books)],
+        "author": authors,
+        "publication_year": rng.integers(1900, 2025, size=n_books),
+        "avg_rating": np.round(np.clip(rng.normal(3.9, 0.35, size=n_books), 0, 5), 2),
+        "ratings_count": rng.lognormal(7, 2, size=n_books).astype(np.int64),
+        "genres": [", ".join(g) for g in genre_lists],
+        "main_genre": [g[0] for g in genre_lists],
+        GENRE_COLUMN: [GENRE_DELIMITER.join(g) for g in genre_lists],
+        "description": descriptions,
+        "clean_description": descriptions,
+        "isbn": rng.integers(9_780_000_000_000, 9_799_999_999_999, size=n_books).astype(str),
+        "is_fiction": [g[0] not in NONFICTION for g in genre_lists],
+        "word_count_description": [d.count(" ") + 1 for d in descriptions],
+    })
+
+
+def synthetic_film_books(n_books, seed=0):
+    """
+    Creates historical film data with the columns of book_data_clean.csv.
+
+    Parameters:
+        n_books (int): Number of books.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: The data; "Adapted_to_Film" depends on rating, sales and author rating.
+    """
+    rng = np.random.default_rng(seed + 1)
+    authors, author_ids = _authors(rng, n_books)
+    # one rating per author, as after the conflict resolution of clean_book_data
+    author_rating = np.array(AUTHOR_RATINGS)[rng.integers(0, 4, size=author_ids.max() + 1)][author_ids]
+    rating = np.round(np.clip(rng.normal(3.9, 0.3, size=n_books), 1, 5), 2)
+    revenue = np.round(rng.lognormal(9, 1.5, size=n_books), 2)
+    gross = np.round(revenue * rng.uniform(1.2, 2.0, size=n_books), 2)
+    level = pd.Series(author_rating).map({r: i for i, r in enumerate(AUTHOR_RATINGS)}).to_numpy()
+    score = (rating - 3.9) * 2 + (np.log(gross) - 9.5) / 1.5 + (level - 1.5) * 0.5
+    adapted = (rng.random(n_books) < 1 / (1 + np.exp(-(score - 1)))).astype(int)
+    return pd.DataFrame({
+        "Publishing_Year": rng.integers(1925, 2021, size=n_books),
+        "Book_Name": [f"Book {i}" for i in range(n_books)],
+        "Author": authors,
+        "Language_Code": rng.choice(LANGUAGES, size=n_books),
+        "Author_Rating": author_rating,
+        "Average_Rating": rating,
+        "Rating_Count": rng.lognormal(9, 2, size=n_books).astype(np.int64),
+        "Gross_Sales_EUR": gross,
+        "Publisher_Revenue_EUR": revenue,
+        "Publisher": rng.choice(PUBLISHERS, size=n_books),
+        "Adapted_to_Film": adapted,
+        "Genre": rng.choice(GENRES, size=n_books),
+    })
+
+
+def _german_number(values, decimals, unit=""):
+    """Formats numbers like the raw export: 12.437,50 € (thousands ".", decimals ",")."""
+    text = pd.Series(values).map(lambda v: f"{v:,.{decimals}f}")
+    text = text.str.replace(",", "_").str.replace(".", ",").str.replace("_", ".")
+    return (text + unit).to_numpy(dtype=object)
+
+
+def raw_from_film_books(film, seed=0):
+    """
+    Formats film data like buch_basisdaten.csv, the input of clean_book_data:
+    raw column names, German number formats, language variants, "Ja"/"Nein", a
+    few books with conflicting author ratings and swapped sales/revenue magnitudes.
+    """
+    rng = np.random.default_rng(seed + 2)
+    n_books = len(film)
+    codes = film["Language_Code"].to_numpy(dtype=object)
+    languages = codes.copy()
+    for code, variants in RAW_LANGUAGES.items():
+        rows = np.flatnonzero(codes == code)
+        languages[rows] = np.array(variants, dtype=object)[rng.integers(0, len(variants), size=len(rows))]
+    author_rating = film["Author_Rating"].to_numpy(dtype=object).copy()
+    conflicts = rng.random(n_books) < 0.02
+    author_rating[conflicts] = rng.choice(AUTHOR_RATINGS, size=int(conflicts.sum()))
+    gross = film["Gross_Sales_EUR"].to_numpy().copy()
+    swapped = rng.random(n_books) < 0.01
+    gross[swapped] = np.round(gross[swapped] / 1000, 2)
+    adapted = np.where(film["Adapted_to_Film"] == 1, "Ja", "Nein").astype(object)
+    adapted[rng.random(n_books) < 0.01] = "-"
+    return pd.DataFrame({
+        "Publishing_Year": film["Publishing_Year"],
+        "Book_Name": film["Book_Name"],
+        "Author": film["Author"],
+        "Language_Code": languages,
+        "Author_Rating": author_rating,
+        "Book_Average_Rating": _german_number(film["Average_Rating"], 2),
+        "Book_Ratings_Count": _german_number(film["Rating_Count"], 0),
+        "Genre_new": film["Genre"],
+        "Gross_sales/ Bruttoumsatz": _german_number(gross, 2, " €"),
+        "Publisher_Revenue": _german_number(film["Publisher_Revenue_EUR"], 2, " €"),
+        "Publisher": film["Publisher"],
+        "Verfilmt": adapted,
+    })
+
+
+def write_catalogue(n_books, out_dir, dim=256, words=60, seed=0):
+    """
+    Writes all synthetic files of one size to out_dir/<n_books>/.
+
+    Returns:
+        dict: Paths of the files (books, film, raw, embeddings).
+    """
+    target = os.path.join(out_dir, str(n_books))
+    os.makedirs(target, exist_ok=True)
+    paths = {
+        "books": os.path.join(target, "final_books_recommend.csv"),
+        "film": os.path.join(target, "book_data_clean.csv"),
+        "raw": os.path.join(target, "buch_basisdaten.csv"),
+        "embeddings": os.path.join(target, "embeddings.npy"),
+    }
+    synthetic_books(n_books, words, seed).to_csv(paths["books"], index=False)
+    film = synthetic_film_books(n_books, seed)
+    film.to_csv(paths["film"], sep=";", index=False, float_format="%.2f")
+    raw_from_film_books(film, seed).to_csv(paths["raw"], sep=";", index=False)
+    np.save(paths["embeddings"], synthetic_embeddings(n_books, dim=dim, seed=seed))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic catalogues for the benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--out", default="bench_data")
+    parser.add_argument("--dim", type=int, default=256, help="Dimension of the embeddings")
+    parser.add_argument("--words", type=int, default=60, help="Mean words per description")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for n_books in args.sizes:
+        start = time.perf_counter()
+        paths = write_catalogue(n_books, args.out, args.dim, args.words, args.seed)
+        size_mb = sum(os.path.getsize(p) for p in paths.values()) / 2**20
+        print(f"{n_books:>9} Bücher: {size_mb:8.1f} MB in {time.perf_counter() - start:6.1f} s "
+              f"-> {os.path.dirname(paths['books'])}")
+
+
+if __name__ == "__main__":
+    main()
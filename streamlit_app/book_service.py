@@ -0,0 +1,433 @@
+# book_service.py
+
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import joblib
+import numpy as np
+import pandas as pd
+
+from batch_recommendations import recommend_batch
+from catalog_index import CatalogIndex
+from embedding_store import content_fingerprint, embeddings_path, load_or_compute_embeddings, load_or_compute_norms
+from encoder_backends import encoder_dir, store_model_name
+from filter_engine import load_shared_engine
+from metrics import ENABLED as METRICS_ENABLED, stage, start_worker_exporters, worker_port
+from schema import BOOKS_CSV, read_books
+from shared_store import share_numeric_columns
+from trans_author import AuthorRatingMapper  # noqa: F401 (needed to unpickle the pipeline)
+from year_cube import dataset_version
+
+# HTTP/JSON service for the recommendations and the film prediction, without
+# Streamlit. Other systems call it directly, the pages can use it as a client
+# (service_client.py, BOOK_MARKET_SERVICE_URL). It works on the same files as the
+# app: the mapped embeddings and norms (embedding_store.py), the shared numeric
+# columns and query engine arrays (shared_store.py) and logistic_pipeline.pkl.
+#
+#   POST /recommend          {"title": "...", "top_n": 5, "min_rating": 3.5,
+#                             "years": [1990, 2010], "genres": ["Fantasy"]}
+#                            similar books of a title (or "index": row position),
+#                            filtered like on the page (all genres must match);
+#                            without title/index: the best rated books matching the
+#                            filters (at least one genre, optional "author")
+#   POST /recommend/batch    {"requests": [<recommend request>, ...]}
+#   POST /predict            {"record": {"Publishing_Year": 2024, ...}, "threshold": 0.5}
+#   POST /predict/batch      {"records": [{...}, ...], "threshold": 0.5}
+#   GET  /health             worker, number of books, model version
+#
+# Process model: the parent loads everything once (the shared stores are published
+# then), binds the port and forks the workers; every worker accepts connections on
+# the same socket and serves each connection in a thread. Connections are kept
+# alive (HTTP/1.1) until the client closes them or they idle for IDLE_TIMEOUT.
+# With BOOK_MARKET_METRICS=1 every worker exports its own request latencies
+# (metrics.py): worker i on BOOK_MARKET_METRICS_PORT + 1 + i, the parent's port
+# only has the load stages.
+#
+#   python book_service.py --port 8765 --workers 4
+#   BOOK_MARKET_METRICS=1 BOOK_MARKET_METRICS_PORT=9464 python book_service.py --workers 2
+
+PORT = int(os.environ.get("BOOK_MARKET_SERVICE_PORT", 8765))
+WORKERS = int(os.environ.get("BOOK_MARKET_SERVICE_WORKERS", os.cpu_count() or 1))
+MODEL_PATH = "logistic_pipeline.pkl"
+DATA_DIR = "data"
+
+# Similar books fetched per title (at least) before the filters are applied, as on the page
+CANDIDATES = 50
+MAX_TOP_N = 100
+MAX_BATCH = 1000
+MAX_BODY_BYTES = 16 * 2**20
+IDLE_TIMEOUT = 30
+# POST paths with their own request_seconds series; all others are counted as
+# "service/other", so requests for arbitrary paths cannot add new series
+POST_PATHS = ("/recommend", "/recommend/batch", "/predict", "/predict/batch")
+
+
+class ServiceError(Exception):
+    """Invalid or unanswerable request; becomes a JSON error with the HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class BookService:
+    """
+    Recommendations and film predictions over the loaded resources (no HTTP, no
+    Streamlit); the request handler translates JSON into these calls.
+    """
+
+    def __init__(self, books, engine, embeddings=None, norms=None, pipeline=None, model_version=None):
+        """
+        Parameters:
+            books (pd.DataFrame): The book dataset.
+            engine (BookQueryEngine): Query engine of the filters.
+            embeddings: Embedding matrix of the descriptions (None: only filter queries).
+            norms: Row norms of the embeddings.
+            pipeline: Fitted film pipeline (None: no predictions).
+            model_version (str): Version key of the pipeline file.
+        """
+        self.books = books
+        self.engine = engine
+        self.embeddings = embeddings
+        self.norms = norms
+        self.pipeline = pipeline
+        self.model_version = model_version
+
+    @classmethod
+    def load(cls, books_path=BOOKS_CSV, model_path=MODEL_PATH, data_dir=DATA_DIR):
+        """
+        Loads the catalogue, the stored embeddings and the film pipeline. Missing
+        embeddings or a missing pipeline only disable the endpoints that need them.
+
+        Returns:
+            BookService: The service over the loaded resources.
+        """
+        books, genre_lists = read_books(books_path)
+        books = share_numeric_columns(books)
+        engine = load_shared_engine(books, CatalogIndex(books), genre_lists)
+
+        embeddings = norms = None
+        fingerprint = content_fingerprint(books["description"], store_model_name())
+        store_dir = encoder_dir(data_dir=data_dir)
+        if os.path.exists(embeddings_path(fingerprint, store_dir)):
+            # stored by the app (or neighbour_table.py); the service never encodes
+            embeddings = load_or_compute_embeddings(books["description"], None, fingerprint, store_dir)
+            norms = load_or_compute_norms(embeddings, fingerprint, store_dir)
+        else:
+            print(f"⚠️ Keine Embeddings für {fingerprint} in {store_dir}/: "
+                  "/recommend beantwortet nur Anfragen ohne Titel")
+
+        pipeline = model_version = None
+        if os.path.exists(model_path):
+            pipeline = joblib.load(model_path)
+            model_version = dataset_version(model_path)
+        else:
+            print(f"⚠️ {model_path} nicht gefunden: /predict ist nicht verfügbar")
+        return cls(books, engine, embeddings, norms, pipeline, model_version)
+
+    def health(self):
+        return {
+            "status": "ok",
+            "worker": os.getpid(),
+            "books": len(self.books),
+            "similar_books": self.embeddings is not None,
+            "encoder": store_model_name(),
+            "model_version": self.model_version,
+        }
+
+    # RECOMMENDATIONS
+
+    def _book(self, idx, score=None):
+        row = self.books.iloc[idx]
+        return {
+            "index": int(idx),
+            "title": row["title"],
+            "author": None if pd.isna(row["author"]) else str(row["author"]),
+            "publication_year": None if pd.isna(row["publication_year"]) else int(row["publication_year"]),
+            "avg_rating": None if pd.isna(row["avg_rating"]) else float(row["avg_rating"]),
+            "score": None if score is None else float(score),
+        }
+
+    @staticmethod
+    def _parse(request):
+        """Seed, number of results and filters of a recommend request."""
+        if not isinstance(request, dict):
+            raise ServiceError("Anfrage muss ein JSON-Objekt sein")
+        seed = request.get("title", request.get("index"))
+        if seed is not None and not isinstance(seed, (str, int)):
+            raise ServiceError("title muss ein Text, index eine ganze Zahl sein")
+        top_n = request.get("top_n", 5)
+        if not isinstance(top_n, int) or not 1 <= top_n <= MAX_TOP_N:
+            raise ServiceError(f"top_n muss zwischen 1 und {MAX_TOP_N} liegen")
+        try:
+            filters = {"min_rating": float(request.get("min_rating", 0.0))}
+            if request.get("years") is not None:
+                if not isinstance(request["years"], list):
+                    raise TypeError
+                first, last = request["years"]
+                filters["years"] = (int(first), int(last))
+        except (TypeError, ValueError):
+            raise ServiceError("min_rating muss eine Zahl, years [erstes, letztes] Jahr sein")
+        genres = request.get("genres") or []
+        if not isinstance(genres, list) or not all(isinstance(genre, str) for genre in genres):
+            raise ServiceError("genres muss eine Liste von Texten sein")
+        filters["genres"] = genres
+        filters["genre_mode"] = request.get("genre_mode", "all" if seed is not None else "any")
+        if filters["genre_mode"] not in ("any", "all"):
+            raise ServiceError("genre_mode muss 'any' oder 'all' sein")
+        author = request.get("author")
+        if author is not None and not isinstance(author, str):
+            raise ServiceError("author muss ein Text sein")
+        if seed is None and author is not None:
+            filters["author"] = author
+        return seed, top_n, filters
+
+    def _filtered(self, seed_row, ids, scores, top_n, filters):
+        if seed_row < 0:
+            return {"error": "Unbekannter Titel"}
+        keep = ids >= 0
+        ids, scores = ids[keep], scores[keep]
+        matches = self.engine.mask(ids, **filters)
+        return {
+            "seed": self._book(seed_row),
+            "results": [self._book(idx, score) for idx, score in zip(ids[matches][:top_n], scores[matches][:top_n])],
+        }
+
+    def _filter_only(self, top_n, filters):
+        return {
+            "count": self.engine.count(**filters),
+            "results": [self._book(idx) for idx in self.engine.top(top_n, **filters)],
+        }
+
+    def recommend_batch(self, requests):
+        """
+        Answers many recommend requests; the similar books of all titles are computed
+        together (blocked matrix products, see batch_recommendations.py).
+
+        Parameters:
+            requests (list): Recommend requests (see the module comment).
+
+        Returns:
+            list: One result per request ({"seed", "results"}, {"count", "results"} or {"error"}).
+        """
+        if not isinstance(requests, list) or len(requests) > MAX_BATCH:
+            raise ServiceError(f"requests muss eine Liste mit höchstens {MAX_BATCH} Anfragen sein")
+        parsed = [self._parse(request) for request in requests]
+        similar = [i for i, (seed, _, _) in enumerate(parsed) if seed is not None]
+        results = [None] * len(parsed)
+        if similar:
+            if self.embeddings is None:
+                raise ServiceError("Keine Embeddings geladen, nur Anfragen ohne Titel möglich", status=503)
+            with stage("service/similar_books"):
+                seed_rows, ids, scores = recommend_batch(
+                    [parsed[i][0] for i in similar], self.books, self.embeddings,
+                    top_n=max(CANDIDATES, *(parsed[i][1] for i in similar)),
+                    as_frame=False, corpus_norms=self.norms,
+                )
+            for j, i in enumerate(similar):
+                results[i] = self._filtered(seed_rows[j], ids[j], scores[j], parsed[i][1], parsed[i][2])
+        with stage("service/filter_books"):
+            for i, (seed, top_n, filters) in enumerate(parsed):
+                if seed is None:
+                    results[i] = self._filter_only(top_n, filters)
+        return results
+
+    def recommend(self, request):
+        """Answers one recommend request (see recommend_batch); unknown titles are a 404."""
+        result = self.recommend_batch([request])[0]
+        if "error" in result:
+            raise ServiceError(result["error"], status=404)
+        return result
+
+    # FILM PREDICTION
+
+    def predict_batch(self, records, threshold=0.5):
+        """
+        Probabilities of a film adaptation for new books.
+
+        Parameters:
+            records (list): One dict per book with the columns of new_books_2024.csv
+                (Book_Name is ignored, missing values as null).
+            threshold (float): Probability from which a book counts as adapted.
+
+        Returns:
+            list: One {"probability", "adapted"} per record.
+        """
+        if self.pipeline is None:
+            raise ServiceError("Kein Modell geladen", status=503)
+        if not isinstance(records, list) or not records or len(records) > MAX_BATCH:
+            raise ServiceError(f"records muss eine Liste mit 1 bis {MAX_BATCH} Büchern sein")
+        if not all(isinstance(record, dict) for record in records):
+            raise ServiceError("Jedes Buch muss ein JSON-Objekt sein")
+        # null -> NaN, so that numeric columns stay numeric even for a single record
+        X = pd.DataFrame.from_records(records).drop(columns=["Book_Name"], errors="ignore")
+        X = X.astype(object).where(X.notna(), np.nan).infer_objects()
+        with stage("service/predict_proba"):
+            try:
+                proba = self.pipeline.predict_proba(X)[:, 1]
+            except (KeyError, ValueError, TypeError) as e:
+                raise ServiceError(f"Ungültige Buchdaten: {e}")
+        return [{"probability": float(p), "adapted": bool(p >= threshold)} for p in proba]
+
+    def predict(self, record, threshold=0.5):
+        return self.predict_batch([record], threshold)[0]
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """JSON endpoints of a BookService (set as class attribute by make_server)."""
+
+    protocol_version = "HTTP/1.1"
+    timeout = IDLE_TIMEOUT
+    service = None
+    verbose = False
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise ServiceError("Anfrage zu groß", status=413)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ServiceError(f"Kein gültiges JSON: {e}")
+
+    def _threshold(self, payload):
+        threshold = payload.get("threshold", 0.5)
+        if not isinstance(threshold, (int, float)) or not 0 <= threshold <= 1:
+            raise ServiceError("threshold muss zwischen 0 und 1 liegen")
+        return threshold
+
+    def _route(self, path, payload):
+        service = self.service
+        if path == "/recommend":
+            return service.recommend(payload)
+        if path == "/recommend/batch":
+            return {"results": service.recommend_batch(payload.get("requests"))}
+        if path == "/predict":
+            return service.predict(payload.get("record"), self._threshold(payload))
+        if path == "/predict/batch":
+            return {"results": service.predict_batch(payload.get("records"), self._threshold(payload))}
+        raise ServiceError(f"Unbekannter Pfad {path}", status=404)
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/health":
+            self._send(200, self.service.health())
+        else:
+            self._send(404, {"error": f"Unbekannter Pfad {self.path}"})
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        try:
+            payload = self._read_json()
+            if not isinstance(payload, dict):
+                raise ServiceError("Anfrage muss ein JSON-Objekt sein")
+            label = f"service{path}" if path in POST_PATHS else "service/other"
+            with stage(label, family="request_seconds"):
+                self._send(200, self._route(path, payload))
+        except ServiceError as e:
+            self._send(e.status, {"error": str(e)})
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(service, host="127.0.0.1", port=PORT, verbose=False):
+    """Binds the port and returns the (not yet serving) server of the service."""
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service, "verbose": verbose})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def _serve_worker(server):
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os._exit(0)
+
+
+def serve(server, workers=WORKERS):
+    """
+    Serves with `workers` forked processes on the bound socket of the server (one
+    process without fork, e.g. on Windows). A worker that dies is started again
+    under its number; SIGINT/SIGTERM stop all of them. Every worker exports its own
+    metrics (metrics.start_worker_exporters).
+    """
+    if workers <= 1 or not hasattr(os, "fork"):
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    def start_worker(worker):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            start_worker_exporters(worker)
+            _serve_worker(server)
+        return pid
+
+    children = {start_worker(worker): worker for worker in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while children:
+        pid, status = os.wait()
+        worker = children.pop(pid, None)
+        if not stopping and worker is not None:
+            print(f"⚠️ Worker {pid} beendet (Status {status}), starte neu")
+            children[start_worker(worker)] = worker
+    server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON service for recommendations and film predictions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--books", default=BOOKS_CSV, help="Catalogue CSV")
+    parser.add_argument("--model", default=MODEL_PATH, help="Film pipeline (joblib)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    service = BookService.load(args.books, args.model)
+    server = make_server(service, args.host, args.port, args.verbose)
+    print(f"✅ {len(service.books)} Bücher geladen in {time.perf_counter() - start:.1f}s, "
+          f"http://{args.host}:{server.server_address[1]} mit {args.workers} Worker(n)")
+    if METRICS_ENABLED and worker_port(0) and args.workers > 1 and hasattr(os, "fork"):
+        print(f"📈 Metriken der Worker auf Port {worker_port(0)} bis {worker_port(args.workers - 1)}")
+    sys.stdout.flush()
+    serve(server, args.workers)
+
+
+if __name__ == "__main__":
+    main()
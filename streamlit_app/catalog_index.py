@@ -0,0 +1,96 @@
+# catalog_index.py
+
+import re
+import numpy as np
+import pandas as pd
+
+# Hash index from normalized title, author and ISBN keys to row positions.
+# Built once when a dataset is loaded and used by the recommendation and the
+# film page instead of comparing a whole string column per lookup
+# (df[df['title'] == title]). Titles with several editions map to all their rows.
+# With exact=True (and always in first()) the rows whose value is exactly the given
+# one are preferred, so a title or author picked from a list resolves to that
+# spelling even if another one differs only by case; the normalized key is the
+# fallback for typed values.
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Column names of the recommendation dataset (final_books_recommend.csv)
+BOOK_COLUMNS = {"title": "title", "author": "author", "isbn": "isbn"}
+# Column names of the film prediction datasets (new_books_2024.csv, book_data_clean.csv)
+FILM_COLUMNS = {"title": "Book_Name", "author": "Author", "isbn": "ISBN"}
+
+
+def normalize_key(value):
+    """Case-insensitive key with collapsed whitespace, None for missing values."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return _WHITESPACE.sub(" ", str(value)).strip().casefold()
+
+
+def normalize_isbn(value):
+    """ISBN without hyphens and spaces; numbers read as float (9780593798607.0) are fixed."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return re.sub(r"[\s-]", "", str(value)).upper()
+
+
+class CatalogIndex:
+    """
+    Maps normalized keys of selected columns ("title", "author", "isbn") to the row
+    positions of a DataFrame.
+    """
+
+    def __init__(self, df, columns=BOOK_COLUMNS):
+        self.maps = {}
+        self.values = {}
+        for kind, column in columns.items():
+            if column not in df.columns:
+                continue
+            self.values[kind] = df[column].to_numpy(dtype=object)
+            normalize = normalize_isbn if kind == "isbn" else normalize_key
+            keys = df[column].map(normalize)
+            positions = pd.Series(np.arange(len(df), dtype=np.int32))
+            self.maps[kind] = positions.groupby(keys.to_numpy(), dropna=True, sort=False).indices
+
+    def rows(self, kind, value, exact=False):
+        """
+        All row positions for a value.
+
+        Parameters:
+            kind (str): "title", "author" or "isbn".
+            value: The value to look up (normalized like the index keys).
+            exact (bool): Only the rows with exactly this value if there are any
+                (for values picked from a list), else all rows of the normalized key.
+
+        Returns:
+            np.ndarray: Row positions in dataset order (empty if unknown).
+        """
+        normalize = normalize_isbn if kind == "isbn" else normalize_key
+        rows = self.maps.get(kind, {}).get(normalize(value), np.empty(0, dtype=np.int64))
+        if exact and len(rows) > 1:
+            matches = rows[self.values[kind][rows] == value]
+            if len(matches):
+                return matches
+        return rows
+
+    def first(self, kind, value):
+        """
+        First row position with exactly this value, else the first row matching the
+        normalized key, or None if it is unknown.
+        """
+        rows = self.rows(kind, value, exact=True)
+        return int(rows[0]) if len(rows) else None
+
+    def rows_for(self, exact=False, **criteria):
+        """
+        Row positions matching all given criteria, e.g. rows_for(author=..., title=...).
+        exact applies to every criterion (see rows).
+        """
+        result = None
+        for kind, value in criteria.items():
+            rows = self.rows(kind, value, exact)
+            result = rows if result is None else np.intersect1d(result, rows)
+        return result if result is not None else np.empty(0, dtype=np.int64)
@@ -0,0 +1,314 @@
+# chart_cache.py
+
+import argparse
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+import numpy as np
+import pandas as pd
+
+from metrics import stage
+
+# Cache of rendered charts (PNG/SVG bytes) for the dashboard pages and the
+# evaluation plots of the film prediction. Drawing and rasterising a matplotlib
+# figure takes hundreds of milliseconds, so a chart is only rendered once per
+#   chart id + fingerprint of its input data + render parameters + drawing code
+# and served from an LRU cache afterwards. The cache lives in the server process
+# (shared by all sessions); rendered charts are also written to data/chart_cache,
+# so charts prewarmed at deploy time survive a restart. The directory is optional:
+# on a read-only deployment the charts are only kept in memory, and files removed
+# by another process in between count as misses. Its size is tracked as a running
+# total and only scanned when that exceeds the limit (then trimmed to TRIM_RATIO).
+#
+#   python chart_cache.py --prewarm   (renders the default views of all pages)
+#   python chart_cache.py --clear
+
+DATA_DIR = "data"
+CACHE_DIR = os.path.join(DATA_DIR, "chart_cache")
+MAX_MEMORY_MB = int(os.environ.get("BOOK_MARKET_CHART_CACHE_MB", 64))
+MAX_DISK_MB = int(os.environ.get("BOOK_MARKET_CHART_DISK_MB", 256))
+
+# Share of the disk limit kept after a trim, so not every following put trims again
+TRIM_RATIO = 0.8
+
+# Same output as st.pyplot
+SAVE_OPTIONS = {"dpi": 200, "bbox_inches": "tight"}
+
+
+def data_fingerprint(data):
+    """
+    Content hash of chart input data (pandas objects, arrays, scalars and nested
+    lists/tuples/dicts of them).
+    """
+    digest = hashlib.sha1()
+
+    def update(value):
+        if isinstance(value, (pd.Series, pd.DataFrame, pd.Index)):
+            digest.update(repr((type(value).__name__, getattr(value, "name", None))).encode("utf-8"))
+            if isinstance(value, pd.DataFrame):
+                digest.update(repr(list(value.columns)).encode("utf-8"))
+            digest.update(pd.util.hash_pandas_object(value, index=not isinstance(value, pd.Index)).to_numpy().tobytes())
+        elif isinstance(value, np.ndarray):
+            digest.update(repr((value.dtype.str, value.shape)).encode("utf-8"))
+            digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode("utf-8"))
+        elif isinstance(value, dict):
+            for k in sorted(value, key=repr):
+                update(k)
+                update(value[k])
+        elif isinstance(value, (list, tuple)):
+            digest.update(f"{type(value).__name__}{len(value)}".encode("utf-8"))
+            for item in value:
+                update(item)
+        else:
+            digest.update(repr(value).encode("utf-8"))
+
+    update(data)
+    return digest.hexdigest()
+
+
+def code_fingerprint(func):
+    """Hash of a function's bytecode and constants, so changed drawing code is not served from the cache."""
+    digest = hashlib.sha1()
+
+    def update(code):
+        digest.update(code.co_code)
+        digest.update(repr(code.co_names).encode("utf-8"))
+        for const in code.co_consts:
+            # nested functions: hash their code, their repr contains a memory address
+            if hasattr(const, "co_code"):
+                update(const)
+            else:
+                digest.update(repr(const).encode("utf-8"))
+
+    update(func.__code__)
+    return digest.hexdigest()[:12]
+
+
+class ChartCache:
+    """
+    LRU cache of rendered chart bytes, bounded by total size, with an optional
+    directory as second tier.
+    """
+
+    def __init__(self, max_bytes=MAX_MEMORY_MB * 2**20, cache_dir=CACHE_DIR, max_disk_bytes=MAX_DISK_MB * 2**20):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        # bytes in cache_dir as far as this process knows (None: not scanned yet)
+        self.disk_bytes = None
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+        if self.cache_dir and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), "rb") as f:
+                    image = f.read()
+            except OSError:
+                # removed by another process meanwhile
+                image = None
+            if image is not None:
+                self._put_memory(key, image)
+                with self.lock:
+                    self.hits += 1
+                return image
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def _put_memory(self, key, image):
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            self.entries[key] = image
+            self.size += len(image)
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def put(self, key, image):
+        self._put_memory(key, image)
+        if not self.cache_dir:
+            return
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(image)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            # read-only or full disk: the chart stays in the memory tier only
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self.lock:
+            if self.disk_bytes is not None:
+                self.disk_bytes += len(image)
+            trim = self.disk_bytes is None or self.disk_bytes > self.max_disk_bytes
+        if trim:
+            self._trim_disk()
+
+    def _trim_disk(self):
+        """Deletes the oldest files beyond TRIM_RATIO of the limit (once over the limit)."""
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        stats = []
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stats.append((stat.st_mtime, stat.st_size, path))
+        stats.sort(reverse=True)
+
+        total = sum(size for _, size, _ in stats)
+        keep = self.max_disk_bytes * TRIM_RATIO if total > self.max_disk_bytes else self.max_disk_bytes
+        total = 0
+        for _, size, path in stats:
+            if total + size > keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            total += size
+        with self.lock:
+            self.disk_bytes = total
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+        with self.lock:
+            self.disk_bytes = 0 if self.cache_dir else None
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+# One cache per server process
+CHART_CACHE = ChartCache()
+
+
+def chart_key(chart_id, draw, data=None, fmt="png", **params):
+    """
+    Cache key of a chart: id, input data, parameters, format and drawing code.
+    """
+    digest = hashlib.sha1()
+    for part in (chart_id, data_fingerprint(data), data_fingerprint(params), fmt, code_fingerprint(draw)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return f"{digest.hexdigest()}.{fmt}"
+
+
+def render_chart(chart_id, draw, data=None, fmt="png", cache=None, **params):
+    """
+    Returns the encoded image of a chart, rendered only on a cache miss.
+
+    Parameters:
+        chart_id (str): Name of the chart, e.g. "verfilmung/top_genres".
+        draw: Function draw(data, **params) -> matplotlib figure. Everything the
+            figure depends on must be passed as data or params, not read from outside.
+        data: The (aggregated) input data of the chart.
+        fmt (str): "png" or "svg".
+        cache (ChartCache): The cache to use (default: the process-wide cache).
+        **params: Render parameters (year range, threshold, sizes, ...).
+
+    Returns:
+        bytes: The encoded image.
+    """
+    import matplotlib.pyplot as plt
+
+    cache = cache or CHART_CACHE
+    key = chart_key(chart_id, draw, data, fmt, **params)
+    image = cache.get(key)
+    if image is None:
+        with stage("chart_render"):
+            fig = draw(data, **params)
+            buffer = BytesIO()
+            fig.savefig(buffer, format=fmt, **SAVE_OPTIONS)
+            plt.close(fig)
+            image = buffer.getvalue()
+        cache.put(key, image)
+    return image
+
+
+def prewarm(pages, timeout=600):
+    """
+    Renders the default views of the pages headless (Streamlit AppTest): each page
+    once per option of its chart selection in the sidebar. The charts end up in
+    the cache directory.
+
+    Parameters:
+        pages (list): (script path, sidebar radio label, options) per page. Every given
+            option (None: all options) of the radio is shown once.
+        timeout (int): Seconds per script run.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    for script, radio_label, options in pages:
+        app = AppTest.from_file(script, default_timeout=timeout).run()
+        labels = [radio.label for radio in app.sidebar.radio]
+        if radio_label not in labels:
+            print(f"⚠️ {script}: Auswahl '{radio_label}' nicht gefunden")
+            continue
+        position = labels.index(radio_label)
+        for option in options or app.sidebar.radio[position].options:
+            app.sidebar.radio[position].set_value(option).run()
+            if app.exception:
+                print(f"⚠️ {script} ({option}): {app.exception[0].message}")
+        print(f"✅ {script}")
+
+
+# Pages with cached charts: script, sidebar radio that selects the view, views to render
+PREWARM_PAGES = [
+    ("pages/_Verfilmung-Buchdaten.py", "🔘 Welche Grafik möchtest du sehen?", None),
+    ("pages/_Empfehlung-Buchdaten.py", "Welche Grafik möchtest du sehen?", None),
+    ("app.py", "Wähle eine Funktion:", ["Verfilmungsprognose"]),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chart cache of the dashboard pages")
+    parser.add_argument("--prewarm", action="store_true", help="Render the default views of all pages")
+    parser.add_argument("--clear", action="store_true", help="Delete all cached charts")
+    args = parser.parse_args()
+
+    if args.clear:
+        CHART_CACHE.clear()
+        print(f"🗑️ Chart-Cache geleert: {CACHE_DIR}")
+    if args.prewarm:
+        prewarm(PREWARM_PAGES)
+        n_files = len(os.listdir(CACHE_DIR)) if os.path.isdir(CACHE_DIR) else 0
+        print(f"✅ {n_files} Grafiken im Cache: {CACHE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
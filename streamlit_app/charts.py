@@ -0,0 +1,134 @@
+# charts.py
+
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+# Drawing functions of the dashboard and evaluation charts. Each one gets its
+# input data and render parameters only as arguments and returns the figure, so
+# the pages can hand them to chart_cache.render_chart and reuse rendered images.
+
+
+def line_chart(series, color, title, xlabel, ylabel, marker=None, grid=True, figsize=(6, 4)):
+    """Line plot of a Series (index on the x-axis)."""
+    fig, ax = plt.subplots(figsize=figsize)
+    ax.plot(series.index, series.values, marker=marker, color=color)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(grid)
+    return fig
+
+
+def bar_chart(series, color, title, xlabel=None, ylabel=None, horizontal=False,
+              rotate_labels=False, figsize=(6, 4)):
+    """Bar plot of a Series (e.g. counts per category)."""
+    fig, ax = plt.subplots(figsize=figsize)
+    series.plot(kind="barh" if horizontal else "bar", ax=ax, color=color)
+    ax.set_title(title)
+    if xlabel is not None:
+        ax.set_xlabel(xlabel)
+    if ylabel is not None:
+        ax.set_ylabel(ylabel)
+    if rotate_labels:
+        ax.set_xticklabels(series.index, rotation=45, ha="right")
+    return fig
+
+
+def histogram_chart(data, bins, color, title, xlabel, ylabel, kde=False, edgecolor=None,
+                    grid=False, figsize=(6, 4)):
+    """
+    Histogram of pre-counted values.
+
+    Parameters:
+        data (tuple): (values, weights), e.g. bucket starts and counts per bucket.
+        bins: Number of bins or bin edges.
+    """
+    values, weights = data
+    # seaborn compares bins with "auto", so edges are passed as a list
+    bins = bins if np.isscalar(bins) else list(bins)
+    fig, ax = plt.subplots(figsize=figsize)
+    sns.histplot(x=np.asarray(values), weights=np.asarray(weights), bins=bins, kde=kde,
+                 color=color, edgecolor=edgecolor, ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(grid)
+    return fig
+
+
+def pie_chart(series, title, colors, labels=None, autopct="%1.1f%%", figsize=None):
+    """Pie chart with percentages (labels default to the index of the Series)."""
+    fig, ax = plt.subplots(figsize=figsize)
+    ax.pie(series.values, labels=labels if labels is not None else series.index,
+           autopct=autopct, colors=colors)
+    ax.set_title(title)
+    ax.set_ylabel("")
+    return fig
+
+
+def scatter_chart(frame, title, xlabel, ylabel, cmap=None, color=None, alpha=0.7, log_y=False,
+                  colorbar_label=None, colorbar_ticks=None, colorbar_ticklabels=None,
+                  edgecolors="k", grid=True, figsize=(7, 5)):
+    """
+    Scatter plot of the columns x and y of a DataFrame, coloured by its column c
+    (colour scale) if present, else in one colour.
+    """
+    fig, ax = plt.subplots(figsize=figsize)
+    if "c" in frame:
+        points = ax.scatter(frame["x"], frame["y"], c=frame["c"], cmap=cmap, alpha=alpha,
+                            edgecolors=edgecolors)
+        cbar = plt.colorbar(points, ax=ax)
+        if colorbar_label:
+            cbar.set_label(colorbar_label)
+        if colorbar_ticks:
+            cbar.set_ticks(colorbar_ticks)
+            cbar.set_ticklabels(colorbar_ticklabels)
+    else:
+        sns.scatterplot(x=frame["x"], y=frame["y"], alpha=alpha, color=color, ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    if log_y:
+        ax.set_yscale("log")
+    ax.grid(grid)
+    return fig
+
+
+def confusion_matrix_chart(cm, labels=("Nicht verfilmt", "Verfilmt")):
+    """Confusion matrix as heatmap (film prediction evaluation)."""
+    fig, ax = plt.subplots(figsize=(2, 2), dpi=100)
+    sns.heatmap(
+        cm,
+        annot=True,
+        fmt="g",
+        cmap="RdYlGn",
+        cbar=False,
+        xticklabels=list(labels),
+        yticklabels=list(labels),
+        annot_kws={"size": 6, "color": "black"},
+        ax=ax,
+    )
+    ax.set_xlabel("Vorhergesagte Klasse", fontsize=8)
+    ax.set_ylabel("Tatsächliche Klasse", fontsize=8)
+    ax.tick_params(axis="x", labelsize=6)
+    ax.tick_params(axis="y", labelsize=6)
+    fig.tight_layout(pad=0.1)
+    # Achsen-Position nach rechts verschieben (x0 verschieben)
+    pos = ax.get_position()
+    ax.set_position([pos.x0 + 0.4, pos.y0, pos.width, pos.height])
+    return fig
+
+
+def precision_recall_chart(curve):
+    """Precision-recall curve from (recall, precision) arrays."""
+    recall, precision = curve
+    fig, ax = plt.subplots(figsize=(2.2, 2.2), dpi=100)
+    ax.plot(recall, precision, color="blue")
+    ax.set_xlabel("Recall", fontsize=8)
+    ax.set_ylabel("Precision", fontsize=8)
+    ax.set_title("Precision vs. Recall", fontsize=9)
+    ax.grid(True)
+    ax.tick_params(axis="both", labelsize=6)
+    fig.tight_layout(pad=0.1)
+    return fig
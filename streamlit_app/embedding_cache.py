@@ -0,0 +1,41 @@
+# embedding_cache.py
+
+import warnings
+import streamlit as st
+import torch
+from embedding_store import load_or_compute_embeddings
+from encoder_backends import encoder_dir
+from resources import budgeted
+
+# Cached loader of the embedding matrix of the recommendation page. It loads
+# nothing at import, so benchmarks/bench_embedding_cache.py can time the cache
+# lookup of a rerun outside the page.
+
+# Load (or compute once) the text embeddings for all original book descriptions
+@budgeted("books/embeddings", pinned=True)
+@st.cache_resource
+def load_embeddings(fingerprint, _model, _descriptions):
+    """
+    Loads the stored embeddings for the fingerprint or computes them with the loaded
+    model. Cached as a shared resource under the short fingerprint, so a rerun
+    neither hashes the descriptions nor copies the matrix.
+
+    Parameters:
+        fingerprint (str): Content fingerprint of the descriptions (cache key).
+        _model: The pre-trained language model (SentenceTransformer).
+        _descriptions: The book descriptions ("description" column).
+
+    Returns:
+        tensor: The embeddings as a 2D-tensor (PyTorch-Tensor) over the read-only
+        mapped matrix, shared by all sessions and server processes, never modified.
+    """
+    matrix = load_or_compute_embeddings(
+        _descriptions,
+        lambda texts: _model.encode(texts, convert_to_numpy=True, show_progress_bar=False),
+        fingerprint,
+        encoder_dir()
+    )
+    # The tensor shares the memory of the read-only array (no copy)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.from_numpy(matrix)
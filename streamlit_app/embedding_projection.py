@@ -0,0 +1,203 @@
+# embedding_projection.py
+
+import os
+import numpy as np
+import joblib
+from sklearn.decomposition import PCA
+
+# This module reduces the 768-dimensional sentence embeddings to a smaller space.
+# The reduced vectors are used as a fast first stage in find_similar_books
+# (candidates are re-ranked with the full embeddings afterwards), the 2-D
+# projection drives the corpus map on the recommendation page.
+
+DATA_DIR = "data"
+DEFAULT_METHOD = os.environ.get("BOOK_MARKET_PROJECTION_METHOD", "pca")
+DEFAULT_DIM = int(os.environ.get("BOOK_MARKET_PROJECTION_DIM", 128))
+BENCHMARK_DIMS = (64, 128, 192, 256)
+MAP_DIM = 2
+
+# Number of first-stage candidates per requested result
+CANDIDATE_FACTOR = 10
+MIN_CANDIDATES = 100
+
+
+def to_numpy(embeddings):
+    """
+    Converts an embedding matrix (PyTorch tensor or array) into a float32 numpy array.
+
+    Parameters:
+        embeddings: A 2D tensor or array of embeddings.
+
+    Returns:
+        np.ndarray: The embeddings as float32 array.
+    """
+    if hasattr(embeddings, "detach"):
+        embeddings = embeddings.detach().cpu().numpy()
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def normalize_rows(matrix):
+    """
+    Scales every row to unit length, so that a dot product equals the cosine similarity.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class EmbeddingProjection:
+    """
+    A fitted reducer (PCA or UMAP) together with the reduced, normalized corpus vectors.
+    `fingerprint` identifies the embeddings it was fitted on (embedding_store).
+    """
+
+    def __init__(self, reducer, method, n_components, vectors, normalized=True, fingerprint=None):
+        self.reducer = reducer
+        self.method = method
+        self.n_components = n_components
+        self.vectors = vectors
+        self.normalized = normalized
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def transform(self, embeddings):
+        """
+        Projects full embeddings into the reduced space.
+
+        Parameters:
+            embeddings: A single embedding or a 2D matrix of embeddings.
+
+        Returns:
+            np.ndarray: The reduced vectors, normalized for search projections (always 2D).
+        """
+        embeddings = normalize_rows(np.atleast_2d(to_numpy(embeddings)))
+        reduced = self.reducer.transform(embeddings).astype(np.float32)
+        return normalize_rows(reduced) if self.normalized else reduced
+
+    def search(self, embedding, k):
+        """
+        First-stage retrieval: finds the k corpus rows closest to the given embedding
+        in the reduced space.
+
+        Parameters:
+            embedding: The full embedding of the query book.
+            k (int): Number of candidates to return.
+
+        Returns:
+            np.ndarray: Row positions of the candidates, best first.
+        """
+        query = self.transform(embedding)[0]
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        return candidates[np.argsort(-scores[candidates])]
+
+
+def fit_projection(
+    embeddings, n_components=DEFAULT_DIM, method=DEFAULT_METHOD, normalize=True, random_state=42
+):
+    """
+    Fits a dimensionality reduction on the normalized embeddings.
+
+    Parameters:
+        embeddings: The full embeddings of all books (tensor or array).
+        n_components (int): Target dimension (64-256 for search, 2 for the corpus map).
+        method (str): "pca" (default) or "umap".
+        normalize (bool): Scale the reduced vectors to unit length (needed for search,
+            not wanted for map coordinates).
+        random_state (int): Seed for reproducible projections.
+
+    Returns:
+        EmbeddingProjection: The fitted projection including the reduced corpus vectors.
+    """
+    matrix = normalize_rows(to_numpy(embeddings))
+    if not 2 <= n_components <= matrix.shape[1]:
+        raise ValueError(
+            f"n_components must be between 2 and {matrix.shape[1]}, got {n_components}"
+        )
+
+    if method == "pca":
+        reducer = PCA(n_components=n_components, random_state=random_state)
+    elif method == "umap":
+        import umap  # optional, only needed for the UMAP projection
+
+        reducer = umap.UMAP(
+            n_components=n_components, metric="cosine", random_state=random_state
+        )
+    else:
+        raise ValueError(f"Unknown projection method: {method!r}")
+
+    vectors = reducer.fit_transform(matrix).astype(np.float32)
+    if normalize:
+        vectors = normalize_rows(vectors)
+    return EmbeddingProjection(reducer, method, n_components, vectors, normalized=normalize)
+
+
+def projection_path(method=DEFAULT_METHOD, n_components=DEFAULT_DIM, data_dir=DATA_DIR):
+    """Returns the file path of a stored projection, next to the embeddings it was fitted on."""
+    return os.path.join(data_dir, f"projection_{method}_{n_components}.joblib")
+
+
+def save_projection(projection, path=None):
+    path = path or projection_path(projection.method, projection.n_components)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    joblib.dump(projection, path)
+    return path
+
+
+def load_or_fit_projection(
+    embeddings, n_components=DEFAULT_DIM, method=DEFAULT_METHOD, data_dir=DATA_DIR, fingerprint=None
+):
+    """
+    Loads a stored projection if it was fitted on the same embeddings, otherwise
+    fits and stores a new one.
+
+    Parameters:
+        embeddings: The full embeddings of all books (tensor or array).
+        n_components (int): Target dimension.
+        method (str): "pca" or "umap".
+        data_dir (str): Directory of the stored projection (one per encoder, see
+            encoder_backends.encoder_dir).
+        fingerprint (str): content_fingerprint of the embeddings; a stored projection
+            is only reused if it was fitted on the same one (without: same row count).
+
+    Returns:
+        EmbeddingProjection: The projection for the current corpus.
+    """
+    path = projection_path(method, n_components, data_dir)
+    if os.path.exists(path):
+        projection = joblib.load(path)
+        stored = getattr(projection, "fingerprint", None)
+        if len(projection) == len(embeddings) and (fingerprint is None or stored == fingerprint):
+            return projection
+
+    projection = fit_projection(
+        embeddings,
+        n_components=n_components,
+        method=method,
+        normalize=n_components != MAP_DIM,
+    )
+    projection.fingerprint = fingerprint
+    try:
+        save_projection(projection, path)
+    except OSError:
+        # read-only deployments still work, the projection is just refitted next time
+        pass
+    return projection
+
+
+def corpus_map_coordinates(embeddings, method=DEFAULT_METHOD, data_dir=DATA_DIR, fingerprint=None):
+    """
+    Returns the 2-D coordinates of all books for the corpus map.
+    """
+    return load_or_fit_projection(
+        embeddings, n_components=MAP_DIM, method=method, data_dir=data_dir, fingerprint=fingerprint
+    ).vectors
+
+
+def candidate_count(top_n):
+    """Size of the first-stage candidate pool for top_n results."""
+    return max(MIN_CANDIDATES, CANDIDATE_FACTOR * (top_n + 1))
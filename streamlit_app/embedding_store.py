@@ -0,0 +1,131 @@
+# embedding_store.py
+
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+
+# Persistent store for the description embeddings. The embeddings are keyed by a
+# fingerprint of the model name and the description texts, computed once when the
+# dataset is loaded. The Streamlit page caches the matrix as a shared resource
+# under that short key, so a rerun neither hashes thousands of descriptions nor
+# deserializes a fresh copy of the matrix (which st.cache_data does per call).
+# The file is mapped read-only instead of read into the process: all server
+# processes of a node share its pages, and similarity searches run on the mapped
+# matrix (cosine_scores divides by the stored row norms instead of normalizing a
+# copy of the whole matrix per query).
+#
+#   data/embeddings_<fingerprint>.npy         float32 (n_books x dim)
+#   data/embeddings_<fingerprint>_norms.npy   float32 (n_books), row lengths
+
+DATA_DIR = "data"
+MODEL_NAME = "all-mpnet-base-v2"
+
+
+def content_fingerprint(descriptions, model_name=MODEL_NAME):
+    """
+    Fingerprint of the texts to encode and the model, in row order.
+
+    Parameters:
+        descriptions: The book descriptions (list or pd.Series).
+        model_name (str): Name of the encoder model.
+
+    Returns:
+        str: 16 hex characters, changes whenever a description, the row order or
+        the model changes.
+    """
+    row_hashes = pd.util.hash_pandas_object(
+        pd.Series(descriptions, dtype=object).fillna(""), index=False
+    ).to_numpy()
+    digest = hashlib.sha1(model_name.encode("utf-8"))
+    digest.update(row_hashes.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def embeddings_path(fingerprint, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"embeddings_{fingerprint}.npy")
+
+
+def norms_path(fingerprint, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"embeddings_{fingerprint}_norms.npy")
+
+
+def _save(path, array):
+    # write to a temporary file first, so a crash never leaves a truncated matrix
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def load_or_compute_embeddings(descriptions, encode, fingerprint, data_dir=DATA_DIR):
+    """
+    Loads the stored embeddings for a fingerprint, or encodes the descriptions and
+    stores them.
+
+    Parameters:
+        descriptions: The book descriptions in row order.
+        encode: Function list of texts -> 2D array (e.g. a model's encode method).
+        fingerprint (str): content_fingerprint of the descriptions.
+        data_dir (str): Directory of the stored matrices.
+
+    Returns:
+        np.memmap: The float32 embedding matrix, mapped read-only (it is shared by
+        all sessions and server processes and must not be modified in place).
+    """
+    path = embeddings_path(fingerprint, data_dir)
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        _save(path, np.ascontiguousarray(encode(list(descriptions)), dtype=np.float32))
+    embeddings = np.load(path, mmap_mode="r")
+
+    if len(embeddings) != len(descriptions):
+        raise ValueError(
+            f"{path} hat {len(embeddings)} Zeilen, erwartet {len(descriptions)}"
+        )
+    return embeddings
+
+
+def load_or_compute_norms(embeddings, fingerprint, data_dir=DATA_DIR):
+    """
+    Loads (or computes once) the length of every embedding row, mapped read-only.
+
+    Parameters:
+        embeddings: The embedding matrix (see load_or_compute_embeddings).
+        fingerprint (str): content_fingerprint of the descriptions.
+        data_dir (str): Directory of the stored matrices.
+
+    Returns:
+        np.memmap: float32 array with one norm per row.
+    """
+    path = norms_path(fingerprint, data_dir)
+    if not os.path.exists(path):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        # row by row dot products, no temporary copy of the matrix
+        _save(path, np.sqrt(np.einsum("ij,ij->i", matrix, matrix)).astype(np.float32))
+    norms = np.load(path, mmap_mode="r")
+    if len(norms) != len(embeddings):
+        raise ValueError(f"{path} hat {len(norms)} Zeilen, erwartet {len(embeddings)}")
+    return norms
+
+
+def cosine_scores(query, embeddings, norms, rows=None):
+    """
+    Cosine similarity of one query vector to the rows of the embedding matrix.
+
+    Works on the mapped matrix as it is: one matrix-vector product, divided by the
+    stored row norms (only the candidate rows are read if `rows` is given).
+
+    Parameters:
+        query: The query embedding (dim,).
+        embeddings: The embedding matrix (n_books x dim), array or memmap.
+        norms: Row norms of the matrix (see load_or_compute_norms).
+        rows: Optional row positions; the scores are then in this order.
+
+    Returns:
+        np.ndarray: float32 scores, one per (selected) row.
+    """
+    query = np.asarray(query, dtype=np.float32).reshape(-1)
+    if rows is not None:
+        embeddings, norms = embeddings[rows], norms[rows]
+    scores = np.asarray(embeddings, dtype=np.float32) @ query
+    return scores / np.maximum(norms * np.linalg.norm(query), 1e-8)
@@ -0,0 +1,109 @@
+# encoder_backends.py
+
+import os
+
+from embedding_store import DATA_DIR, MODEL_NAME
+
+# Registered description encoders (SentenceTransformer models), selected with
+# BOOK_MARKET_ENCODER. Smaller models encode much faster at some cost in quality;
+# benchmarks/bench_encoders.py compares them on the catalogue.
+#   mpnet                all-mpnet-base-v2, 768 dimensions, 12 layers (default)
+#   minilm-l12           all-MiniLM-L12-v2, 384 dimensions, 12 layers
+#   minilm-l6            all-MiniLM-L6-v2, 384 dimensions, 6 layers
+#   multilingual-minilm  paraphrase-multilingual-MiniLM-L12-v2, 384 dimensions,
+#                        also for German queries
+# Every encoder (and variant, see below) keeps its embeddings and search indexes
+# (projection, corpus map, neighbour table) in its own directory (encoder_dir), so
+# switching the model never mixes two vector spaces. The default model in float
+# keeps the existing files directly under data/.
+#
+#   BOOK_MARKET_ENCODER=minilm-l6 python neighbour_table.py
+#   BOOK_MARKET_ENCODER=minilm-l6 streamlit run app.py
+
+ENCODERS = {
+    "mpnet": MODEL_NAME,
+    "minilm-l12": "all-MiniLM-L12-v2",
+    "minilm-l6": "all-MiniLM-L6-v2",
+    "multilingual-minilm": "paraphrase-multilingual-MiniLM-L12-v2",
+}
+DEFAULT_ENCODER = "mpnet"
+ENCODER = os.environ.get("BOOK_MARKET_ENCODER", DEFAULT_ENCODER)
+
+# CPU variants of the description encoder:
+#   float      the model in float32, as before (default)
+#   int8       the same model with dynamically quantized linear layers: int8 weights,
+#              the activations are quantized per batch at runtime (torch)
+#   onnx       the exported ONNX graph on onnxruntime (sentence-transformers
+#              backend="onnx", needs optimum[onnxruntime]; exported on first use
+#              if the model repository has no ONNX file)
+#   onnx-int8  the int8-quantized ONNX graph of the model repository (ONNX_FILE)
+# The variants give slightly different embeddings (see
+# benchmarks/bench_encoder_backends.py for speed and cosine drift), so they are
+# stored per variant as well.
+#
+#   BOOK_MARKET_ENCODER_BACKEND=int8 streamlit run app.py
+
+ENCODER_BACKEND = os.environ.get("BOOK_MARKET_ENCODER_BACKEND", "float")
+BACKENDS = ("float", "int8", "onnx", "onnx-int8")
+# Quantized graph for onnx-int8 (sentence-transformers repositories ship several:
+# model_qint8_avx512.onnx, model_qint8_avx512_vnni.onnx, model_quint8_avx2.onnx, ...)
+ONNX_FILE = os.environ.get("BOOK_MARKET_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+
+
+def model_name(encoder=ENCODER):
+    """SentenceTransformer name of a registered encoder (registry key or model name)."""
+    if encoder in ENCODERS:
+        return ENCODERS[encoder]
+    if encoder in ENCODERS.values():
+        return encoder
+    raise ValueError(f"Unknown encoder: {encoder!r} (one of {', '.join(ENCODERS)})")
+
+
+def store_model_name(encoder=ENCODER, backend=ENCODER_BACKEND):
+    """Model name in the fingerprint of the stored embeddings (per encoder and variant)."""
+    name = model_name(encoder)
+    return name if backend == "float" else f"{name}:{backend}"
+
+
+def encoder_dir(encoder=ENCODER, backend=ENCODER_BACKEND, data_dir=DATA_DIR):
+    """
+    Directory of the embeddings and search indexes of an encoder variant.
+
+    Returns:
+        str: data_dir itself for the default model in float (the existing files),
+        otherwise data_dir/encoders/<name>[-<variant>].
+    """
+    name = model_name(encoder)
+    if name == ENCODERS[DEFAULT_ENCODER] and backend == "float":
+        return data_dir
+    if backend != "float":
+        name = f"{name}-{backend}"
+    return os.path.join(data_dir, "encoders", name)
+
+
+def load_sentence_encoder(encoder=ENCODER, backend=ENCODER_BACKEND):
+    """
+    Loads a registered description encoder in one of the CPU variants.
+
+    Parameters:
+        encoder (str): Registry key (or SentenceTransformer name) of the encoder.
+        backend (str): "float", "int8", "onnx" or "onnx-int8".
+
+    Returns:
+        SentenceTransformer: The model; encode() works the same for all variants.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend!r} (one of {', '.join(BACKENDS)})")
+    from sentence_transformers import SentenceTransformer
+
+    name = model_name(encoder)
+    if backend == "float":
+        return SentenceTransformer(name)
+    if backend == "int8":
+        import torch
+
+        model = SentenceTransformer(name, device="cpu")
+        model.eval()
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model_kwargs = {"file_name": ONNX_FILE} if backend == "onnx-int8" else None
+    return SentenceTransformer(name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
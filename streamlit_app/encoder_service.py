@@ -0,0 +1,129 @@
+# encoder_service.py
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Shared encoder for query texts of all sessions. Every session used to call
+# model.encode with its single query; with several sessions at once the CPU model
+# ran many forward passes of batch size 1 in parallel, all competing for the same
+# torch threads. The service queues the texts of all callers and one worker thread
+# encodes them in micro-batches: a batch takes every text queued so far and, while
+# several sessions are encoding, waits up to MAX_WAIT_MS for more (at most MAX_BATCH
+# texts); then it runs one forward pass and hands every caller its rows. Texts that
+# arrive during a forward pass form the next batch. A lone caller on an idle server
+# does not wait; under concurrency the forward passes get fewer and larger.
+#
+#   service = EncoderService(lambda texts: model.encode(texts, convert_to_numpy=True))
+#   vector = service.encode("dragons school magic")     # (dim,)
+#   matrix = service.encode(["query 1", "query 2"])     # (2, dim)
+
+MAX_BATCH = int(os.environ.get("BOOK_MARKET_ENCODER_BATCH", 32))
+MAX_WAIT_MS = float(os.environ.get("BOOK_MARKET_ENCODER_WAIT_MS", 5))
+# Threads of torch for the forward passes (unset: torch default, one per core)
+TORCH_THREADS = os.environ.get("BOOK_MARKET_TORCH_THREADS")
+
+
+def configure_torch_threads(threads=TORCH_THREADS):
+    """Sets the number of torch threads (intra-op) if configured; returns the number in use."""
+    import torch
+
+    if threads:
+        torch.set_num_threads(int(threads))
+    return torch.get_num_threads()
+
+
+class EncoderService:
+    """Micro-batching encoder: many callers, one worker thread, one forward pass per batch."""
+
+    def __init__(self, encode_batch, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        """
+        Parameters:
+            encode_batch (callable): Encodes a list of texts into an array (one row per text).
+            max_batch (int): Maximum number of texts per forward pass.
+            max_wait_ms (float): Maximum time the first text of a batch waits for more.
+        """
+        self.encode_batch = encode_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+        self.last_requests = 0
+        self.worker = threading.Thread(target=self._run, name="EncoderService", daemon=True)
+        self.worker.start()
+
+    def submit(self, texts):
+        """Queues a list of texts; the future resolves to their rows."""
+        future = Future()
+        self.requests.put((list(texts), future))
+        return future
+
+    def encode(self, texts, timeout=None):
+        """
+        Encodes one text or a list of texts through the shared micro-batches.
+
+        Parameters:
+            texts (str or list): The text(s) to encode.
+            timeout (float): Seconds to wait for the result (default: no limit).
+
+        Returns:
+            np.ndarray: The embedding (dim,) of a single text, or (n, dim) for a list.
+        """
+        if isinstance(texts, str):
+            return self.submit([texts]).result(timeout)[0]
+        return self.submit(texts).result(timeout)
+
+    def _collect(self):
+        """
+        Blocks for the first request and takes everything queued meanwhile. While
+        the batch has fewer callers than the previous one (the concurrency seen
+        last), it waits up to max_wait for more; a lone caller on an idle server
+        is encoded right away.
+        """
+        batch = [self.requests.get()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if len(batch) < self.last_requests and remaining > 0:
+                    request = self.requests.get(timeout=remaining)
+                else:
+                    request = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request[0])
+        self.last_requests = len(batch)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                rows = np.asarray(self.encode_batch(texts)) if texts else np.empty((0, 0), dtype=np.float32)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            start = 0
+            for request_texts, future in batch:
+                future.set_result(rows[start:start + len(request_texts)])
+                start += len(request_texts)
+
+    def stats(self):
+        """Number of forward passes, encoded texts and the mean batch size so far."""
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch": self.texts / self.batches if self.batches else 0.0,
+            "queued": self.requests.qsize(),
+        }
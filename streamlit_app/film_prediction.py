@@ -1,8 +1,17 @@
 from trans_author import AuthorRatingMapper
+from autocomplete import AutocompleteIndex
+from catalog_index import CatalogIndex, FILM_COLUMNS
+from chart_cache import render_chart
+from charts import confusion_matrix_chart, precision_recall_chart
+from rerun_timing import timed
+from metrics import stage
+from resources import budgeted
+from year_cube import dataset_version
+from service_client import load_client, to_records
 import joblib
+import numpy as np
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from sklearn.metrics import (
     recall_score,
     confusion_matrix,
@@ -12,7 +21,64 @@ from sklearn.metrics import (
     roc_auc_score,
     precision_recall_curve,
 )
-import seaborn as sns
+
+
+MODEL_PATH = "logistic_pipeline.pkl"
+HISTORY_PATH = "data/book_data_clean.csv"
+
+# Mit BOOK_MARKET_SERVICE_URL rechnet book_service.py die Wahrscheinlichkeiten,
+# die Pipeline wird dann nicht in den Streamlit-Prozess geladen
+service = load_client()
+
+
+@budgeted("film/new_books")
+@st.cache_resource
+def load_prediction_data(csv_path="data/new_books_2024.csv"):
+    # Neuerscheinungen einmal laden und die Indizes aufbauen:
+    # Katalog-Index (Autor/Titel/ISBN -> Zeilen) und Autoren-Suchindex für die Auswahl
+    with stage("load_new_books"):
+        df_pred = pd.read_csv(csv_path, encoding="utf-8")
+    df_pred.columns = df_pred.columns.str.strip()
+    return df_pred, CatalogIndex(df_pred, FILM_COLUMNS), AutocompleteIndex(df_pred["Author"])
+
+
+@budgeted("film/pipeline")
+@st.cache_resource
+def load_pipeline(version):
+    # Modell einmal pro Dateiversion laden statt bei jedem Rerun
+    with stage("load_model"):
+        return joblib.load(MODEL_PATH)
+
+
+def predict_proba(pipeline, X):
+    # Wahrscheinlichkeit der Verfilmung pro Zeile: lokal oder über den Dienst (pipeline=None)
+    if pipeline is None:
+        return np.array([result["probability"] for result in service.predict_batch(to_records(X))])
+    return pipeline.predict_proba(X)[:, 1]
+
+
+@budgeted("film/history")
+@st.cache_resource
+def load_history(model_version, data_version, _pipeline):
+    # Historische Daten und Modell-Wahrscheinlichkeiten einmal pro Modell- und Datenversion;
+    # der Threshold-Regler rechnet danach nur noch die schwellenabhängigen Metriken neu
+    with stage("load_book_data"):
+        df_ana = pd.read_csv(HISTORY_PATH, sep=";", encoding="utf-8")
+    df_ana.columns = df_ana.columns.str.strip()
+    if "Adapted_to_Film" not in df_ana.columns:
+        return None
+
+    X_hist = df_ana.drop(columns=["Book_Name", "Adapted_to_Film"], errors="ignore")
+    y_hist = df_ana["Adapted_to_Film"]
+    with stage("predict_proba"):
+        y_proba_hist = predict_proba(_pipeline, X_hist)
+    prec, rec, _ = precision_recall_curve(y_hist, y_proba_hist)
+    return {
+        "y": y_hist,
+        "proba": y_proba_hist,
+        "roc_auc": roc_auc_score(y_hist, y_proba_hist),
+        "curve": (rec, prec),
+    }
 
 
 def show():
@@ -23,41 +89,39 @@ def show():
     )
 
     try:
-        df_pred = pd.read_csv("data/new_books_2024.csv", encoding="utf-8")
-        df_pred.columns = df_pred.columns.str.strip()
+        df_pred, katalog, autor_index = load_prediction_data()
     except FileNotFoundError:
         st.error("❌ Datei 'data/new_books_2024.csv' wurde nicht gefunden.")
         return
     # WICHTIG: pipeline wird geladen!!!! es wurde im block ML erstellt und als logisti_pipeline.pkl abgespeichrt---> mein gespeichertes MOdel
-    try:
-        pipeline = joblib.load("logistic_pipeline.pkl")
-    except FileNotFoundError:
-        st.error("❌ Modell-Datei 'logistic_pipeline.pkl' nicht gefunden.")
-        return
-
-    threshold_slider = st.sidebar.slider(
-        "🔧 Threshold für Vorhersage",
-        min_value=0.0,
-        max_value=1.0,
-        value=0.5,
-        step=0.1,
-        help="Ab welcher Wahrscheinlichkeit das Modell eine Verfilmung vorhersagt.",
-    )
+    if service is not None:
+        model_version, pipeline = service.health()["model_version"], None
+        if model_version is None:
+            st.error("❌ Der Prognose-Dienst hat kein Modell geladen.")
+            return
+    else:
+        try:
+            model_version = dataset_version(MODEL_PATH)
+            pipeline = load_pipeline(model_version)
+        except FileNotFoundError:
+            st.error("❌ Modell-Datei 'logistic_pipeline.pkl' nicht gefunden.")
+            return
 
-    autor_list = ["🔽 Bitte wählen..."] + sorted(df_pred["Author"].unique().tolist())
+    autor_suche = st.sidebar.text_input("🔎 Autor suchen", placeholder="Namen eingeben...")
+    autor_list = ["🔽 Bitte wählen..."] + autor_index.search(autor_suche)
     autor = st.sidebar.selectbox("👤 Wähle einen Autor", autor_list)
 
+    buchdaten = None
+    proba = None
     if autor != "🔽 Bitte wählen...":
-        buecher_von_autor = df_pred[df_pred["Author"] == autor]
+        buecher_von_autor = df_pred.iloc[katalog.rows("author", autor, exact=True)]
         buch_list = ["🔽 Bitte wählen..."] + sorted(
             buecher_von_autor["Book_Name"].unique().tolist()
         )
         buch = st.sidebar.selectbox("📚 Wähle ein Buch", buch_list)
 
         if buch != "🔽 Bitte wählen...":
-            buchdaten = buecher_von_autor[buecher_von_autor["Book_Name"] == buch].iloc[
-                0:1
-            ]
+            buchdaten = df_pred.iloc[katalog.rows_for(exact=True, author=autor, title=buch)[:1]]
 
             # Buchdetails
             st.write("### 📖 Details zum ausgewählten Buch:")
@@ -71,46 +135,70 @@ def show():
                     cover_url, caption="📕 Buchcover", use_container_width=True
                 )
 
-            # Vorhersage
+            # Vorhersage (die Entscheidung hängt vom Threshold ab, siehe threshold_panel)
             X_new = buchdaten.drop(columns=["Book_Name"], errors="ignore")
-            proba = pipeline.predict_proba(X_new)[:, 1][0]
-            pred = "Ja" if proba >= threshold_slider else "Nein"
-
-            buchname = buchdaten["Book_Name"].values[0]
-            autorname = buchdaten["Author"].values[0]
+            with stage("predict_proba"):
+                proba = predict_proba(pipeline, X_new)[0]
 
             st.markdown(
                 f"<h4 style='font-size: 1.2rem;'>📊 <strong>Wahrscheinlichkeit für Verfilmung:</strong> {proba*100:.0f}%</h4>",
                 unsafe_allow_html=True,
             )
 
-            if pred == "Ja":
-                st.markdown(
-                    f"""
-                    <div style='background-color:#e6f4ea; padding: 1.2rem; border-left: 6px solid #34a853; border-radius: 6px; font-size: 1.1rem;'>
-                        🎬 <strong>Erfolg!</strong> Das Buch <em>{buchname}</em> von <em>{autorname}</em> wird voraussichtlich verfilmt! 🍿<br>
-                        <span style='font-size: 0.95rem; color: gray;'>(Schwellenwert: {threshold_slider * 100:.0f}%)</span>
-                    </div>
-                    """,
-                    unsafe_allow_html=True,
-                )
-                st.balloons()
-            else:
-                st.markdown(
-                    f"""
-                    <div style='background-color:#f0f2f6; padding: 1.2rem; border-left: 6px solid #4e79a7; border-radius: 6px; font-size: 1.1rem;'>
-                        📘 Das Buch <em>{buchname}</em> von <em>{autorname}</em> wird aktuell wohl nicht verfilmt.<br>
-                        <span style='font-size: 0.95rem; color: gray;'>(Schwellenwert: {threshold_slider * 100:.0f}%)</span>
-                    </div>
-                    """,
-                    unsafe_allow_html=True,
-                )
-
         # === Basis Daten laden ===
     try:
-        df_ana = pd.read_csv("data/book_data_clean.csv", sep=";", encoding="utf-8")
-        df_ana.columns = df_ana.columns.str.strip()
+        history = load_history(model_version, dataset_version(HISTORY_PATH), pipeline)
+        history_found = True
     except FileNotFoundError:
+        history, history_found = None, False
+
+    threshold_panel(buchdaten, proba, history, history_found)
+
+
+# Threshold-Regler mit allem, was von ihm abhängt (Entscheidung für das gewählte Buch,
+# Metriken, Confusion Matrix): als Fragment läuft bei einer Änderung nur dieser Teil neu
+@st.fragment
+@timed("film/threshold_panel")
+def threshold_panel(buchdaten, proba, history, history_found):
+    threshold = st.slider(
+        "🔧 Threshold für Vorhersage",
+        min_value=0.0,
+        max_value=1.0,
+        value=0.5,
+        step=0.1,
+        help="Ab welcher Wahrscheinlichkeit das Modell eine Verfilmung vorhersagt.",
+        key="threshold_slider",
+    )
+
+    if proba is not None:
+        pred = "Ja" if proba >= threshold else "Nein"
+
+        buchname = buchdaten["Book_Name"].values[0]
+        autorname = buchdaten["Author"].values[0]
+
+        if pred == "Ja":
+            st.markdown(
+                f"""
+                <div style='background-color:#e6f4ea; padding: 1.2rem; border-left: 6px solid #34a853; border-radius: 6px; font-size: 1.1rem;'>
+                    🎬 <strong>Erfolg!</strong> Das Buch <em>{buchname}</em> von <em>{autorname}</em> wird voraussichtlich verfilmt! 🍿<br>
+                    <span style='font-size: 0.95rem; color: gray;'>(Schwellenwert: {threshold * 100:.0f}%)</span>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+            st.balloons()
+        else:
+            st.markdown(
+                f"""
+                <div style='background-color:#f0f2f6; padding: 1.2rem; border-left: 6px solid #4e79a7; border-radius: 6px; font-size: 1.1rem;'>
+                    📘 Das Buch <em>{buchname}</em> von <em>{autorname}</em> wird aktuell wohl nicht verfilmt.<br>
+                    <span style='font-size: 0.95rem; color: gray;'>(Schwellenwert: {threshold * 100:.0f}%)</span>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+
+    if not history_found:
         st.warning(
             "⚠️ Datei 'data/book_data_clean.csv' für historische Daten nicht gefunden."
         )
@@ -132,19 +220,17 @@ def show():
     st.markdown(" ")
 
     # === Modell-Performance auf historischen Daten ===
-    if "Adapted_to_Film" in df_ana.columns:
-        X_hist = df_ana.drop(columns=["Book_Name", "Adapted_to_Film"], errors="ignore")
-        y_hist = df_ana["Adapted_to_Film"]
-
-        y_proba_hist = pipeline.predict_proba(X_hist)[:, 1]
-        y_pred_hist = (y_proba_hist >= threshold_slider).astype(int)
+    if history is not None:
+        y_hist = history["y"]
+        y_proba_hist = history["proba"]
+        y_pred_hist = (y_proba_hist >= threshold).astype(int)
 
         # Metriken berechnen
         recall = recall_score(y_hist, y_pred_hist)
         accuracy = accuracy_score(y_hist, y_pred_hist)
         precision = precision_score(y_hist, y_pred_hist)
         f1 = f1_score(y_hist, y_pred_hist)
-        roc_auc = roc_auc_score(y_hist, y_proba_hist)
+        roc_auc = history["roc_auc"]
         cm = confusion_matrix(y_hist, y_pred_hist)
 
         # === TITELZEILE: 3 Spalten ===
@@ -152,12 +238,12 @@ def show():
         with title_col1:
             st.markdown(
                 f"""
-                <h3 style='margin-bottom: 0;'>🤖 Logistisches Regressionsmodell mit geänderten Threshold🎚️ {threshold_slider:.2f}</h3>
+                <h3 style='margin-bottom: 0;'>🤖 Logistisches Regressionsmodell mit geänderten Threshold🎚️ {threshold:.2f}</h3>
                 <p style='font-size: 0.9rem; color: gray; margin-top: 0.3rem;'>
                 Der Threshold-Schwellenwert bestimmt, **ab welcher Wahrscheinlichkeit ein Buch als „verfilmt“ gilt**.<br>
                 Ein niedrigerer Wert erkennt mehr mögliche Verfilmungen (höherer Recall), <br>
                 ein höherer Wert reduziert Fehlalarme (höhere Precision).<br>
-                (Dynamisch anpassbar über den Schieberegler seitlich)
+                (Dynamisch anpassbar über den Schieberegler oben)
                 </p>
                 """,
                 unsafe_allow_html=True,
@@ -216,49 +302,12 @@ def show():
         # Confusion Matrix (Heatmap)
         with col2:
             st.markdown("<div style='padding-left: 100px;'>", unsafe_allow_html=True)
-            # Hier Plot-Code
-            fig, ax = plt.subplots(figsize=(2, 2), dpi=100)
-            sns.heatmap(
-                cm,
-                annot=True,
-                fmt="g",
-                cmap="RdYlGn",
-                cbar=False,
-                xticklabels=["Nicht verfilmt", "Verfilmt"],
-                yticklabels=["Nicht verfilmt", "Verfilmt"],
-                annot_kws={"size": 6, "color": "black"},
-                ax=ax,
-            )
-            ax.set_xlabel("Vorhergesagte Klasse", fontsize=8)
-            ax.set_ylabel("Tatsächliche Klasse", fontsize=8)
-            ax.tick_params(axis="x", labelsize=6)
-            ax.tick_params(axis="y", labelsize=6)
-            plt.tight_layout(pad=0.1)
-            # Achsen-Position nach rechts verschieben (x0 verschieben)
-            pos = ax.get_position()  # aktueller Position-Box (Bbox)
-            new_pos = [
-                pos.x0 + 0.4,
-                pos.y0,
-                pos.width,
-                pos.height,
-            ]  # x0 nach rechts verschieben
-            ax.set_position(new_pos)
-
-            st.pyplot(fig, use_container_width=False)
+            st.image(render_chart("film/confusion_matrix", confusion_matrix_chart, cm))
             st.markdown("</div>", unsafe_allow_html=True)
 
         # Precision-Recall-Kurve
         with col3:
-            prec, rec, _ = precision_recall_curve(y_hist, y_proba_hist)
-            fig_pr, ax_pr = plt.subplots(figsize=(2.2, 2.2), dpi=100)
-            ax_pr.plot(rec, prec, color="blue")
-            ax_pr.set_xlabel("Recall", fontsize=8)
-            ax_pr.set_ylabel("Precision", fontsize=8)
-            ax_pr.set_title("Precision vs. Recall", fontsize=9)
-            ax_pr.grid(True)
-            ax_pr.tick_params(axis="both", labelsize=6)
-            plt.tight_layout(pad=0.1)
-            st.pyplot(fig_pr, use_container_width=False)
+            st.image(render_chart("film/precision_recall", precision_recall_chart, history["curve"]))
 
     else:
         st.warning("⚠️ Spalte 'Adapted_to_Film' fehlt in den historischen Daten.")
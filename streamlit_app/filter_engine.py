@@ -0,0 +1,233 @@
+# filter_engine.py
+
+from functools import lru_cache
+from itertools import islice
+import numpy as np
+
+import shared_store
+
+# Query engine for the filter-only recommendations ("Finde Bücher nach Genre,
+# Bewertung und mehr"). All structures are built once per dataset:
+#   - the row order presorted by average rating (best first)
+#   - ratings and years as arrays in that order
+#   - genre bitmaps (one packed bit per book and genre, in rating order)
+#   - the author rows from the catalogue index
+# A query walks the rating order in growing chunks and stops as soon as enough
+# books match, so the top-N costs time proportional to the result, not the
+# catalogue. Nothing is copied from the DataFrame; results are row positions.
+# The number of matches is the popcount of the genre bitmaps over the rating
+# prefix when no author or narrowing year range is set (the page's default);
+# other counts are computed once per query and then answered from a small cache.
+# With several server processes per node the arrays are built once and shared
+# (load_shared_engine, see shared_store.py); every worker queries the mapped views.
+
+FIRST_CHUNK = 256
+# Distinct queries whose match count is kept per engine
+COUNT_CACHE = 1024
+
+
+class BookQueryEngine:
+    """
+    Presorted arrays and bitmaps for rating/year/genre/author filters.
+    """
+
+    def __init__(self, books, catalog, genre_lists):
+        self.catalog = catalog
+
+        ratings = books["avg_rating"].to_numpy(dtype=np.float64, na_value=np.nan)
+        # rank -> row position (best rating first, books without rating last)
+        self.order = np.argsort(-np.nan_to_num(ratings, nan=-np.inf), kind="stable")
+        # row position -> rank
+        self.rank = np.empty(len(books), dtype=np.int64)
+        self.rank[self.order] = np.arange(len(books))
+        self.ratings = ratings[self.order]
+        self.years = books["publication_year"].to_numpy(dtype=np.float64, na_value=np.nan)[self.order]
+
+        # one bitmap per genre over the ranks (from the integer-coded genre lists)
+        by_code = np.argsort(genre_lists.codes, kind="stable")
+        genre_ranks = self.rank[genre_lists.rows()][by_code]
+        bounds = np.cumsum(np.bincount(genre_lists.codes, minlength=len(genre_lists.categories)))
+        self.genre_bitmaps = {}
+        for genre, ranks in zip(genre_lists.categories, np.split(genre_ranks, bounds[:-1])):
+            bits = np.zeros(len(books), dtype=bool)
+            bits[ranks] = True
+            self.genre_bitmaps[genre] = np.packbits(bits)
+        self.genre_names = sorted(self.genre_bitmaps)
+        self._init_counts()
+
+    def _init_counts(self):
+        # books with a publication year (the year filter drops the others) and the
+        # year range of the data, for counting without a year scan
+        dated = ~np.isnan(self.years)
+        self.dated_bitmap = np.packbits(dated)
+        self.year_range = (
+            (float(self.years[dated].min()), float(self.years[dated].max())) if dated.any() else None
+        )
+        self._cached_count = lru_cache(maxsize=COUNT_CACHE)(self._count)
+
+    def to_arrays(self):
+        """The arrays of the engine (without the catalogue), e.g. for a shared store."""
+        genres = list(self.genre_bitmaps)
+        return {
+            "order": self.order,
+            "rank": self.rank,
+            "ratings": self.ratings,
+            "years": self.years,
+            "genre_categories": np.array(genres, dtype=str),
+            "genre_bitmaps": np.stack([self.genre_bitmaps[genre] for genre in genres])
+            if genres else np.zeros((0, (len(self) + 7) // 8), dtype=np.uint8),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, catalog):
+        """
+        Engine over existing arrays (see to_arrays) without building anything; the
+        arrays are used as they are, e.g. read-only views of a shared store.
+        """
+        engine = cls.__new__(cls)
+        engine.catalog = catalog
+        engine.order = arrays["order"]
+        engine.rank = arrays["rank"]
+        engine.ratings = arrays["ratings"]
+        engine.years = arrays["years"]
+        engine.genre_bitmaps = dict(zip(arrays["genre_categories"].tolist(), arrays["genre_bitmaps"]))
+        engine.genre_names = sorted(engine.genre_bitmaps)
+        engine._init_counts()
+        return engine
+
+    def __len__(self):
+        return len(self.order)
+
+    def _rating_prefix(self, min_rating):
+        # ratings are sorted descending, so all books >= min_rating form a prefix
+        return int(np.searchsorted(-self.ratings, -min_rating, side="right"))
+
+    def _genre_bits(self, genre, ranks):
+        bitmap = self.genre_bitmaps.get(genre)
+        if bitmap is None:
+            return np.zeros(len(ranks), dtype=bool)
+        return ((bitmap[ranks >> 3] >> (7 - (ranks & 7))) & 1).astype(bool)
+
+    def _mask_ranks(self, ranks, min_rating, years, genres, genre_mode):
+        mask = self.ratings[ranks] >= min_rating
+        if years is not None:
+            book_years = self.years[ranks]
+            mask &= (book_years >= years[0]) & (book_years <= years[1])
+        if genres:
+            genre_masks = [self._genre_bits(genre, ranks) for genre in genres]
+            combine = np.logical_and if genre_mode == "all" else np.logical_or
+            mask &= combine.reduce(genre_masks)
+        return mask
+
+    def _candidate_ranks(self, min_rating, author):
+        """Ranks that can match at all, as one array (author) or as growing chunks."""
+        stop = self._rating_prefix(min_rating)
+        if author is not None:
+            ranks = np.sort(self.rank[self.catalog.rows("author", author, exact=True)])
+            yield ranks[ranks < stop]
+            return
+        start, size = 0, FIRST_CHUNK
+        while start < stop:
+            yield np.arange(start, min(start + size, stop))
+            start, size = start + size, size * 2
+
+    def iter_matches(self, min_rating=0.0, years=None, genres=(), author=None, genre_mode="any"):
+        """
+        Yields the row positions of all matching books, best rating first.
+
+        Parameters:
+            min_rating (float): Minimum average rating.
+            years (tuple): (first, last) publication year, inclusive (optional).
+            genres (list): Genres to filter by (optional).
+            author (str): Only books of this author (optional).
+            genre_mode (str): "any" (at least one of the genres) or "all".
+
+        Yields:
+            int: Row positions of the matching books.
+        """
+        for ranks in self._candidate_ranks(min_rating, author):
+            matches = ranks[self._mask_ranks(ranks, min_rating, years, genres, genre_mode)]
+            yield from self.order[matches].tolist()
+
+    def top(self, n, **query):
+        """The row positions of the n best rated matching books (see iter_matches)."""
+        return list(islice(self.iter_matches(**query), n))
+
+    def count(self, min_rating=0.0, years=None, genres=(), author=None, genre_mode="any"):
+        """
+        Number of matching books (see iter_matches for the parameters).
+
+        Without an author and with a year range covering all dated books this is a
+        popcount of the bitmaps over the rating prefix; other queries are counted
+        over the candidate ranks and cached, so reruns with the same filters cost
+        a dictionary lookup.
+        """
+        years = None if years is None else (float(years[0]), float(years[1]))
+        return self._cached_count(float(min_rating), years, tuple(genres or ()), author, genre_mode)
+
+    def _count(self, min_rating, years, genres, author, genre_mode):
+        all_years = years is None or (
+            self.year_range is not None and years[0] <= self.year_range[0] and years[1] >= self.year_range[1]
+        )
+        if author is None and all_years:
+            return self._bitmap_count(min_rating, years is not None, genres, genre_mode)
+        return int(sum(
+            self._mask_ranks(ranks, min_rating, years, genres, genre_mode).sum()
+            for ranks in self._candidate_ranks(min_rating, author)
+        ))
+
+    def _bitmap_count(self, min_rating, dated_only, genres, genre_mode):
+        stop = self._rating_prefix(min_rating)
+        n_bytes = (stop + 7) // 8
+        if dated_only:
+            bits = self.dated_bitmap[:n_bytes].copy()
+        else:
+            bits = np.full(n_bytes, 0xFF, dtype=np.uint8)
+        if genres:
+            empty = np.zeros(n_bytes, dtype=np.uint8)
+            bitmaps = [self.genre_bitmaps.get(genre, empty)[:n_bytes] for genre in genres]
+            combine = np.bitwise_and if genre_mode == "all" else np.bitwise_or
+            bits &= combine.reduce(bitmaps)
+        if stop % 8:
+            # bits of the last byte beyond the rating prefix
+            bits[-1] &= (0xFF << (8 - stop % 8)) & 0xFF
+        return int(np.bitwise_count(bits).sum())
+
+    def mask(self, rows, min_rating=0.0, years=None, genres=(), genre_mode="all"):
+        """
+        Checks the filters for given books (e.g. the similar books of a seed title).
+
+        Parameters:
+            rows (list): Row positions of the books.
+            min_rating, years, genres, genre_mode: See iter_matches (default mode "all").
+
+        Returns:
+            np.ndarray: Boolean mask, True where a book matches.
+        """
+        ranks = self.rank[np.asarray(rows, dtype=np.int64)]
+        return self._mask_ranks(ranks, min_rating, years, genres, genre_mode)
+
+
+def load_shared_engine(books, catalog, genre_lists, shared_dir=shared_store.SHARED_DIR):
+    """
+    Query engine whose arrays are built once per node and mapped by every worker.
+
+    Parameters:
+        books (pd.DataFrame): The book dataset.
+        catalog (CatalogIndex): Index of the author rows.
+        genre_lists (GenreLists): Encoded genre lists of the books.
+        shared_dir (str): Directory of the shared stores.
+
+    Returns:
+        BookQueryEngine: Engine over read-only views of the shared arrays.
+    """
+    key = shared_store.fingerprint(
+        books["avg_rating"], books["publication_year"],
+        genre_lists.codes, genre_lists.offsets, np.array(genre_lists.categories, dtype=str),
+    )
+    arrays = shared_store.publish_or_attach(
+        "query_engine", key,
+        lambda: BookQueryEngine(books, catalog, genre_lists).to_arrays(),
+        shared_dir,
+    )
+    return BookQueryEngine.from_arrays(arrays, catalog)
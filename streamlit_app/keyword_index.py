@@ -0,0 +1,310 @@
+# keyword_index.py
+
+import os
+import re
+import shutil
+import tempfile
+from collections import Counter
+import numpy as np
+import pandas as pd
+from custom_stopwords_sklearn import combined_stopwords
+from embedding_store import content_fingerprint
+from shared_store import replace_directory
+
+# Inverted index over the book titles and the cleaned descriptions with BM25 scoring.
+#
+# On-disk format (one directory of .npy files, opened memory-mapped):
+#   terms.npy      all terms, sorted, "\n"-joined as bytes
+#   offsets.npy    byte offset of every posting list in postings.npy (int64)
+#   doc_freq.npy   number of books per term (int32)
+#   widths.npy     bytes per doc-id gap of every posting list (1, 2 or 4)
+#   postings.npy   doc-id gaps of all posting lists, each list packed with the
+#                  smallest unsigned integer type that holds its largest gap
+#   tf.npy         term frequencies, aligned with the posting lists (uint8)
+#   doc_len.npy    number of indexed tokens per book (int32)
+#   fingerprint    content fingerprint of the indexed titles and descriptions
+#
+# Posting lists are decoded with a single np.cumsum and the scores are only
+# accumulated over the books in them, so a query costs time proportional to the
+# length of the posting lists of its terms.
+
+DATA_DIR = "data"
+INDEX_DIR = os.path.join(DATA_DIR, "keyword_index")
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(combined_stopwords)
+
+# Title tokens count more than description tokens
+TITLE_BOOST = 3
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Terms found in more than this share of all books are skipped in multi-term
+# queries: they barely change the ranking but have the longest posting lists
+MAX_DF_RATIO = 0.5
+
+# Constant of the reciprocal rank fusion (see Cormack et al. 2009)
+RRF_K = 60
+
+_GAP_DTYPES = {1: np.uint8, 2: np.uint16, 4: np.uint32}
+
+
+def tokenize(text):
+    """
+    Splits a text into lowercase word tokens without stopwords.
+
+    Parameters:
+        text (str): Any text (title, description or query).
+
+    Returns:
+        list: The tokens in order of appearance.
+    """
+    if not isinstance(text, str):
+        return []
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def _gap_width(max_gap):
+    if max_gap < 2**8:
+        return 1
+    if max_gap < 2**16:
+        return 2
+    return 4
+
+
+class KeywordIndex:
+    """
+    BM25 inverted index with compressed posting lists (see module comment for the format).
+    """
+
+    def __init__(self, terms, offsets, doc_freq, widths, postings, tf, doc_len, fingerprint=None):
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_freq = doc_freq
+        self.widths = widths
+        self.postings = postings
+        self.tf = tf
+        self.doc_len = doc_len
+        self.fingerprint = fingerprint
+
+        n_docs = len(doc_len)
+        avg_len = max(float(doc_len.mean()), 1.0) if n_docs else 1.0
+        # BM25 length normalization per book, computed once
+        self.norm = (K1 * (1 - B + B * doc_len / avg_len)).astype(np.float32)
+        self.idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        # start of every posting list in the tf array
+        self.tf_offsets = np.concatenate(([0], np.cumsum(doc_freq, dtype=np.int64)))
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def posting_list(self, term_id):
+        """
+        Decodes the posting list of a term.
+
+        Returns:
+            tuple: Book row positions (int32) and term frequencies (uint8).
+        """
+        count = int(self.doc_freq[term_id])
+        width = int(self.widths[term_id])
+        start = int(self.offsets[term_id])
+        gaps = self.postings[start:start + count * width].view(_GAP_DTYPES[width])
+        ids = np.cumsum(gaps, dtype=np.int32)
+        tf_start = self.tf_offsets[term_id]
+        return ids, self.tf[tf_start:tf_start + count]
+
+    def search(self, query, top_n=10):
+        """
+        Ranks all books by their BM25 score for a free-text query.
+
+        Parameters:
+            query (str): The search words.
+            top_n (int): Number of results.
+
+        Returns:
+            list: Tuples (index, score), best first. Only books containing at least
+            one query term are returned.
+        """
+        term_ids = {self.term_ids[t] for t in tokenize(query) if t in self.term_ids}
+        if not term_ids:
+            return []
+        selective = {t for t in term_ids if self.doc_freq[t] <= MAX_DF_RATIO * len(self)}
+        term_ids = selective or term_ids
+
+        hits, contributions = [], []
+        for term_id in term_ids:
+            ids, tf = self.posting_list(term_id)
+            tf = tf.astype(np.float32)
+            hits.append(ids)
+            contributions.append(self.idf[term_id] * tf * (K1 + 1) / (tf + self.norm[ids]))
+
+        if len(hits) == 1:
+            candidates, candidate_scores = hits[0], contributions[0]
+        else:
+            # sum the contributions per book over the union of the posting lists only
+            candidates, positions = np.unique(np.concatenate(hits), return_inverse=True)
+            candidate_scores = np.bincount(
+                positions, weights=np.concatenate(contributions), minlength=len(candidates)
+            ).astype(np.float32)
+        if len(candidates) > top_n:
+            top = np.argpartition(-candidate_scores, top_n - 1)[:top_n]
+            candidates, candidate_scores = candidates[top], candidate_scores[top]
+        order = np.argsort(-candidate_scores)
+        return list(zip(candidates[order].tolist(), candidate_scores[order].tolist()))
+
+    def save(self, index_dir=INDEX_DIR):
+        # written into a temporary directory next to index_dir and swapped in as a
+        # whole: other processes map the files of the current index, they must
+        # never see them truncated or half rewritten
+        parent = os.path.dirname(os.path.abspath(index_dir))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(index_dir)}.", dir=parent)
+        arrays = {
+            "terms": np.frombuffer("\n".join(self.terms).encode("utf-8"), dtype=np.uint8),
+            "offsets": self.offsets,
+            "doc_freq": self.doc_freq,
+            "widths": self.widths,
+            "postings": self.postings,
+            "tf": self.tf,
+            "doc_len": self.doc_len,
+        }
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+            with open(os.path.join(tmp_dir, "fingerprint"), "w", encoding="utf-8") as f:
+                f.write(self.fingerprint or "")
+            replace_directory(tmp_dir, index_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, index_dir=INDEX_DIR):
+        arrays = {
+            name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+            for name in ("terms", "offsets", "doc_freq", "widths", "postings", "tf", "doc_len")
+        }
+        terms_blob = bytes(arrays.pop("terms")).decode("utf-8")
+        terms = terms_blob.split("\n") if terms_blob else []
+        try:
+            with open(os.path.join(index_dir, "fingerprint"), encoding="utf-8") as f:
+                fingerprint = f.read() or None
+        except FileNotFoundError:
+            fingerprint = None
+        return cls(terms, fingerprint=fingerprint, **arrays)
+
+
+def text_fingerprint(df, title_column="title", text_column="clean_description"):
+    """Content fingerprint of the indexed titles and descriptions, in row order."""
+    texts = df[title_column].fillna("").astype(str) + "\n" + df[text_column].fillna("").astype(str)
+    return content_fingerprint(pd.Series(texts.to_numpy(), dtype=object), model_name="bm25")
+
+
+def build_keyword_index(df, title_column="title", text_column="clean_description"):
+    """
+    Builds the inverted index over titles and cleaned descriptions.
+
+    Parameters:
+        df (pd.DataFrame): The complete book dataset.
+        title_column (str): Column with the book titles.
+        text_column (str): Column with the (stopword-free) descriptions.
+
+    Returns:
+        KeywordIndex: The index, row positions of df are used as book ids.
+    """
+    vocabulary = {}
+    term_col, doc_col, tf_col = [], [], []
+    doc_len = np.zeros(len(df), dtype=np.int32)
+
+    for doc_id, (title, text) in enumerate(zip(df[title_column], df[text_column])):
+        counts = Counter(tokenize(text))
+        for token in tokenize(title):
+            counts[token] += TITLE_BOOST
+        doc_len[doc_id] = sum(counts.values())
+        for token, count in counts.items():
+            term_col.append(vocabulary.setdefault(token, len(vocabulary)))
+            doc_col.append(doc_id)
+            tf_col.append(count)
+
+    # Renumber the terms in sorted order and sort the postings by (term, book)
+    terms = sorted(vocabulary)
+    new_ids = np.empty(len(vocabulary), dtype=np.int32)
+    new_ids[[vocabulary[t] for t in terms]] = np.arange(len(terms), dtype=np.int32)
+    term_col = new_ids[np.asarray(term_col, dtype=np.int32)]
+    doc_col = np.asarray(doc_col, dtype=np.int64)
+    order = np.lexsort((doc_col, term_col))
+    term_col, doc_col = term_col[order], doc_col[order]
+    tf = np.minimum(np.asarray(tf_col, dtype=np.int64)[order], 255).astype(np.uint8)
+
+    doc_freq = np.bincount(term_col, minlength=len(terms)).astype(np.int32)
+    starts = np.concatenate(([0], np.cumsum(doc_freq)[:-1]))
+
+    # Gaps between neighbouring book ids, the first entry of every list is the id itself
+    gaps = np.diff(doc_col, prepend=0)
+    gaps[starts] = doc_col[starts]
+
+    widths = np.zeros(len(terms), dtype=np.uint8)
+    offsets = np.zeros(len(terms), dtype=np.int64)
+    chunks, position = [], 0
+    max_gaps = np.maximum.reduceat(gaps, starts) if len(terms) else []
+    for term_id, (start, count, max_gap) in enumerate(zip(starts, doc_freq, max_gaps)):
+        width = _gap_width(max_gap)
+        chunk = gaps[start:start + count].astype(_GAP_DTYPES[width]).view(np.uint8)
+        widths[term_id] = width
+        offsets[term_id] = position
+        chunks.append(chunk)
+        position += len(chunk)
+    postings = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.uint8)
+
+    return KeywordIndex(
+        terms, offsets, doc_freq, widths, postings, tf, doc_len,
+        fingerprint=text_fingerprint(df, title_column, text_column),
+    )
+
+
+def load_or_build_keyword_index(df, index_dir=INDEX_DIR):
+    """
+    Loads the stored index if it was built from the same titles and descriptions
+    (content fingerprint), otherwise builds and stores it.
+
+    Parameters:
+        df (pd.DataFrame): The complete book dataset.
+        index_dir (str): Directory of the on-disk index.
+
+    Returns:
+        KeywordIndex: The index for the current dataset.
+    """
+    if os.path.exists(os.path.join(index_dir, "fingerprint")):
+        index = KeywordIndex.load(index_dir)
+        if index.fingerprint == text_fingerprint(df):
+            return index
+
+    index = build_keyword_index(df)
+    try:
+        index.save(index_dir)
+    except OSError:
+        # read-only deployments still work, the index is just rebuilt next time
+        pass
+    return index
+
+
+def reciprocal_rank_fusion(rankings, top_n=10, k=RRF_K):
+    """
+    Combines several rankings with reciprocal rank fusion: every list adds
+    1 / (k + rank) to the score of each of its books.
+
+    Parameters:
+        rankings (list): Lists of book row positions, each ordered best first.
+        top_n (int): Number of results.
+        k (int): Damping constant, larger values flatten the rank differences.
+
+    Returns:
+        list: Tuples (index, fused_score), best first.
+    """
+    fused = Counter()
+    for ranking in rankings:
+        for rank, idx in enumerate(ranking, start=1):
+            fused[idx] += 1.0 / (k + rank)
+    return fused.most_common(top_n)
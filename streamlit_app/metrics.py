@@ -0,0 +1,290 @@
+# metrics.py
+
+import argparse
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency histograms and error counters of the hot paths (CSV loads, model.encode,
+# similarity search, cover lookups, word clouds, predict_proba, chart rendering),
+# exposed in the Prometheus text format:
+#   - on the admin page (pages/_Admin.py)
+#   - on http://<host>:<port>/metrics with BOOK_MARKET_METRICS_PORT set
+#   - in a file rewritten every few seconds with BOOK_MARKET_METRICS_FILE set
+#     (for the textfile collector of the node exporter)
+# Forked worker processes (book_service.py --workers N) each record into their own
+# registry and start their own exporters (start_worker_exporters): worker i serves
+# /metrics on BOOK_MARKET_METRICS_PORT + 1 + i and writes <file>.worker<i><ext>,
+# all its series carry the label worker="<i>".
+#
+# Switched on with BOOK_MARKET_METRICS=1. Switched off, @instrumented returns the
+# function itself and stage() a shared null context, so the hot paths only pay
+# one global lookup.
+#
+#   @instrumented("wordcloud")                  # function
+#   def generate_wordcloud(text): ...
+#
+#   with stage("similarity_search"):            # block
+#       cos_sim = util.cos_sim(...)
+
+ENABLED = os.environ.get("BOOK_MARKET_METRICS", "0").lower() not in ("", "0", "false", "no")
+PORT = os.environ.get("BOOK_MARKET_METRICS_PORT")
+TEXTFILE = os.environ.get("BOOK_MARKET_METRICS_FILE")
+TEXTFILE_INTERVAL = 10
+
+PREFIX = "book_market"
+
+# Upper bounds of the histogram buckets in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Metric families: name -> (label name, help text)
+FAMILIES = {
+    "stage_seconds": ("stage", "Latency of the instrumented stages"),
+    "rerun_seconds": ("scope", "Duration of script runs and fragment reruns"),
+    "request_seconds": ("endpoint", "Duration of the requests of book_service.py"),
+}
+
+_NULL = nullcontext()
+
+
+class Histogram:
+    """Bucket counts, sum and count of one series (not cumulative)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimated quantile in seconds (linear within the bucket, like histogram_quantile)."""
+        if not self.count:
+            return float("nan")
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-1]
+
+
+class Registry:
+    """All series of one process: (family, label value) -> Histogram."""
+
+    def __init__(self):
+        self.series = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+        # number of the forked worker process (None: a single process)
+        self.worker = None
+
+    def observe(self, family, label, seconds, error=False):
+        with self.lock:
+            histogram = self.series.get((family, label))
+            if histogram is None:
+                histogram = self.series[(family, label)] = Histogram()
+            histogram.observe(seconds)
+            if error:
+                histogram.errors += 1
+
+    def reset(self):
+        with self.lock:
+            self.series.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """Rows per series (for tables): family, label, count, errors, sum and quantiles in seconds."""
+        with self.lock:
+            return [
+                {
+                    "family": family,
+                    "label": label,
+                    "count": h.count,
+                    "errors": h.errors,
+                    "sum": h.sum,
+                    "mean": h.sum / h.count if h.count else float("nan"),
+                    "p50": h.quantile(0.5),
+                    "p95": h.quantile(0.95),
+                    "p99": h.quantile(0.99),
+                }
+                for (family, label), h in sorted(self.series.items())
+            ]
+
+    def render(self):
+        """All series in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for family, (label_name, help_text) in FAMILIES.items():
+                series = sorted((label, h) for (f, label), h in self.series.items() if f == family)
+                if not series:
+                    continue
+                name = f"{PREFIX}_{family}"
+                worker = f',worker="{self.worker}"' if self.worker is not None else ""
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for label, h in series:
+                    label_text = f'{label_name}="{_escape(label)}"{worker}'
+                    cumulative = 0
+                    for bound, n in zip(BUCKETS, h.counts):
+                        cumulative += n
+                        lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {h.count}')
+                    lines.append(f"{name}_sum{{{label_text}}} {h.sum:.6f}")
+                    lines.append(f"{name}_count{{{label_text}}} {h.count}")
+                errors = f"{PREFIX}_{family.rsplit('_', 1)[0]}_errors_total"
+                lines.append(f"# HELP {errors} Calls that raised an exception")
+                lines.append(f"# TYPE {errors} counter")
+                for label, h in series:
+                    lines.append(f'{errors}{{{label_name}="{_escape(label)}"{worker}}} {h.errors}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# One registry per server process (shared by all sessions)
+REGISTRY = Registry()
+
+
+class _Timer:
+    __slots__ = ("family", "label", "start")
+
+    def __init__(self, family, label):
+        self.family = family
+        self.label = label
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # st.stop/st.rerun raise BaseExceptions, they are no errors
+        error = exc_type is not None and issubclass(exc_type, Exception)
+        REGISTRY.observe(self.family, self.label, time.perf_counter() - self.start, error=error)
+        return False
+
+
+def stage(name, family="stage_seconds"):
+    """Context manager that records the duration of the block under name."""
+    if not ENABLED:
+        return _NULL
+    return _Timer(family, name)
+
+
+def instrumented(name):
+    """Decorator that records every call of the function as stage name (off: the function itself)."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer("stage_seconds", name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """Serves /metrics from a background thread of this process; returns the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    return server
+
+
+def write_textfile(path):
+    """Writes the current metrics atomically to path."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp_path, path)
+
+
+def _textfile_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        write_textfile(path)
+
+
+def _start_exporters(port=PORT, textfile=TEXTFILE):
+    if not ENABLED:
+        return
+    if port:
+        try:
+            serve(int(port))
+        except OSError as e:
+            print(f"⚠️ Metrics-Endpunkt auf Port {port} nicht gestartet: {e}")
+    if textfile:
+        threading.Thread(target=_textfile_loop, args=(textfile, TEXTFILE_INTERVAL),
+                         daemon=True, name="metrics-textfile").start()
+
+
+def worker_port(worker):
+    """Port of the /metrics endpoint of a forked worker (None without BOOK_MARKET_METRICS_PORT)."""
+    return int(PORT) + 1 + worker if PORT else None
+
+
+def start_worker_exporters(worker):
+    """
+    Starts the exporters in a forked worker process, right after the fork: the
+    threads of the parent do not survive it, and the worker records into its own
+    copy of the registry (emptied here, the parent keeps its series).
+
+    Parameters:
+        worker (int): Number of the worker (0 .. workers - 1), kept when it is restarted.
+    """
+    REGISTRY.reset()
+    REGISTRY.worker = worker
+    textfile = None
+    if TEXTFILE:
+        root, ext = os.path.splitext(TEXTFILE)
+        textfile = f"{root}.worker{worker}{ext}"
+    _start_exporters(worker_port(worker), textfile)
+
+
+_start_exporters()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch the metrics of a running app")
+    parser.add_argument("--port", type=int, default=int(PORT or 9464))
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+
+    from urllib.request import urlopen
+
+    with urlopen(f"http://{args.host}:{args.port}/metrics", timeout=5) as response:
+        print(response.read().decode("utf-8"), end="")
+
+
+if __name__ == "__main__":
+    main()
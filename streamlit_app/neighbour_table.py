@@ -0,0 +1,342 @@
+# neighbour_table.py
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+from schema import read_books
+import embedding_store
+from encoder_backends import encoder_dir, store_model_name
+from shared_store import replace_directory
+
+# Offline job that precomputes the top-k most similar books for every book of
+# final_books_recommend.csv, so the recommendation page can serve a seed title
+# with a single array lookup instead of a full cosine ranking.
+#
+# The similarities are computed in blocks of rows (matrix x matrix product), each
+# block stays below a fixed memory limit. The blocks are distributed over a
+# process pool; the workers open the embedding matrix memory-mapped, so it is
+# never copied per process.
+#
+# Result (data/neighbours/, or the neighbours/ directory of the selected encoder,
+# see encoder_backends.encoder_dir):
+#   neighbour_ids.npy     int32   (n_books x k)  row positions, best first
+#   neighbour_scores.npy  float16 (n_books x k)  cosine similarities
+#   meta.json             number of rows, k, the encoder and fingerprints of the
+#                         titles and of the encoded descriptions
+#
+#   python neighbour_table.py --k 64 --workers 4
+
+DATA_DIR = "data"
+BOOKS_CSV = os.path.join(DATA_DIR, "final_books_recommend.csv")
+ENCODER_DIR = encoder_dir(data_dir=DATA_DIR)
+TABLE_DIR = os.path.join(ENCODER_DIR, "neighbours")
+
+# The recommendation page asks for 50 books, a few more cover dropped duplicates
+DEFAULT_K = 64
+DEFAULT_MEMORY_MB = 256
+
+
+def title_fingerprint(titles):
+    """
+    Fingerprint of the title column, used to check that a stored table still
+    matches the row order of the dataset.
+    """
+    row_hashes = pd.util.hash_pandas_object(pd.Series(titles), index=False).to_numpy()
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()
+
+
+def description_fingerprint(descriptions, model):
+    """
+    Embedding-store fingerprint of the descriptions and the encoder, used to check
+    that a stored table was computed from the embeddings the page uses now.
+    """
+    return embedding_store.content_fingerprint(descriptions, model)
+
+
+def block_rows(n_corpus, memory_mb=DEFAULT_MEMORY_MB):
+    """Number of query rows per block, so that one similarity block fits into memory_mb."""
+    return max(1, int(memory_mb * 2**20 // (4 * max(n_corpus, 1))))
+
+
+def blocked_top_k(queries, corpus, k, query_ids=None, rows_per_block=None, corpus_norms=None):
+    """
+    Top-k cosine neighbours for many query vectors at once, computed block by block.
+
+    Parameters:
+        queries (np.ndarray): Query vectors (n_queries x dim).
+        corpus (np.ndarray): Corpus vectors (n_corpus x dim), may be memory-mapped.
+        k (int): Number of neighbours per query.
+        query_ids (np.ndarray): Corpus row of every query; these self-matches are
+            excluded (optional).
+        rows_per_block (int): Query rows per block (default: from DEFAULT_MEMORY_MB).
+        corpus_norms (np.ndarray): Precomputed row norms of the corpus (optional).
+
+    Returns:
+        tuple: Neighbour row positions (int32) and cosine similarities (float32),
+        both n_queries x k, best first.
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    k = min(k, len(corpus) - (1 if query_ids is not None else 0))
+    rows_per_block = rows_per_block or block_rows(len(corpus))
+    if corpus_norms is None:
+        corpus_norms = np.linalg.norm(corpus, axis=1)
+    corpus_norms = np.where(corpus_norms == 0, 1.0, corpus_norms).astype(np.float32)
+
+    ids = np.empty((len(queries), k), dtype=np.int32)
+    scores = np.empty((len(queries), k), dtype=np.float32)
+    for start in range(0, len(queries), rows_per_block):
+        stop = min(start + rows_per_block, len(queries))
+        block = queries[start:stop]
+        block_norms = np.linalg.norm(block, axis=1, keepdims=True)
+        block_norms[block_norms == 0] = 1.0
+
+        sims = block @ corpus.T
+        sims /= block_norms
+        sims /= corpus_norms
+
+        # exclude the self-matches of the whole block at once
+        if query_ids is not None:
+            sims[np.arange(stop - start), query_ids[start:stop]] = -np.inf
+
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        ids[start:stop] = np.take_along_axis(top, order, axis=1)
+        scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+    return ids, scores
+
+
+# Worker state, set once per process by _init_worker
+_corpus = None
+_corpus_norms = None
+
+
+def _init_worker(embeddings_path, corpus_norms):
+    global _corpus, _corpus_norms
+    _corpus = np.load(embeddings_path, mmap_mode="r")
+    _corpus_norms = corpus_norms
+
+
+def _worker_chunk(args):
+    start, stop, k, rows_per_block = args
+    # one BLAS thread per process, the pool provides the parallelism
+    with threadpool_limits(limits=1):
+        return blocked_top_k(
+            _corpus[start:stop],
+            _corpus,
+            k,
+            query_ids=np.arange(start, stop),
+            rows_per_block=rows_per_block,
+            corpus_norms=_corpus_norms,
+        )
+
+
+def build_neighbour_table(
+    embeddings_path,
+    table_dir=TABLE_DIR,
+    titles=None,
+    k=DEFAULT_K,
+    memory_mb=DEFAULT_MEMORY_MB,
+    workers=None,
+    descriptions=None,
+    model=None,
+):
+    """
+    Computes and stores the neighbour table for all rows of the embedding file.
+
+    Parameters:
+        embeddings_path (str): .npy file with the embeddings (one row per book).
+        table_dir (str): Output directory.
+        titles (list): Book titles in row order, stored as fingerprint (optional).
+        k (int): Number of neighbours per book.
+        memory_mb (int): Memory limit for the similarity blocks of each worker.
+        workers (int): Number of processes (default: all CPU cores).
+        descriptions (list): The encoded descriptions in row order, stored as
+            fingerprint together with `model` (optional).
+        model (str): Encoder of the embeddings (encoder_backends.store_model_name).
+
+    Returns:
+        str: The output directory.
+    """
+    corpus = np.load(embeddings_path, mmap_mode="r")
+    n_rows = len(corpus)
+    k = min(k, n_rows - 1)
+    workers = workers or os.cpu_count() or 1
+    rows_per_block = block_rows(n_rows, memory_mb)
+    corpus_norms = np.linalg.norm(corpus, axis=1).astype(np.float32)
+
+    # Results are written straight into memory-mapped output files of a temporary
+    # directory, which replaces table_dir once complete: running pages map the
+    # files of the current table and must never see them rewritten
+    parent = os.path.dirname(os.path.abspath(table_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(table_dir)}.", dir=parent)
+    try:
+        _write_table(tmp_dir, embeddings_path, corpus_norms, n_rows, k, rows_per_block, workers)
+        meta = {"n_rows": n_rows, "k": k}
+        if titles is not None:
+            meta["titles"] = title_fingerprint(titles)
+        if descriptions is not None and model is not None:
+            meta["model"] = model
+            meta["descriptions"] = description_fingerprint(descriptions, model)
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        replace_directory(tmp_dir, table_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return table_dir
+
+
+def _write_table(table_dir, embeddings_path, corpus_norms, n_rows, k, rows_per_block, workers):
+    """Computes the neighbours of all rows with a process pool into the .npy files of table_dir."""
+    ids_out = np.lib.format.open_memmap(
+        os.path.join(table_dir, "neighbour_ids.npy"), mode="w+", dtype=np.int32, shape=(n_rows, k)
+    )
+    scores_out = np.lib.format.open_memmap(
+        os.path.join(table_dir, "neighbour_scores.npy"), mode="w+", dtype=np.float16, shape=(n_rows, k)
+    )
+
+    chunk = rows_per_block * 4
+    tasks = [(start, min(start + chunk, n_rows), k, rows_per_block) for start in range(0, n_rows, chunk)]
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(embeddings_path, corpus_norms)
+    ) as pool:
+        for (start, stop, _, _), (ids, scores) in zip(tasks, pool.map(_worker_chunk, tasks)):
+            ids_out[start:stop] = ids
+            scores_out[start:stop] = scores
+    ids_out.flush()
+    scores_out.flush()
+
+
+class NeighbourTable:
+    """
+    The precomputed neighbours of every book (opened memory-mapped).
+    """
+
+    def __init__(self, ids, scores):
+        self.ids = ids
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def k(self):
+        return self.ids.shape[1]
+
+    def lookup(self, row, top_n):
+        """
+        Returns the stored neighbours of a book, or None if the book is newer than
+        the table or more neighbours are requested than stored.
+
+        Parameters:
+            row (int): Row position of the book.
+            top_n (int): Number of neighbours needed.
+
+        Returns:
+            tuple: Row positions and similarity scores, best first (or None).
+        """
+        if row >= len(self) or top_n > self.k:
+            return None
+        return self.ids[row], self.scores[row]
+
+
+def load_neighbour_table(titles, table_dir=TABLE_DIR, descriptions=None, model=None):
+    """
+    Opens the stored table if it belongs to the current dataset and encoder.
+
+    Parameters:
+        titles (pd.Series): Titles of the current dataset in row order.
+        table_dir (str): Directory of the table.
+        descriptions (pd.Series): Descriptions of the current dataset in row order;
+            with `model`, the table is only used if it was computed from the same
+            descriptions with the same encoder.
+        model (str): Encoder of the current embeddings (encoder_backends.store_model_name).
+
+    Returns:
+        NeighbourTable: The table, or None if it is missing or out of date. Books
+        appended after the table was built are not covered and use the live search.
+    """
+    meta_path = os.path.join(table_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+
+    n_rows = meta["n_rows"]
+    if n_rows > len(titles):
+        return None
+    if "titles" in meta and meta["titles"] != title_fingerprint(titles[:n_rows]):
+        return None
+    if descriptions is not None and model is not None and (
+        meta.get("model") != model
+        or meta.get("descriptions") != description_fingerprint(descriptions[:n_rows], model)
+    ):
+        return None
+
+    try:
+        ids = np.load(os.path.join(table_dir, "neighbour_ids.npy"), mmap_mode="r")
+        scores = np.load(os.path.join(table_dir, "neighbour_scores.npy"), mmap_mode="r")
+    except FileNotFoundError:
+        # replaced by a rebuild in the meantime
+        return None
+    if len(ids) != n_rows or len(scores) != n_rows:
+        return None
+    return NeighbourTable(ids, scores)
+
+
+def compute_embeddings_file(books, fingerprint):
+    """Encodes all descriptions with the recommendation model and stores them in the embedding store."""
+    from encoder_backends import load_sentence_encoder
+
+    model = load_sentence_encoder()
+    embedding_store.load_or_compute_embeddings(
+        books['description'],
+        lambda texts: model.encode(texts, convert_to_numpy=True, show_progress_bar=True),
+        fingerprint,
+        ENCODER_DIR,
+    )
+    return embedding_store.embeddings_path(fingerprint, ENCODER_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the top-k neighbours of every book")
+    parser.add_argument("--embeddings", default=None,
+                        help=".npy file with the embeddings (default: the embedding store "
+                             "entry of the current descriptions, computed if missing)")
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_MB)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    books, _ = read_books(BOOKS_CSV)
+    if args.embeddings is None:
+        fingerprint = embedding_store.content_fingerprint(books['description'], store_model_name())
+        args.embeddings = embedding_store.embeddings_path(fingerprint, ENCODER_DIR)
+        if not os.path.exists(args.embeddings):
+            print(f"📄 Berechne Embeddings für {len(books)} Bücher ...")
+            compute_embeddings_file(books, fingerprint)
+
+    start = time.perf_counter()
+    build_neighbour_table(
+        args.embeddings,
+        titles=books['title'],
+        descriptions=books['description'],
+        model=store_model_name(),
+        k=args.k,
+        memory_mb=args.memory_mb,
+        workers=args.workers,
+    )
+    print(f"✅ Nachbartabelle gespeichert unter: {TABLE_DIR} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
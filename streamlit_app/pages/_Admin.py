@@ -0,0 +1,83 @@
+# Admin: Laufzeiten, Metriken und Speicher
+import streamlit as st
+import pandas as pd
+import metrics
+from resources import REGISTRY, process_memory
+from chart_cache import CHART_CACHE
+
+st.set_page_config(page_title="Admin", layout="wide")
+
+st.title("🛠️ Admin: Laufzeiten und Speicher")
+
+if not metrics.ENABLED:
+    st.info(
+        "Die Messung ist ausgeschaltet. Start mit `BOOK_MARKET_METRICS=1 streamlit run app.py` "
+        "(optional `BOOK_MARKET_METRICS_PORT=9464` für /metrics oder "
+        "`BOOK_MARKET_METRICS_FILE=<pfad>` für eine Textdatei)."
+    )
+
+rows = metrics.REGISTRY.snapshot()
+
+# Kennzahlen pro Stufe und pro Skriptlauf/Fragment (Zeiten in ms)
+for family, title in [("stage_seconds", "Stufen"), ("rerun_seconds", "Skriptläufe und Fragmente")]:
+    table = pd.DataFrame([r for r in rows if r["family"] == family])
+    st.write(f"### {title}")
+    if table.empty:
+        st.write("Noch keine Messwerte.")
+        continue
+    table = table.drop(columns="family").set_index("label")
+    for column in ["sum", "mean", "p50", "p95", "p99"]:
+        table[column] = table[column] * 1000
+    table = table.rename(columns={
+        "count": "Aufrufe", "errors": "Fehler", "sum": "Summe ms", "mean": "Ø ms",
+        "p50": "p50 ms", "p95": "p95 ms", "p99": "p99 ms",
+    })
+    st.dataframe(table.sort_values("Summe ms", ascending=False).style.format(precision=1))
+
+# Gecachte Objekte (siehe resources.py): Größe pro Loader-Aufruf, Budget, Prozessspeicher
+st.write("### Speicher")
+memory = process_memory()
+registry = REGISTRY
+mb = 2**20
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("RSS", f"{memory['rss'] / mb:.0f} MB" if memory["rss"] else "–")
+col2.metric("RSS-Spitze", f"{memory['peak_rss'] / mb:.0f} MB" if memory["peak_rss"] else "–")
+col3.metric("Gecacht", f"{registry.total_bytes() / mb:.1f} MB",
+            help="Geschätzte Größe aller registrierten Objekte (ohne Chart-Cache)")
+col4.metric("Budget", f"{registry.budget_bytes / mb:.0f} MB" if registry.budget_bytes else "unbegrenzt",
+            help="BOOK_MARKET_CACHE_BUDGET_MB; gepinnte Objekte werden nur gezählt")
+st.caption(f"Verdrängt seit Start: {registry.evictions}")
+
+resource_rows = registry.snapshot()
+if not resource_rows:
+    st.write("Noch keine Objekte geladen.")
+else:
+    table = pd.DataFrame(resource_rows).set_index("key")
+    table["bytes"] = table["bytes"] / mb
+    table = table.drop(columns="name").rename(columns={
+        "bytes": "MB", "hits": "Aufrufe", "idle_s": "unbenutzt s", "age_s": "geladen vor s", "pinned": "gepinnt",
+    })
+    st.dataframe(table.style.format(precision=1), use_container_width=True)
+    evictable = [row["key"] for row in resource_rows if not row["pinned"]]
+    if evictable:
+        col1, col2 = st.columns([3, 1])
+        key = col1.selectbox("Objekt", evictable, label_visibility="collapsed")
+        if col2.button("🧹 Aus dem Cache entfernen"):
+            registry.evict(key)
+            st.rerun()
+
+st.write("### Chart-Cache")
+st.write(CHART_CACHE.stats())
+
+st.markdown("---")
+exposition = metrics.REGISTRY.render()
+col1, col2 = st.columns([1, 1])
+with col1:
+    st.download_button("⬇️ Prometheus-Text herunterladen", exposition, file_name="book_market.prom",
+                       mime="text/plain")
+with col2:
+    if st.button("🗑️ Messwerte zurücksetzen"):
+        metrics.REGISTRY.reset()
+        st.rerun()
+with st.expander("Prometheus-Text anzeigen"):
+    st.code(exposition, language="text")
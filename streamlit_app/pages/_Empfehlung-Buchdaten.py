@@ -1,166 +1,199 @@
 # Buchempfehlung-Visualisierung
 import streamlit as st
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from chart_cache import render_chart
+from metrics import stage
+import profiling
+from resources import budgeted
+from charts import bar_chart, histogram_chart, line_chart, pie_chart, scatter_chart
+from schema import read_books
+from table_view import PagedTable, show_paged_table
+from year_cube import YearCube, dataset_version
 
 st.set_page_config(page_title="Empfehlung-Buchdaten", layout="wide")
 
-# ----------------- DATEN LADEN -----------------------
+# Mit ?profile=1 in der URL wird dieser Lauf profiliert (siehe profiling.py)
+with profiling.profiled("Empfehlung-Buchdaten"):
+    # ----------------- DATEN LADEN -----------------------
+
+    DATA_PATH = "data/final_books_recommend.csv"
+
+    # Bewertungs-Buckets für das Histogramm (0.05er Schritte)
+    RATING_EDGES = np.round(np.arange(0, 5.05, 0.05), 2)
+
+    # Daten einmal pro Dateiversion laden (kompakte Spaltentypen aus schema.py)
+    @budgeted("empfehlung/data")
+    @st.cache_resource
+    def load_data(version):
+        with stage("load_books"):
+            books, _ = read_books(DATA_PATH)
+        return books
+
+    # Aggregate pro Jahr (Zählungen, Summen, Momente), einmal pro Dateiversion
+    @budgeted("empfehlung/cube")
+    @st.cache_resource
+    def load_cube(version, _df):
+        return YearCube(
+            _df,
+            "publication_year",
+            categorical=["main_genre", "author", "is_fiction"],
+            numeric=list(_df.select_dtypes("number").columns),
+            buckets={"avg_rating": RATING_EDGES},
+        )
+
+    # Sortierreihenfolgen für die seitenweise Tabelle, einmal pro Dateiversion
+    @budgeted("empfehlung/table")
+    @st.cache_resource
+    def load_table(version, _df):
+        return PagedTable(_df, "publication_year")
+
+    # Kennzahlen für die Sidebar
+    @budgeted("empfehlung/summary")
+    @st.cache_data
+    def load_summary(version, _df):
+        return {
+            "rows": _df.shape[0],
+            "columns": _df.shape[1],
+            "authors": _df["author"].nunique(),
+            "titles": _df["title"].nunique(),
+        }
+
+    version = dataset_version(DATA_PATH)
+    df = load_data(version)
+    cube = load_cube(version, df)
+    table = load_table(version, df)
+    summary = load_summary(version, df)
+
+    # ------------------------ SIDEBAR: DATENSATZ INFO ------------------------------------------
+
+    st.sidebar.header("Datensatzinfo")
+    st.sidebar.write("Anzahl Bücher (Zeilen):", summary["rows"])
+    st.sidebar.write("Anzahl Features (Spalten):", summary["columns"])
+    st.sidebar.write("Einzigartige Autoren:", summary["authors"])
+    st.sidebar.write("Einzigartige Buchtiteln:", summary["titles"])
+
+
+    # Jahrbereich für Slider vorbereiten
+    min_year = cube.first_year
+    max_year = cube.last_year
+
+    # Sidebar: Jahr-Slider
+    years_slider = st.sidebar.slider(
+        "📅 Jahre auswählen",
+        min_value=min_year,
+        max_value=max_year,
+        value=(min_year, max_year),
+        step=1,
+    )
 
-@st.cache_data
-def load_data():
-    return pd.read_csv('data/final_books_recommend.csv', encoding='ascii')
 
-df = load_data()
-
-# ------------------------ SIDEBAR: DATENSATZ INFO ------------------------------------------
-
-st.sidebar.header("Datensatzinfo")
-st.sidebar.write("Anzahl Bücher (Zeilen):", df.shape[0])
-st.sidebar.write("Anzahl Features (Spalten):", df.shape[1])
-st.sidebar.write("Einzigartige Autoren:", df["author"].nunique())
-st.sidebar.write("Einzigartige Buchtiteln:", df["title"].nunique())
-
-
-# Jahrbereich für Slider vorbereiten
-min_year = int(df["publication_year"].min())
-max_year = int(df["publication_year"].max())
-
-# Sidebar: Jahr-Slider
-years_slider = st.sidebar.slider(
-    "📅 Jahre auswählen",
-    min_value=min_year,
-    max_value=max_year,
-    value=(min_year, max_year),
-    step=1,
-)
-# Daten filtern nach Jahr
-df_filtered = df[
-    (df["publication_year"] >= years_slider[0])
-    & (df["publication_year"] <= years_slider[1])
-]
+    # Sidebar: Auswahl der Grafik
+    choose_grafic = st.sidebar.radio(
+        "Welche Grafik möchtest du sehen?",
+        [
+            "Anzahl Bücher pro Jahr",
+            "Hauptgenres",
+            "Anteil Fiction vs. Non-Fiction",
+            "Top Autor:innen",
+            "Erscheinungsjahre – Häufigkeitsverteilung", 
+            "Verteilung der Durchschnittsbewertungen",
+            "Wortanzahl: Original- vs. bereinigte Beschreibungen (Scatterplot)"
+        ],
+    )
+
+
+    # --------------------------- HAUPTTEIL ----------------------------
+    # Layout: zwei Spalten
+    col1, col2 = st.columns([2, 2])
+
+    # Linke Spalte: Tabelle und Statistik
+    with col1:
+        st.title("📅 BUCHDATEN")
+        st.write(f"### 📚 Bereinigte Daten für das Empfehlungssystem")
+        st.write(f"### Verlauf über die Jahre {years_slider[0]}–{years_slider[1]}")
+        # Nur die sichtbare Seite wird an den Browser gesendet
+        show_paged_table(table, years_slider, cube.count(years_slider), key="empfehlung_table")
+        st.markdown("---")
+        st.write("**Numerische Basisstatistiken:**")
+        st.write(cube.describe(years_slider))
+
+
+
+    # Rechte Spalte: Visualisierung
+    # Die Grafiken werden nur bei neuen Daten/Parametern gerendert (chart_cache)
+    def show_chart(chart_id, draw, data, **params):
+        st.image(render_chart(f"empfehlung/{chart_id}", draw, data, **params), use_container_width=True)
+
+
+    with col2:
+        st.write("")
+        st.title("📊 Visualisierung")
+
+    # -------------------------  ANZAHL BÜCHER PRO JAHR -----------------------------------------
+
+        if choose_grafic == "Anzahl Bücher pro Jahr":
+            show_chart("books_per_year", line_chart, cube.per_year(years_slider),
+                       color="#6d597a", title=" Anzahl Bücher pro Jahr",
+                       xlabel="Erscheinungsjahr", ylabel="Anzahl Bücher")
+
+
+    # -------------------------  HAUPTGENRES -----------------------------------------
 
+        elif choose_grafic == "Hauptgenres":
+            show_chart("main_genres", bar_chart, cube.category_counts("main_genre", years_slider),
+                       color="#6d597a", title="Verteilung der Hauptgenres",
+                       xlabel="Hauptgenre", ylabel="Anzahl Bücher", rotate_labels=True)
 
-# Sidebar: Auswahl der Grafik
-choose_grafic = st.sidebar.radio(
-    "Welche Grafik möchtest du sehen?",
-    [
-        "Anzahl Bücher pro Jahr",
-        "Hauptgenres",
-        "Anteil Fiction vs. Non-Fiction",
-        "Top Autor:innen",
-        "Erscheinungsjahre – Häufigkeitsverteilung", 
-        "Verteilung der Durchschnittsbewertungen",
-        "Wortanzahl: Original- vs. bereinigte Beschreibungen (Scatterplot)"
-    ],
-)
 
+    # -------------------------- FICTION VS. NON-FICTION ----------------------------------------
 
-# --------------------------- HAUPTTEIL ----------------------------
-# Layout: zwei Spalten
-col1, col2 = st.columns([2, 2])
-
-# Linke Spalte: Tabelle und Statistik
-with col1:
-    st.title("📅 BUCHDATEN")
-    st.write(f"### 📚 Bereinigte Daten für das Empfehlungssystem")
-    st.write(f"### Verlauf über die Jahre {years_slider[0]}–{years_slider[1]}")
-    st.dataframe(df_filtered)
-    st.markdown("---")
-    st.write("**Numerische Basisstatistiken:**")
-    st.write(df_filtered.describe())
+        elif choose_grafic == "Anteil Fiction vs. Non-Fiction":
+            fiction_counts = cube.category_counts("is_fiction", years_slider).rename({1.0:'Fiction', 0.0:'Non-Fiction'})
+            show_chart("fiction_share", pie_chart, fiction_counts,
+                       title='Fiction vs. Non-Fiction Books', colors=['#6D597A','#E56B6F'],
+                       autopct='%1.0f%%', figsize=(6, 6))
 
+    # -------------------------- TOP AUTOR:INNEN ----------------------------------------
 
+        elif choose_grafic == "Top Autor:innen":
+            top_authors = cube.category_counts("author", years_slider).head(10).sort_values(ascending=True)
+            show_chart("top_authors", bar_chart, top_authors,
+                       color="#6D597A", title="Top 10 Autor:innen nach Anzahl Bücher",
+                       xlabel="Anzahl Bücher", horizontal=True)
 
-# Rechte Spalte: Visualisierung
-with col2:
-    st.write("")
-    st.title("📊 Visualisierung")
 
-# -------------------------  ANZAHL BÜCHER PRO JAHR -----------------------------------------
 
-    if choose_grafic == "Anzahl Bücher pro Jahr":
-        book_counts = df_filtered["publication_year"].value_counts().sort_index()
-        fig, ax = plt.subplots(figsize=(6, 4))
-        ax.plot(book_counts.index, book_counts.values, color="#6d597a")
-        ax.set_title(" Anzahl Bücher pro Jahr")
-        ax.set_xlabel("Erscheinungsjahr")
-        ax.set_ylabel("Anzahl Bücher")
-        ax.grid(True)
-        st.pyplot(fig)
+    # ---------------------------- ERSCHEINUNGSJAHRE -------------------------------------
 
+        elif choose_grafic == "Erscheinungsjahre – Häufigkeitsverteilung":
+            year_counts = cube.per_year(years_slider)
+            show_chart("publication_years", histogram_chart, (year_counts.index, year_counts.values),
+                       bins=40, color='#6D597A', title=" Anzahl Bücher pro Jahr",
+                       xlabel="Erscheinungsjahr", ylabel="Anzahl Bücher")
 
-# -------------------------  HAUPTGENRES -----------------------------------------
 
-    elif choose_grafic == "Hauptgenres":
-        main_genre_counts = df_filtered["main_genre"].value_counts().sort_values(ascending=False)
-        fig, ax = plt.subplots(figsize=(6, 4))
-        main_genre_counts.plot(kind="bar", ax=ax, color="#6d597a")
+    # ---------------------------- AVERAGE RATING-------------------------------------
 
-        ax.set_title("Verteilung der Hauptgenres")
-        ax.set_xlabel("Hauptgenre")
-        ax.set_ylabel("Anzahl Bücher")
+        elif choose_grafic == "Verteilung der Durchschnittsbewertungen":
+            bucket_counts, edges = cube.histogram("avg_rating", years_slider)
+            used = np.flatnonzero(bucket_counts)
+            used = slice(used[0], used[-1] + 1) if len(used) else slice(0, len(bucket_counts))
+            show_chart("avg_rating_distribution", histogram_chart, (edges[:-1][used], bucket_counts[used]),
+                       bins=edges[used.start:used.stop + 1], kde=True, color='#6D597A',
+                       title="Verteilung der Durchschnittsbewertungen",
+                       xlabel="Durchschnittsbewertung", ylabel="Anzahl Bücher")
 
-        ax.set_xticklabels(main_genre_counts.index, rotation=45, ha="right")  
-        st.pyplot(fig)
 
 
-# -------------------------- FICTION VS. NON-FICTION ----------------------------------------
-
-    elif choose_grafic == "Anteil Fiction vs. Non-Fiction":
-        fig, ax = plt.subplots(figsize=(6, 6))
-        fiction_counts = df_filtered['is_fiction'].value_counts().rename({1.0:'Fiction', 0.0:'Non-Fiction'})
-        fiction_counts.plot(kind='pie', autopct='%1.0f%%', colors=['#6D597A','#E56B6F'])
-        ax.set_title('Fiction vs. Non-Fiction Books')
-        ax.set_ylabel('')
-        st.pyplot(fig)
-
-# -------------------------- TOP AUTOR:INNEN ----------------------------------------
-
-    elif choose_grafic == "Top Autor:innen":
-        top_authors = df_filtered["author"].value_counts().sort_values(ascending=True).tail(10)
-        fig, ax = plt.subplots(figsize=(6, 4))
-        top_authors.plot(kind="barh", ax=ax, color="#6D597A")
-        ax.set_title("Top 10 Autor:innen nach Anzahl Bücher")
-        ax.set_xlabel("Anzahl Bücher")
-        st.pyplot(fig)
-
-     
-
-# ---------------------------- ERSCHEINUNGSJAHRE -------------------------------------
-
-    elif choose_grafic == "Erscheinungsjahre – Häufigkeitsverteilung":
-        #years_counts = df_filtered["publication_year"].value_counts().sort_index()
-        fig, ax = plt.subplots(figsize=(6, 4))
-        sns.histplot(df_filtered['publication_year'].dropna(), bins=40, color='#6D597A', ax=ax)
-        ax.set_title(" Anzahl Bücher pro Jahr")
-        ax.set_xlabel("Erscheinungsjahr")
-        ax.set_ylabel("Anzahl Bücher")
-        st.pyplot(fig)
-
-
-# ---------------------------- AVERAGE RATING-------------------------------------
-
-    elif choose_grafic == "Verteilung der Durchschnittsbewertungen":
-        #avg_rating_counts = df_filtered["publication_year"].value_counts().sort_index()
-        fig, ax = plt.subplots(figsize=(6, 4))
-        sns.histplot(df_filtered['avg_rating'].dropna(), bins=30, kde=True, color='#6D597A', ax=ax)
-        ax.set_title("Verteilung der Durchschnittsbewertungen")
-        ax.set_xlabel("Durchschnittsbewertung")
-        ax.set_ylabel("Anzahl Bücher")
-        st.pyplot(fig)
-
-
-
-# ---------------------------- WORTARZAHL ORIGINAL VS. CLEAN_DESCRIPTIONS --------------------------------
-
-    elif choose_grafic == "Wortanzahl: Original- vs. bereinigte Beschreibungen (Scatterplot)":
-        clean_desc = df_filtered['clean_description'].fillna('').str.split().apply(len)
-        fig, ax = plt.subplots(figsize=(6,5))
-        sns.scatterplot(x=df['word_count_description'], y=clean_desc, alpha=0.4, color='#6D597A', ax=ax)
-        ax.set_title("Wortanzahl:\n Original- vs. bereinigte Beschreibungen (Scatterplot)")
-        ax.set_xlabel('Original (Wörteranzahl)')
-        ax.set_ylabel('Bereinigt (Wörteranzahl)')
-        st.pyplot(fig)
+    # ---------------------------- WORTARZAHL ORIGINAL VS. CLEAN_DESCRIPTIONS --------------------------------
 
+        elif choose_grafic == "Wortanzahl: Original- vs. bereinigte Beschreibungen (Scatterplot)":
+            # Nur dieser Plot braucht die einzelnen Zeilen des Jahrbereichs
+            df_filtered = df.iloc[table.year_rows(years_slider)]
+            clean_desc = df_filtered['clean_description'].fillna('').str.split().apply(len)
+            points = pd.DataFrame({"x": df['word_count_description'], "y": clean_desc})
+            show_chart("word_counts", scatter_chart, points,
+                       color='#6D597A', alpha=0.4, grid=False, figsize=(6, 5),
+                       title="Wortanzahl:\n Original- vs. bereinigte Beschreibungen (Scatterplot)",
+                       xlabel='Original (Wörteranzahl)', ylabel='Bereinigt (Wörteranzahl)')
@@ -0,0 +1,144 @@
+# profiling.py
+
+import cProfile
+import marshal
+import os
+import pstats
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Profiling of single page reruns without a redeploy. A rerun is wrapped in
+# cProfile if
+#   - the URL has the query parameter ?profile=1 (only this session), or
+#   - BOOK_MARKET_PROFILE=1 is set (every session, e.g. locally)
+# and below the page a table of the top functions is shown together with a
+# download of the profile (pstats format: python -m pstats, snakeviz, ...).
+# cProfile only hooks the thread that enables it (up to Python 3.11); Streamlit
+# runs every session in its own script thread, so other sessions are neither
+# measured nor slowed down. From Python 3.12 on only one profile can run at a time
+# in the process; a second request is then skipped with a notice.
+#
+#   with profiled("app/Empfehlungssystem"):      # block or whole page script
+#       recommendations.show()
+#
+# profiled() also stops the profiler when the run is interrupted (exception,
+# st.rerun/st.stop after a widget change), so it never stays enabled on the
+# script thread of the session.
+
+QUERY_PARAM = "profile"
+ENV_FLAG = "BOOK_MARKET_PROFILE"
+TOP_N = 30
+
+# Columns of the hotspot table: label -> pstats sort key
+SORT_KEYS = {"kumuliert (cumtime)": "cumulative", "eigene Zeit (tottime)": "tottime", "Aufrufe": "ncalls"}
+
+
+def requested():
+    """True if this rerun should be profiled (query parameter or environment flag)."""
+    import streamlit as st
+
+    if os.environ.get(ENV_FLAG, "0").lower() not in ("", "0", "false", "no"):
+        return True
+    return st.query_params.get(QUERY_PARAM, "0").lower() in ("1", "true", "yes")
+
+
+class RunProfile:
+    """A running (or finished) profile of one rerun."""
+
+    def __init__(self, name):
+        self.name = name
+        self.profiler = cProfile.Profile()
+        self.wall = 0.0
+        self.start = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.wall = time.perf_counter() - self.start
+        return pstats.Stats(self.profiler)
+
+
+def hotspots(stats, sort="cumulative", top_n=TOP_N):
+    """
+    The top functions of a profile as table.
+
+    Parameters:
+        stats (pstats.Stats): The profile.
+        sort (str): pstats sort key ("cumulative", "tottime" or "ncalls").
+        top_n (int): Number of rows.
+
+    Returns:
+        pd.DataFrame: Function, calls, own time and cumulative time (ms) per row.
+    """
+    rows = []
+    for (filename, line, function), (primitive, calls, tottime, cumtime, _) in stats.stats.items():
+        location = f"{os.path.basename(filename)}:{line}" if line else filename
+        rows.append({
+            "Funktion": f"{function} ({location})",
+            "ncalls": calls,
+            "tottime": tottime * 1000,
+            "cumtime": cumtime * 1000,
+        })
+    column = {"cumulative": "cumtime", "tottime": "tottime", "ncalls": "ncalls"}[sort]
+    table = pd.DataFrame(rows, columns=["Funktion", "ncalls", "tottime", "cumtime"])
+    table = table.sort_values(column, ascending=False).head(top_n).reset_index(drop=True)
+    return table.rename(columns={"tottime": "tottime ms", "cumtime": "cumtime ms"})
+
+
+def profile_bytes(stats):
+    """The profile in the pstats file format (readable with pstats.Stats(path))."""
+    return marshal.dumps(stats.stats)
+
+
+def start(name):
+    """Starts profiling this rerun if requested; returns the profile or None."""
+    if not requested():
+        return None
+    try:
+        return RunProfile(name)
+    except ValueError:
+        import streamlit as st
+
+        st.warning("⏱️ Es läuft bereits ein anderes Profil, dieser Lauf wird nicht gemessen.")
+        return None
+
+
+def finish(profile):
+    """Stops the profile (if any) and shows the hotspot table with a download below the page."""
+    if profile is None:
+        return
+    stats = profile.stop()
+    show_report(profile.name, stats, profile.wall)
+
+
+def show_report(name, stats, wall):
+    import streamlit as st
+
+    st.markdown("---")
+    with st.expander(f"⏱️ Profil: {name} ({wall * 1000:.0f} ms)", expanded=True):
+        col1, col2 = st.columns([2, 1])
+        sort_label = col1.radio("Sortieren nach", list(SORT_KEYS), horizontal=True, key=f"profile_sort_{name}")
+        top_n = col2.number_input("Zeilen", min_value=5, max_value=200, value=TOP_N, step=5,
+                                  key=f"profile_top_{name}")
+        st.dataframe(hotspots(stats, SORT_KEYS[sort_label], int(top_n)).style.format(precision=2),
+                     use_container_width=True)
+        file_name = f"{name.replace('/', '_')}_{time.strftime('%Y%m%d-%H%M%S')}.prof"
+        st.download_button("⬇️ Profil herunterladen (pstats)", profile_bytes(stats), file_name=file_name,
+                           mime="application/octet-stream", key=f"profile_download_{name}")
+        st.caption(f"Auswerten z. B. mit `python -m pstats {file_name}` oder `snakeviz {file_name}`.")
+
+
+@contextmanager
+def profiled(name):
+    """Profiles the enclosed block if requested and shows the report after it."""
+    profile = start(name)
+    try:
+        yield
+    except BaseException:
+        # st.stop/st.rerun: no report for an interrupted run
+        if profile is not None:
+            profile.profiler.disable()
+        raise
+    finish(profile)
@@ -1,125 +1,357 @@
 # empfehlung.py
 
+import os
 import streamlit as st
 import pandas as pd
 #import numpy as np
-import ast
 import requests
-import torch
-#import umap
-from sentence_transformers import SentenceTransformer, util
 from wordcloud import WordCloud
 from io import BytesIO
 import matplotlib.pyplot as plt
-
-# This module is used to display book recommendations based on two main options:
-# content-based recommendations or filter-based recommendations.
+from embedding_projection import load_or_fit_projection, corpus_map_coordinates
+from keyword_index import load_or_build_keyword_index, reciprocal_rank_fusion
+from neighbour_table import load_neighbour_table
+from autocomplete import AutocompleteIndex
+from catalog_index import CatalogIndex
+from filter_engine import load_shared_engine
+from schema import read_books
+from embedding_store import content_fingerprint, load_or_compute_norms
+from shared_store import share_numeric_columns
+from rerun_timing import timed
+from metrics import instrumented, stage
+from resources import budgeted
+from encoder_service import EncoderService, configure_torch_threads
+from encoder_backends import ENCODER, ENCODER_BACKEND, encoder_dir, load_sentence_encoder, store_model_name
+from service_client import SERVICE_URL, load_client
+
+# This module is used to display book recommendations based on three options:
+# content-based recommendations, filter-based recommendations or a keyword search
+# in titles and descriptions.
+
+# Recommendation backend: "embeddings" (SentenceTransformer, default) or
+# "tfidf" (sparse TF-IDF vectors, no torch needed)
+RECOMMENDER_BACKEND = os.environ.get("BOOK_MARKET_BACKEND", "embeddings")
+
+# Cover image URL per ISBN (Open Library); the load test points it at a local stub
+COVER_URL = os.environ.get("BOOK_MARKET_COVER_URL", "https://covers.openlibrary.org/b/isbn/{isbn}-M.jpg")
+
+if RECOMMENDER_BACKEND == "tfidf":
+    import tfidf_backend
+elif SERVICE_URL is None:
+    import torch
+    from embedding_cache import load_embeddings
+    from similar_books import cosine_similarity, find_similar_books
 
 # DATA AND MODEL LOADING
 
 # Load the book dataset
-@st.cache_data
+@budgeted("books/data", pinned=True)
+@st.cache_resource
 def load_data():
     """
-    Loads the book dataset from a CSV file and converts the genre column 
-    from a string representation to actual Python lists.
+    Loads the book dataset from a CSV file with the compact column types of
+    schema.py (categoricals, small numeric types, integer-coded genre lists).
+    Cached as a shared resource, the dataset exists once per server process; its
+    numeric columns are mapped from a store shared by all processes of the node.
 
     Returns:
-        pd.DataFrame: The processed book dataset with parsed genre lists.
+        tuple: The book dataset (pd.DataFrame) and its genre lists (GenreLists).
     """
-    books = pd.read_csv("data/final_books_recommend.csv")
-
-    # Convert the "genre_list" column from string to actual list
-    books['genre_list'] = books['genre_list'].apply(
-        lambda x: ast.literal_eval(x) if pd.notna(x) else []
-    )
-
-    return books
+    with stage("load_books"):
+        books, genre_lists = read_books("data/final_books_recommend.csv")
+        return share_numeric_columns(books), genre_lists
 
 # Load the pre-trained "sentence transformer" model
+@budgeted("books/model", pinned=True)
 @st.cache_resource
 def load_model():
     """
-    Loads a pre-trained SentenceTransformer model to generate text embeddings.
+    Loads the pre-trained SentenceTransformer model of BOOK_MARKET_ENCODER
+    (all-mpnet-base-v2 by default) to generate text embeddings, in the CPU variant
+    of BOOK_MARKET_ENCODER_BACKEND (see encoder_backends.py).
 
     Returns:
         SentenceTransformer: The loaded language model.
     """
-    return SentenceTransformer('all-mpnet-base-v2')
+    return load_sentence_encoder(ENCODER, ENCODER_BACKEND)
 
-# Compute text embeddings for all original book descriptions
-@st.cache_data
-def compute_embeddings(_model, descriptions):
+# Shared encoder for the query texts of all sessions (micro-batches, see encoder_service.py)
+@st.cache_resource
+def load_encoder(_model):
     """
-    Computes text embeddings for a list of book descriptions using the loaded model.
+    Starts the encoder service that groups the query texts of concurrent sessions
+    into micro-batches, one forward pass of the model per batch.
 
     Parameters:
-        _model: The pre-trained language model (SentenceTransformer).
-        descriptions: A list of book descriptions as strings ("descriptions" column).
+        _model: The loaded language model (SentenceTransformer).
 
     Returns:
-        tensor: The generated embeddings as a 2D-tensor (PyTorch-Tensor).
+        EncoderService: The service, shared by all sessions.
     """
-    return _model.encode(descriptions, convert_to_tensor=True)
+    configure_torch_threads()
+    return EncoderService(
+        lambda texts: _model.encode(texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False)
+    )
 
-# load data and model before start
-books = load_data()
-model = load_model()
-descriptions = books['description'].tolist()
-embeddings = compute_embeddings(model, descriptions)
+# Fingerprint of the descriptions, computed once per dataset (key of the embeddings)
+@st.cache_resource
+def load_fingerprint(_books):
+    """
+    Computes the content fingerprint of all book descriptions and the model name
+    (with its encoder variant).
+
+    Parameters:
+        _books: The complete book dataset.
 
-# Function for similarity-based recommendation
-def find_similar_books(title, df, model, embeddings, top_n=5):
+    Returns:
+        str: Short fingerprint used as cache key and file name of the embeddings.
     """
-    Finds books similar to a selected title based on the description using 
-    cosine similarity between the target embedding und all other embeddings.
+    return content_fingerprint(_books['description'], store_model_name())
+
+# Row norms of the embeddings, for cosine similarities on the mapped matrix
+@st.cache_resource
+def load_embedding_norms(fingerprint, _embeddings):
+    """
+    Loads (or computes once) the norm of every embedding row.
 
     Parameters:
-        title (str): The title of the book to compare.
-        df (pd.DataFrame): The complete book dataset.
-        model (SentenceTransformer): The model to generate text embeddings.
-        embeddings (tensor): Computed embeddings of all book descriptions ("decription" column od a df).
-        top_n (int): Number of similar books to return (default=5).
+        fingerprint (str): Content fingerprint of the descriptions (cache key).
+        _embeddings: The embeddings (tensor over the mapped matrix).
+
+    Returns:
+        np.memmap: One float32 norm per book, mapped read-only.
+    """
+    return load_or_compute_norms(_embeddings.numpy(), fingerprint, encoder_dir())
+
+# Load the reduced-dimension projection of the embeddings (PCA by default, UMAP optional)
+@budgeted("books/projection", pinned=True)
+@st.cache_resource
+def load_projection(fingerprint, _embeddings):
+    """
+    Loads (or fits and stores) the projection used for first-stage retrieval.
+
+    Parameters:
+        fingerprint (str): Content fingerprint of the embeddings (cache key, and
+            checked against the stored projection).
+        _embeddings: The computed embeddings of all book descriptions.
+
+    Returns:
+        EmbeddingProjection: The fitted projection with the reduced corpus vectors.
+    """
+    return load_or_fit_projection(_embeddings, data_dir=encoder_dir(), fingerprint=fingerprint)
+
+# Load the 2-D coordinates for the corpus map
+@budgeted("books/corpus_map")
+@st.cache_resource
+def load_corpus_map(fingerprint, _embeddings):
+    """
+    Loads (or fits and stores) the 2-D projection of all books for the corpus map.
+
+    Parameters:
+        fingerprint (str): Content fingerprint of the embeddings (cache key, and
+            checked against the stored projection).
+        _embeddings: The computed embeddings of all book descriptions.
 
     Returns:
-        list: A list of tuples of similar books (index, similarity_score, title), ranked by cosine similarity.
+        np.ndarray: One (x, y) coordinate per book.
     """
-    # Find the row of the selected book 
-    target_row = df[df['title'] == title]
+    return corpus_map_coordinates(_embeddings, data_dir=encoder_dir(), fingerprint=fingerprint)
 
-    # Return an empty list if the row is empty
-    if target_row.empty:
-        return []
+# Load the TF-IDF vectorizer and sparse matrix (torch-free backend)
+@budgeted("books/tfidf", pinned=True)
+@st.cache_resource
+def load_tfidf(_books):
+    """
+    Loads (or builds and stores) the TF-IDF vectorizer and the sparse matrix of the
+    cleaned descriptions.
 
-    # Get the description of the target book and compute its embedding
-    target_desc = target_row.iloc[0]['description']
-    target_embedding = model.encode(target_desc, convert_to_tensor=True)
+    Parameters:
+        _books: The complete book dataset.
 
-    # Calculate cosine similarity between the target and all other books in the dataset
-    cos_sim = util.cos_sim(target_embedding, embeddings)[0]
-    top_results = torch.topk(cos_sim, k=top_n + 1)
+    Returns:
+        tuple: The TfidfVectorizer and the TfidfIndex.
+    """
+    return tfidf_backend.load_or_build_tfidf(_books)
 
-    results = []
-    for score, idx in zip(top_results.values, top_results.indices):
-        idx = idx.item()
-        score = score.item()
-        if df.iloc[idx]['title'] != title: 
-            results.append((idx, score, df.iloc[idx]['title']))
-        if len(results) == top_n:
-            break
+# Load the BM25 keyword index over titles and cleaned descriptions
+@budgeted("books/keyword_index", pinned=True)
+@st.cache_resource
+def load_keyword_index(_books):
+    """
+    Loads (or builds and stores) the inverted keyword index.
 
-    return results
+    Parameters:
+        _books: The complete book dataset.
+
+    Returns:
+        KeywordIndex: The BM25 index over titles and "clean_description".
+    """
+    return load_or_build_keyword_index(_books)
 
-# Function for word cloud generation
+# Open the precomputed neighbour table (offline job neighbour_table.py)
+@budgeted("books/neighbours", pinned=True)
+@st.cache_resource
+def load_neighbours(_books):
+    """
+    Opens the precomputed top-k neighbours of every book, if they exist and were
+    computed from the current descriptions with the current encoder.
+
+    Parameters:
+        _books: The complete book dataset.
+
+    Returns:
+        NeighbourTable: The table, or None (then every request uses the live search).
+    """
+    return load_neighbour_table(_books['title'], descriptions=_books['description'], model=store_model_name())
+
+# Build the hash index from title, author and ISBN to row positions
+@budgeted("books/catalog", pinned=True)
+@st.cache_resource
+def load_catalog(_books):
+    """
+    Builds the catalogue index once, so looking up a book by title, author or ISBN
+    does not scan the whole column.
+
+    Parameters:
+        _books: The complete book dataset.
+
+    Returns:
+        CatalogIndex: Normalized title/author/ISBN keys -> row positions.
+    """
+    return CatalogIndex(_books)
+
+# Build the search-as-you-type indexes for the book and author pickers
+@budgeted("books/autocomplete", pinned=True)
+@st.cache_resource
+def load_autocomplete(_books):
+    """
+    Builds the prefix/trigram indexes over all titles and authors once, so the pickers
+    only receive the best matches instead of the complete sorted lists.
+
+    Parameters:
+        _books: The complete book dataset.
+
+    Returns:
+        tuple: AutocompleteIndex over the titles and AutocompleteIndex over the authors.
+    """
+    return AutocompleteIndex(_books['title']), AutocompleteIndex(_books['author'])
+
+# Build the presorted query engine for the filters (rating, year, genre, author)
+@budgeted("books/query_engine", pinned=True)
+@st.cache_resource
+def load_query_engine(_books, _catalog, _genre_lists):
+    """
+    Presorts the books by rating and builds the genre bitmaps once, so the filter-only
+    mode only looks at as many books as it displays.
+
+    Parameters:
+        _books: The complete book dataset.
+        _catalog: The catalogue index (for the author filter).
+        _genre_lists: The encoded genre lists of all books.
+
+    Returns:
+        BookQueryEngine: Query engine over all books, its arrays shared by all
+        server processes of the node.
+    """
+    return load_shared_engine(_books, _catalog, _genre_lists)
+
+# Function for keyword and hybrid search
+def search_books(query, df, model, embeddings, keyword_index, top_n=5, hybrid=True, depth=100, encoder=None, norms=None):
+    """
+    Searches books by free text. The keyword mode ranks by BM25 on titles and
+    descriptions, the hybrid mode fuses these hits with the embedding neighbours
+    of the query text using reciprocal rank fusion.
+
+    Parameters:
+        query (str): The search words (e.g. themes like "dragons school magic").
+        df (pd.DataFrame): The complete book dataset.
+        model: The model to encode the query (SentenceTransformer or TfidfVectorizer).
+        embeddings: Computed embeddings (tensor) or TF-IDF index of all books.
+        keyword_index (KeywordIndex): The BM25 index.
+        top_n (int): Number of books to return (default=5).
+        hybrid (bool): Fuse keyword hits with embedding neighbours (default=True).
+        depth (int): Number of hits taken from each ranking before fusing.
+        encoder (EncoderService): Optional shared encoder; the query is then encoded in a
+            micro-batch together with the queries of other sessions.
+        norms: Optional row norms of the embeddings (see find_similar_books).
+
+    Returns:
+        list: A list of tuples (index, score, title), best first.
+    """
+    with stage("keyword_search"):
+        keyword_hits = keyword_index.search(query, top_n=depth if hybrid else top_n)
+    if not hybrid:
+        return [(idx, score, df.iloc[idx]['title']) for idx, score in keyword_hits]
+
+    # Embedding neighbours of the query text
+    if RECOMMENDER_BACKEND == "tfidf":
+        with stage("encode"):
+            query_vector = model.transform([query])
+        with stage("similarity_search"):
+            neighbour_ids, _ = embeddings.top_k(query_vector, depth)
+        neighbour_ids = neighbour_ids.tolist()
+    else:
+        with stage("encode"):
+            if encoder is not None:
+                query_embedding = torch.from_numpy(encoder.encode(query))
+            else:
+                query_embedding = model.encode(query, convert_to_tensor=True)
+        with stage("similarity_search"):
+            cos_sim = cosine_similarity(query_embedding, embeddings, norms)
+            neighbour_ids = torch.topk(cos_sim, k=min(depth, len(cos_sim))).indices.tolist()
+
+    fused = reciprocal_rank_fusion(
+        [[idx for idx, _ in keyword_hits], neighbour_ids], top_n=top_n
+    )
+    return [(idx, score, df.iloc[idx]['title']) for idx, score in fused]
+
+# load data and model before start
+books, genre_lists = load_data()
+keyword_index = load_keyword_index(books)
+catalog = load_catalog(books)
+title_index, author_index = load_autocomplete(books)
+query_engine = load_query_engine(books, catalog, genre_lists)
+# With BOOK_MARKET_SERVICE_URL the similar books come from book_service.py, so the
+# page loads neither the model nor the embeddings and their indexes (the search
+# then only offers the keyword mode, the corpus map is not shown)
+service = load_client()
+if service is not None:
+    model = None
+    encoder = None
+    embeddings = None
+    embedding_norms = None
+    projection = None
+    neighbours = None
+    similar_books = service.similar_books
+elif RECOMMENDER_BACKEND == "tfidf":
+    model, embeddings = load_tfidf(books)
+    encoder = None
+    embedding_norms = None
+    projection = None
+    neighbours = None
+    similar_books = tfidf_backend.find_similar_books
+else:
+    model = load_model()
+    encoder = load_encoder(model)
+    fingerprint = load_fingerprint(books)
+    embeddings = load_embeddings(fingerprint, model, books['description'])
+    embedding_norms = load_embedding_norms(fingerprint, embeddings)
+    projection = load_projection(fingerprint, embeddings)
+    neighbours = load_neighbours(books)
+    similar_books = find_similar_books
+
+# Function for word cloud generation (cached per text, so reruns do not draw it again)
+@st.cache_data(max_entries=256, show_spinner=False)
+@instrumented("wordcloud")
 def generate_wordcloud(text):
     """
-    Generates a word cloud image from the given text and returns it as an in-memory image buffer.
+    Generates a word cloud image from the given text and returns it as PNG bytes.
 
     Parameters:
         text (str): The input text used to generate the word cloud (from the "clean_description" column, i.e description without stopwords) .
 
     Returns:
-        BytesIO: A buffer containing the PNG image of the generated word cloud.
+        bytes: The PNG image of the generated word cloud.
     """
     wordcloud = WordCloud(
         width=800,
@@ -130,16 +362,53 @@ def generate_wordcloud(text):
 
     # Store generated image in memory buffer
     img_buffer = BytesIO()
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation='bilinear') # glättet die Pixel
-    plt.axis("off")
-    plt.tight_layout()
-    plt.savefig(img_buffer, format='png')
+    # explicit figure instead of the pyplot state machine: sessions draw in parallel threads
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.imshow(wordcloud, interpolation='bilinear') # glättet die Pixel
+    ax.axis("off")
+    fig.tight_layout()
+    fig.savefig(img_buffer, format='png')
+    plt.close(fig)
+    return img_buffer.getvalue()
+
+# Function for the corpus map
+@instrumented("corpus_map")
+def plot_corpus_map(coordinates, selected_idx=None, highlighted_ids=()):
+    """
+    Draws all books as points of the 2-D projection and marks the selected book and
+    its recommendations.
+
+    Parameters:
+        coordinates (np.ndarray): The 2-D coordinates of all books (see load_corpus_map).
+        selected_idx (int): Row position of the selected book (optional).
+        highlighted_ids (iterable): Row positions of the recommended books (optional).
+
+    Returns:
+        BytesIO: A buffer containing the PNG image of the map.
+    """
+    img_buffer = BytesIO()
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.scatter(coordinates[:, 0], coordinates[:, 1], s=2, color='#cccccc', rasterized=True)
+
+    highlighted_ids = list(highlighted_ids)
+    if highlighted_ids:
+        ax.scatter(coordinates[highlighted_ids, 0], coordinates[highlighted_ids, 1],
+                   s=30, color='#6D597A', label='Empfehlungen')
+    if selected_idx is not None:
+        ax.scatter(coordinates[selected_idx, 0], coordinates[selected_idx, 1],
+                   s=120, marker='*', color='#E56B6F', label='Dein Buch')
+        ax.legend(loc='best')
+
+    ax.set_axis_off()
+    fig.tight_layout()
+    fig.savefig(img_buffer, format='png')
     img_buffer.seek(0)
-    plt.close()
+    plt.close(fig)
     return img_buffer
 
-# Function for book cover image
+# Function for book cover image (cached per ISBN, so reruns do not query the API again)
+@st.cache_data(ttl=24 * 3600, max_entries=4096, show_spinner=False)
+@instrumented("cover_http")
 def get_book_cover(isbn):
     """
     Retrieves a book cover image using the ISBN via the Open Library API.
@@ -155,7 +424,7 @@ def get_book_cover(isbn):
     if pd.isna(isbn) or isbn == '':
         return "https://via.placeholder.com/120x180.png?text=No+Cover"
 
-    cover_url = f"https://covers.openlibrary.org/b/isbn/{isbn}-M.jpg"
+    cover_url = COVER_URL.format(isbn=isbn)
     
     # Check if the image exists at the URL
     response = requests.get(cover_url)
@@ -165,7 +434,267 @@ def get_book_cover(isbn):
         # If image is not found, display fallback placeholder
         return "https://placehold.co/120x180?text=No+Cover&font=roboto"
 
+# Candidates of the similarity search per title (independent of the filters, so a
+# filter change only re-ranks the cached candidates)
+@st.cache_data(max_entries=1024, show_spinner=False)
+def similar_candidates(title):
+    """
+    Returns the 50 most similar books of a title (see find_similar_books).
+
+    Parameters:
+        title (str): The title of the selected book.
+
+    Returns:
+        list: A list of tuples (index, similarity_score, title).
+    """
+    return similar_books(
+        title=title,
+        df=books,
+        model=model,
+        embeddings=embeddings,
+        top_n=50, # return many books so the filter can be applied to them
+        projection=projection,
+        neighbour_table=neighbours,
+        catalog=catalog,
+        norms=embedding_norms
+    )
+
+# Hits of the keyword / hybrid search per query (independent of the filters)
+@st.cache_data(max_entries=1024, show_spinner=False)
+def search_candidates(query, hybrid):
+    """
+    Returns the 50 best hits of a search (see search_books).
+
+    Parameters:
+        query (str): The search words.
+        hybrid (bool): Fuse keyword hits with embedding neighbours.
+
+    Returns:
+        list: A list of tuples (index, score, title).
+    """
+    return search_books(
+        query=query,
+        df=books,
+        model=model,
+        embeddings=embeddings,
+        keyword_index=keyword_index,
+        top_n=50, # return many books so the filter can be applied to them
+        hybrid=hybrid,
+        encoder=encoder,
+        norms=embedding_norms
+    )
+
 # STREAMLIT UI 
+def filter_widgets():
+    """
+    Shows the filter selection (shared by all options, the values are kept in the
+    session state under the widget keys).
+
+    Returns:
+        tuple: Minimal rating, year range, selected genres and number of results.
+    """
+    st.markdown("#### Du hast folgende Filteroptionen (optional)")
+    with st.expander("Filter anzeigen / ausblenden"):
+
+        min_rating = st.slider(
+            "Minimale durchschnittliche Bewertung",
+            min_value=0.0,
+            max_value=5.0,
+            #value=3.5,
+            step=0.1,
+            help="Wie viel sollte die minimale Bewertung sein?",
+            key="min_avg_rating"
+        )
+
+        selected_year = st.slider(
+            "Erscheinungsjahr",
+            min_value=1811,
+            max_value=2018,
+            value=(1811, 2018),
+            step=1,
+            help="Begrenzt die Auswahl auf Bücher aus bestimmten Jahren.",
+            key="filter_years"
+        )
+
+        selected_genres = st.multiselect(
+            "Genres (mehrere möglich)",
+            options=query_engine.genre_names,
+            key="filter_genres"
+        )
+
+        num_results = st.selectbox(
+            "Wie viele Bücher möchtest du angezeigt bekommen?",
+            options=[5, 10, 20],
+            index=0,
+            key="select_num_results"
+        )
+    return min_rating, selected_year, selected_genres, num_results
+
+# The filters and results of each option are fragments: changing a filter reruns
+# only the fragment (re-ranking the cached candidates), not the whole page with the
+# selected book, its cover and word cloud. A button press is kept in the session
+# state, so the results stay visible while the filters change.
+
+# Option 1: filters and similar books of the selected title
+@st.fragment
+@timed("recommendations/similar_books")
+def similar_books_panel(selected_title, selected_idx):
+    min_rating, selected_year, selected_genres, num_results = filter_widgets()
+
+    if st.button("Ähnliche Bücher finden"):
+        st.session_state["similar_books_for"] = selected_title
+
+    recommendations = []
+
+    if st.session_state.get("similar_books_for") == selected_title:
+
+        st.markdown("### Ähnliche Bücher")
+
+        recommendations = similar_candidates(selected_title)
+
+        # Apply filters (all selected genres must match)
+        matches = query_engine.mask(
+            [idx for idx, _, _ in recommendations],
+            min_rating=min_rating,
+            years=selected_year,
+            genres=selected_genres
+        )
+        filtered_recommendations = [
+            (books.iloc[idx], score)
+            for (idx, score, _), match in zip(recommendations, matches) if match
+        ]
+
+        # If there are no books matching the filters
+        if not filtered_recommendations:
+            st.warning("Keine passenden Buchempfehlungen gefunden. Bitte passe deine Filter an.")
+        # Display books matching the filters
+        else:
+            for book_row, score in filtered_recommendations[:num_results]:
+                with st.container():
+                    left_col, middle_col, right_col = st.columns([1, 2, 2])
+                    with left_col:
+                        st.image(get_book_cover(book_row['isbn']), width=150)
+                    with middle_col:
+                        st.markdown(f"### {book_row['title']} ({book_row['publication_year']})")
+                        st.markdown(f"**Autor:** {book_row['author']}")
+                        st.markdown(f"**Genres:** {book_row['genres']}")
+                        st.markdown(f"**Bewertung:** {book_row['avg_rating']} ({book_row['ratings_count']} Bewertungen)")
+                        st.markdown(f"**Ähnlichkeit:** {100 * score:.1f}%")
+
+                        with st.expander("Buchbeschreibung anzeigen"):
+                            st.write(book_row['description'])
+
+                    with right_col:
+                        wc_img = generate_wordcloud(book_row['clean_description'])
+                        st.image(wc_img, use_container_width=True)
+
+                st.markdown("---") 
+
+    # Corpus map (2-D projection of all embeddings), only computed on demand
+    if projection is not None and st.toggle("🗺️ Buchkarte anzeigen", key="show_corpus_map"):
+        st.markdown("### Buchkarte")
+        st.caption("Jeder Punkt ist ein Buch – nahe Punkte haben ähnliche Beschreibungen.")
+        st.image(
+            plot_corpus_map(
+                load_corpus_map(fingerprint, embeddings),
+                selected_idx=selected_idx,
+                highlighted_ids=[idx for idx, _, _ in recommendations]
+            ),
+            use_container_width=True
+        )
+
+# Option 2: filters, author and the best rated matching books
+@st.fragment
+@timed("recommendations/filter_results")
+def filter_results_panel():
+    min_rating, selected_year, selected_genres, num_results = filter_widgets()
+
+    author_query = st.text_input(
+        "Autor suchen (optional)",
+        placeholder="Namen eingeben...",
+        key="author_search"
+    )
+    selected_author = st.selectbox(
+        "Autor (optional)",
+        options=["Alle Autoren"] + author_index.search(author_query),
+        index=0,
+        key="filter_author"
+    )
+
+    if st.button("Bücher finden"):
+        st.session_state["show_filtered_books"] = True
+
+    # Display the books that match the filters (at least one of the selected genres),
+    # best rated first; only the displayed rows are taken from the dataset
+    if st.session_state.get("show_filtered_books"):
+        query = dict(
+            min_rating=min_rating,
+            years=selected_year,
+            genres=selected_genres,
+            author=None if selected_author == "Alle Autoren" else selected_author,
+            genre_mode="any"
+        )
+        st.markdown(f"**{query_engine.count(**query)} Bücher gefunden**")
+        top_rows = query_engine.top(num_results, **query)
+
+        # If there are no books matching the filters
+        if not top_rows:
+            st.warning("Leider keine Bücher gefunden. Bitte passe deine Filter an.")
+
+        # Display books matching the filters (image and book details)
+        else:
+            for _, row in books.iloc[top_rows].iterrows():
+                with st.container():
+                    left_col, right_col = st.columns([1, 4])
+                    with left_col:
+                        st.image(get_book_cover(row['isbn']), width=200)
+                    with right_col:
+                        st.markdown(f"### {row['title']} ({row['publication_year']})")
+                        st.markdown(f"**Autor:** {row['author']}")
+                        st.markdown(f"**Genres:** {row['genres']}")
+                        st.markdown(f"**Bewertung:** {row['avg_rating']}")
+                st.markdown("---")
+
+# Option 3: filters and the hits of the search
+@st.fragment
+@timed("recommendations/search_results")
+def search_results_panel(query, hybrid):
+    min_rating, selected_year, selected_genres, num_results = filter_widgets()
+
+    search_results = search_candidates(query, hybrid)
+
+    # Apply filters (all selected genres must match)
+    matches = query_engine.mask(
+        [idx for idx, _, _ in search_results],
+        min_rating=min_rating,
+        years=selected_year,
+        genres=selected_genres
+    )
+    filtered_results = [
+        books.iloc[idx] for (idx, _, _), match in zip(search_results, matches) if match
+    ]
+
+    # If there are no books matching the query and the filters
+    if not filtered_results:
+        st.warning("Leider keine Bücher gefunden. Bitte passe Suchbegriff oder Filter an.")
+
+    # Display books matching the query (image and book details)
+    else:
+        for row in filtered_results[:num_results]:
+            with st.container():
+                left_col, right_col = st.columns([1, 4])
+                with left_col:
+                    st.image(get_book_cover(row['isbn']), width=200)
+                with right_col:
+                    st.markdown(f"### {row['title']} ({row['publication_year']})")
+                    st.markdown(f"**Autor:** {row['author']}")
+                    st.markdown(f"**Genres:** {row['genres']}")
+                    st.markdown(f"**Bewertung:** {row['avg_rating']}")
+
+                    with st.expander("Buchbeschreibung anzeigen"):
+                        st.write(row['description'])
+            st.markdown("---")
+
 def show():
     # HTML code for title and subtitle styling
     st.markdown(
@@ -212,77 +741,35 @@ def show():
     st.markdown("### Wähle aus, wie du Buchempfehlungen erhalten möchtest:")
     option = st.radio(
         label=" ",
-        options=("Finde ähnliche Bücher zu deinem Favoriten", "Finde Bücher nach Genre, Bewertung und mehr"),
+        options=(
+            "Finde ähnliche Bücher zu deinem Favoriten",
+            "Finde Bücher nach Genre, Bewertung und mehr",
+            "Suche nach Themen und Stichwörtern",
+        ),
         key="empfehlung_option_radio_main"
     )
 
-# Filter selection (for both options)
-    st.markdown("#### Du hast folgende Filteroptionen (optional)")
-    with st.expander("Filter anzeigen / ausblenden"):
-
-        min_rating = st.slider(
-            "Minimale durchschnittliche Bewertung",
-            min_value=0.0,
-            max_value=5.0,
-            #value=3.5,
-            step=0.1,
-            help="Wie viel sollte die minimale Bewertung sein?",
-            key="min_avg_rating"
-        )
-
-        selected_year = st.slider(
-            "Erscheinungsjahr",
-            min_value=1811,
-            max_value=2018,
-            value=(1811, 2018),
-            step=1,
-            help="Begrenzt die Auswahl auf Bücher aus bestimmten Jahren.",
-            key="filter_years"
-        )
-
-        selected_genres = st.multiselect(
-            "Genres (mehrere möglich)",
-            options=sorted({genre for sublist in books['genre_list'].dropna().tolist() for genre in sublist}),
-            key="filter_genres"
-        )
-        
-        # Initialize author filter (only for the 2nd option "Finde Bücher nach Genre, Bewertung und mehr")
-        selected_author = None
-
-        if option == "Über Filter (Genre, Bewertung etc.)":
-            selected_author = st.selectbox(
-                "Autor (optional)",
-                options=["Alle Autoren"] + sorted(books['author'].unique().tolist()),
-                index=0,
-                key="filter_author"
-            )
-
-        num_results = st.selectbox(
-            "Wie viele Bücher möchtest du angezeigt bekommen?",
-            options=[5, 10, 20],
-            index=0,
-            key="select_num_results"
-        )
-
 # Option 1: similar books based on selected title
     if option == "Finde ähnliche Bücher zu deinem Favoriten":
+        title_query = st.text_input(
+            "Buchtitel suchen",
+            placeholder="Buchtitel eingeben (kleine Tippfehler sind kein Problem)...",
+            key="book_search"
+        )
         selected_title = st.selectbox(
             "Wähle ein Buch aus der Liste aus, das dir gefallen hat", 
-            sorted(books['title'].unique()),
+            title_index.search(title_query),
             index=None,
-            placeholder="Buchtitel eingeben oder auswählen...",
+            placeholder="Buchtitel auswählen...",
             key="book_selectbox")
 
         if not selected_title:
             st.info(f"Bitte wähle ein Buch aus der Liste.")
             return
-        
-        recommendations = []
-
-        show_similar_books = st.button("Ähnliche Bücher finden")
 
         # Display selected book details 
-        selected_book = books[books['title'] == selected_title].iloc[0]
+        selected_idx = catalog.first("title", selected_title)
+        selected_book = books.iloc[selected_idx]
         year = selected_book['publication_year']
         book_author = selected_book['author']
         rating = selected_book['avg_rating']
@@ -315,113 +802,32 @@ def show():
 
         st.markdown("---")
 
-        recommendations = []
-
-        if show_similar_books:
-
-            st.markdown("### Ähnliche Bücher")
-
-            recommendations = find_similar_books(
-                title=selected_title,
-                df=books,
-                model=model,
-                embeddings=embeddings,
-                top_n=50 # return many books so the filter can be applied to them
-            )
-
-            filtered_recommendations = []
-            for idx, score, title in recommendations:
-                row = books.iloc[idx]
-
-                # Apply filters
-                if (
-                    row['avg_rating'] >= min_rating and
-                    selected_year[0] <= row['publication_year'] <= selected_year[1] and
-                    all(genre in row['genre_list'] for genre in selected_genres)
-                ):
-                    filtered_recommendations.append((row, score))
-
-            # If there are no books matching the filters
-            if not filtered_recommendations:
-                st.warning("Keine passenden Buchempfehlungen gefunden. Bitte passe deine Filter an.")
-            # Display books matching the filters
-            else:
-                for book_row, score in filtered_recommendations[:num_results]:
-                    with st.container():
-                        left_col, middle_col, right_col = st.columns([1, 2, 2])
-                        with left_col:
-                            st.image(get_book_cover(book_row['isbn']), width=150)
-                        with middle_col:
-                            st.markdown(f"### {book_row['title']} ({book_row['publication_year']})")
-                            st.markdown(f"**Autor:** {book_row['author']}")
-                            st.markdown(f"**Genres:** {book_row['genres']}")
-                            st.markdown(f"**Bewertung:** {book_row['avg_rating']} ({book_row['ratings_count']} Bewertungen)")
-                            st.markdown(f"**Ähnlichkeit:** {100 * score:.1f}%")
-
-                            with st.expander("Buchbeschreibung anzeigen"):
-                                st.write(book_row['description'])
-
-                        with right_col:
-                            wc_img = generate_wordcloud(book_row['clean_description'])
-                            st.image(wc_img, use_container_width=True)
-
-                    st.markdown("---") 
+        similar_books_panel(selected_title, selected_idx)
 
 # Option 2: Filter-only option
     elif option == "Finde Bücher nach Genre, Bewertung und mehr":
-        selected_author = st.selectbox(
-            "Autor (optional)",
-            options=["Alle Autoren"] + sorted(books['author'].dropna().unique().tolist()),
-            index=0,
-            key="filter_author"
+        filter_results_panel()
+
+# Option 3: keyword / hybrid search in titles and descriptions
+    elif option == "Suche nach Themen und Stichwörtern":
+        query = st.text_input(
+            "Wonach suchst du?",
+            placeholder="z. B. dragons magic school",
+            key="keyword_query"
+        )
+        search_modes = ("Stichwörter", "Hybrid (Stichwörter + Bedeutung)") if embeddings is not None else ("Stichwörter",)
+        search_mode = st.radio(
+            "Suchmodus",
+            options=search_modes,
+            horizontal=True,
+            key="keyword_search_mode"
         )
 
-        show_filtered_books = st.button("Bücher finden")
-
-        filtered_df = books.copy()
-
-        # Apply author filter
-        if selected_author != "Alle Autoren":
-            filtered_df = filtered_df[filtered_df['author'] == selected_author]
-
-        # Apply avg_ryting and publication_year filters
-        filtered_df = filtered_df[
-            (filtered_df['avg_rating'] >= min_rating) &
-            (filtered_df['publication_year'] >= selected_year[0]) &
-            (filtered_df['publication_year'] <= selected_year[1])
-        ]
-
-        # Apply genre filter
-        if selected_genres:
-            filtered_df = filtered_df[
-                filtered_df['genre_list'].apply(
-                    lambda genre_list: any(selected in genre_list for selected in selected_genres)
-                )
-            ]
-
-        filtered_df = filtered_df.sort_values(by="avg_rating", ascending=False)
-
-        # Display the number of books that match the filters
-        if show_filtered_books:
-            st.markdown(f"**{len(filtered_df)} Bücher gefunden**")
-
-            # If there are no books matching the filters
-            if filtered_df.empty:
-                st.warning("Leider keine Bücher gefunden. Bitte passe deine Filter an.")
+        if not query:
+            st.info("Bitte gib einen Suchbegriff ein.")
+            return
 
-            # Display books matching the filters (image and book details)
-            else:
-                for _, row in filtered_df.head(num_results).iterrows():
-                    with st.container():
-                        left_col, right_col = st.columns([1, 4])
-                        with left_col:
-                            st.image(get_book_cover(row['isbn']), width=200)
-                        with right_col:
-                            st.markdown(f"### {row['title']} ({row['publication_year']})")
-                            st.markdown(f"**Autor:** {row['author']}")
-                            st.markdown(f"**Genres:** {row['genres']}")
-                            st.markdown(f"**Bewertung:** {row['avg_rating']}")
-                    st.markdown("---")
+        search_results_panel(query, hybrid=search_mode != "Stichwörter")
 
  # Run the app   
 show()
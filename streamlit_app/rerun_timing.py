@@ -0,0 +1,47 @@
+# rerun_timing.py
+
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from metrics import stage
+
+# Wall time of script runs and fragment reruns, per scope ("app/<page>" for the
+# whole script, "<page>/<panel>" for a fragment). With BOOK_MARKET_RERUN_LOG set,
+# every timed run appends one JSON line to that file; benchmarks/bench_reruns.py
+# uses it to compare the latency of each widget before (whole script) and after
+# (only its fragment). Without the variable nothing is written. With the metrics
+# switched on (metrics.py), the durations also go to the rerun_seconds histograms.
+#
+#   with timed("app/Empfehlungssystem"):        # block
+#       recommendations.show()
+#
+#   @st.fragment
+#   @timed("film/threshold_panel")              # function (e.g. a fragment)
+#   def threshold_panel(...):
+
+LOG_PATH = os.environ.get("BOOK_MARKET_RERUN_LOG")
+
+
+@contextmanager
+def timed(scope):
+    """Measures the enclosed block (or decorated function) and logs it under scope."""
+    start = time.perf_counter()
+    try:
+        with stage(scope, family="rerun_seconds"):
+            yield
+    finally:
+        if LOG_PATH:
+            record = {"scope": scope, "ms": (time.perf_counter() - start) * 1000, "time": time.time()}
+            with open(LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+
+def read_log(path=None):
+    """All records of the log file (oldest first)."""
+    path = path or LOG_PATH
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,233 @@
+# resources.py
+
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Memory accounting of the objects cached with st.cache_resource/st.cache_data
+# (books frame, embeddings, model, film data, dashboard cubes, ...) and a total
+# budget per server process. Every cached loader is registered with @budgeted:
+#
+#   @budgeted("film/pipeline")
+#   @st.cache_resource
+#   def load_pipeline(version): ...
+#
+# Each call marks the entry (loader + arguments without the _ arguments) as used;
+# its size is estimated once, when it is first seen. If the registered entries
+# exceed BOOK_MARKET_CACHE_BUDGET_MB, the least recently used ones are evicted
+# from their Streamlit cache (loader.clear(*args)) until the total fits again.
+# Entries marked pinned are only counted: objects that recommendations.py keeps
+# as module globals (books, model, embeddings) would not be freed by clearing the
+# cache anyway. The admin page shows the table and allows manual eviction.
+
+BUDGET_MB = float(os.environ.get("BOOK_MARKET_CACHE_BUDGET_MB", 0))  # 0: no limit
+
+# Containers with more items are estimated from a sample
+SAMPLE_ITEMS = 1000
+MAX_DEPTH = 6
+
+
+def estimate_bytes(obj, exclude_ids=(), _seen=None, _depth=0):
+    """
+    Estimated memory held by an object: exact for pandas objects, arrays, tensors,
+    models (parameters and buffers) and sparse matrices, recursive for containers
+    and plain objects. Objects whose id is in exclude_ids (held by other entries)
+    and objects seen before are not counted again.
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen or id(obj) in exclude_ids or obj is None:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes) if obj.base is None or obj.base is obj else 0
+    if isinstance(obj, (bytes, bytearray, str)):
+        return sys.getsizeof(obj)
+    # torch tensors
+    if hasattr(obj, "element_size") and hasattr(obj, "nelement"):
+        return int(obj.element_size() * obj.nelement())
+    # torch modules (e.g. SentenceTransformer): parameters and buffers
+    if callable(getattr(obj, "parameters", None)) and callable(getattr(obj, "buffers", None)):
+        return int(sum(t.element_size() * t.nelement() for t in list(obj.parameters()) + list(obj.buffers())))
+    # scipy sparse matrices
+    if all(hasattr(obj, name) for name in ("data", "indices", "indptr")):
+        return int(sum(getattr(obj, name).nbytes for name in ("data", "indices", "indptr")))
+    if _depth >= MAX_DEPTH:
+        return sys.getsizeof(obj)
+
+    def children_size(items):
+        items = list(items)
+        if len(items) <= SAMPLE_ITEMS:
+            return sum(estimate_bytes(item, exclude_ids, seen, _depth + 1) for item in items)
+        step = len(items) / SAMPLE_ITEMS
+        sample = [items[int(i * step)] for i in range(SAMPLE_ITEMS)]
+        return int(sum(estimate_bytes(item, exclude_ids, seen, _depth + 1) for item in sample) * step)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += children_size(obj.keys()) + children_size(obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += children_size(obj)
+    elif hasattr(obj, "__dict__"):
+        size += children_size(vars(obj).values())
+    elif hasattr(obj, "__slots__"):
+        size += children_size(getattr(obj, name) for name in obj.__slots__ if hasattr(obj, name))
+    return size
+
+
+def _value_ids(value):
+    """Ids of a cached value and of its direct parts (loaders return tuples)."""
+    ids = {id(value)}
+    if isinstance(value, (tuple, list)):
+        ids.update(id(item) for item in value)
+    return ids
+
+
+class Entry:
+    """One cached object: loader call, estimated size and usage."""
+
+    def __init__(self, key, name, value, evict, pinned):
+        self.key = key
+        self.name = name
+        self.evict = evict
+        self.pinned = pinned
+        self.value_ids = _value_ids(value)
+        self.bytes = 0
+        self.hits = 0
+        self.loaded = time.time()
+        self.last_used = self.loaded
+
+
+class ResourceRegistry:
+    """Cached objects of the process in LRU order, with an optional byte budget."""
+
+    def __init__(self, budget_bytes=0):
+        self.budget_bytes = budget_bytes
+        self.entries = OrderedDict()
+        self.evictions = 0
+        self.lock = threading.RLock()
+
+    def track(self, key, name, value, evict=None, pinned=False):
+        """Marks an entry as used (registering and sizing it on first use) and enforces the budget."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or not (entry.value_ids & _value_ids(value)):
+                entry = Entry(key, name, value, evict, pinned)
+                others = set().union(*(e.value_ids for e in self.entries.values() if e.key != key))
+                entry.bytes = estimate_bytes(value, exclude_ids=others)
+                self.entries[key] = entry
+            entry.hits += 1
+            entry.last_used = time.time()
+            self.entries.move_to_end(key)
+            self.enforce(keep=key)
+        return value
+
+    def total_bytes(self):
+        with self.lock:
+            return sum(entry.bytes for entry in self.entries.values())
+
+    def evict(self, key):
+        """Removes an entry from its cache (no-op for pinned entries); returns True if evicted."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.pinned:
+                return False
+            del self.entries[key]
+            self.evictions += 1
+        if entry.evict is not None:
+            entry.evict()
+        return True
+
+    def enforce(self, keep=None):
+        """Evicts least recently used entries until the total is within the budget."""
+        if not self.budget_bytes:
+            return
+        with self.lock:
+            total = self.total_bytes()
+            for key in list(self.entries):
+                if total <= self.budget_bytes:
+                    break
+                entry = self.entries[key]
+                if key == keep or entry.pinned:
+                    continue
+                total -= entry.bytes
+                self.evict(key)
+
+    def snapshot(self):
+        """Rows per entry, most recently used first."""
+        now = time.time()
+        with self.lock:
+            return [
+                {
+                    "key": entry.key,
+                    "name": entry.name,
+                    "bytes": entry.bytes,
+                    "hits": entry.hits,
+                    "idle_s": now - entry.last_used,
+                    "age_s": now - entry.loaded,
+                    "pinned": entry.pinned,
+                }
+                for entry in reversed(self.entries.values())
+            ]
+
+
+# One registry per server process
+REGISTRY = ResourceRegistry(int(BUDGET_MB * 2**20))
+
+
+def budgeted(name, pinned=False):
+    """
+    Registers the results of a cached loader (st.cache_resource/st.cache_data) in
+    the resource registry.
+
+    Parameters:
+        name (str): Name of the loader in the admin table, e.g. "film/pipeline".
+        pinned (bool): Only count the objects, never evict them.
+    """
+    def decorate(cached_func):
+        signature = inspect.signature(cached_func)
+
+        @functools.wraps(cached_func)
+        def wrapper(*args, **kwargs):
+            value = cached_func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            # like Streamlit: arguments starting with _ are not part of the cache key
+            shown = [f"{k}={v!r}" for k, v in bound.arguments.items() if not k.startswith("_")]
+            key = f"{name}({', '.join(shown)})"
+            REGISTRY.track(key, name, value, evict=lambda: cached_func.clear(*args, **kwargs), pinned=pinned)
+            return value
+
+        wrapper.clear = cached_func.clear
+        return wrapper
+    return decorate
+
+
+def process_memory():
+    """Resident set size and its peak of this process in bytes (None where unknown)."""
+    rss = None
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        peak = peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        peak = None
+    return {"rss": rss, "peak_rss": peak}
@@ -0,0 +1,251 @@
+# schema.py
+
+import argparse
+import ast
+import re
+import time
+import numpy as np
+import pandas as pd
+
+# Declared column types of the recommendation catalogue (final_books_recommend.csv).
+# Read with plain pandas defaults, every author, genre and title is a Python string
+# object and the genre lists are Python lists; with the schema
+#   - repeated strings (author, genres, main genre) become categoricals
+#   - years and counts get the smallest sufficient numeric type; ratings stay
+#     float64, since float32 rounds values like 4.2 below the slider value and
+#     rating >= min_rating would drop the books rated exactly at it
+#   - the genre lists become one integer code array plus row offsets (GenreLists)
+#
+#   python schema.py data/final_books_recommend.csv   (bytes per row before/after)
+#   python schema.py data/final_books_recommend.csv --convert data/final_books_recommend.csv
+#       (rewrites an old CSV with Python-literal genre lists in the native format)
+
+BOOKS_CSV = "data/final_books_recommend.csv"
+
+BOOK_SCHEMA = {
+    "author": "category",
+    "genres": "category",
+    "main_genre": "category",
+    "publication_year": "Int16",
+    "avg_rating": "float64",
+    "ratings_count": "int32",
+}
+
+GENRE_COLUMN = "genre_list"
+# The genre lists are stored as one delimiter-joined string per book ("Fantasy|Fiction")
+GENRE_DELIMITER = "|"
+
+
+class GenreLists:
+    """
+    Genre lists of all books as integer codes: the genres of row i are
+    categories[codes[offsets[i]:offsets[i + 1]]].
+    """
+
+    def __init__(self, codes, offsets, categories):
+        self.codes = codes
+        self.offsets = offsets
+        self.categories = categories
+
+    @classmethod
+    def from_lists(cls, lists):
+        """
+        Encodes an iterable of genre lists (missing values count as empty lists).
+        """
+        lists = [l if isinstance(l, (list, tuple)) else [] for l in lists]
+        lengths = np.fromiter((len(l) for l in lists), dtype=np.int64, count=len(lists))
+        return cls.from_flat([genre for l in lists for genre in l], lengths)
+
+    @classmethod
+    def from_flat(cls, flat, lengths):
+        """
+        Encodes all genres in row order (flat) and the number of genres per row.
+        """
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        codes, categories = pd.factorize(pd.Series(flat, dtype=object), sort=True)
+        code_dtype = np.int16 if len(categories) < np.iinfo(np.int16).max else np.int32
+        return cls(codes.astype(code_dtype), offsets, np.asarray(categories, dtype=object))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return self.categories[self.codes[self.offsets[row]:self.offsets[row + 1]]].tolist()
+
+    def rows(self):
+        """Row position of every entry of codes."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+
+    def to_lists(self):
+        """The genre lists as Python lists (e.g. for display or export)."""
+        return [self[row] for row in range(len(self))]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.offsets.nbytes + sum(len(c) for c in self.categories)
+
+
+def apply_schema(df, schema=BOOK_SCHEMA):
+    """
+    Casts the columns of a DataFrame to the declared types (missing columns are skipped).
+
+    Counts with missing values become the nullable Int32 instead of int32.
+
+    Parameters:
+        df (pd.DataFrame): The dataset as read from the CSV.
+        schema (dict): Column name -> dtype.
+
+    Returns:
+        pd.DataFrame: The same DataFrame with compact column types.
+    """
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+        if dtype.lower().startswith("int"):
+            values = pd.to_numeric(df[column], errors="coerce")
+            if dtype.startswith("int") and values.isna().any():
+                dtype = dtype.capitalize()
+            df[column] = values.round().astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def encode_genre_lists(lists, delimiter=GENRE_DELIMITER):
+    """
+    Joins genre lists into one string per book ("Fantasy|Fiction") for writing the CSV.
+
+    Parameters:
+        lists: Iterable of genre lists (missing values count as empty lists).
+        delimiter (str): Separator, must not occur in any genre name.
+
+    Returns:
+        pd.Series: The joined genre strings.
+    """
+    joined = []
+    for genres in lists:
+        genres = genres if isinstance(genres, (list, tuple)) else []
+        if any(delimiter in genre for genre in genres):
+            raise ValueError(f"Genre enthält das Trennzeichen {delimiter!r}: {genres}")
+        joined.append(delimiter.join(genres))
+    return pd.Series(joined, dtype=object)
+
+
+def _parse_literal_lists(values):
+    # Fallback for old CSVs that store Python literals ("['Fantasy', 'Fiction']")
+    return GenreLists.from_lists(
+        ast.literal_eval(v) if isinstance(v, str) else [] for v in values
+    )
+
+
+def parse_genre_lists(values, delimiter=GENRE_DELIMITER):
+    """
+    Parses the genre_list column into GenreLists.
+
+    Delimiter-joined strings ("Fantasy|Fiction") are split in one pass over the whole
+    column, without a Python list per book. Old files with Python literals
+    ("['Fantasy', 'Fiction']") are still read, with the slower literal parser.
+
+    Parameters:
+        values (pd.Series): The raw genre_list column.
+        delimiter (str): Separator of the native format.
+
+    Returns:
+        GenreLists: The encoded genre lists, one entry per row.
+    """
+    values = pd.Series(values, dtype=object).fillna("").astype(str).str.strip()
+    if values.str.startswith("[").any():
+        return _parse_literal_lists(values.where(values != "", None))
+
+    nonempty = values != ""
+    lengths = np.where(nonempty, values.str.count(re.escape(delimiter)) + 1, 0)
+    flat = delimiter.join(values[nonempty]).split(delimiter) if nonempty.any() else []
+    return GenreLists.from_flat(pd.Series(flat, dtype=object).str.strip(), lengths)
+
+
+def convert_catalogue(path, out_path, delimiter=GENRE_DELIMITER):
+    """
+    Rewrites an old catalogue CSV with the native genre encoding.
+
+    Parameters:
+        path (str): CSV with genre_list as Python literals.
+        out_path (str): Target CSV (may be the same path).
+        delimiter (str): Separator for the genre lists.
+    """
+    books = pd.read_csv(path)
+    if GENRE_COLUMN in books:
+        books[GENRE_COLUMN] = encode_genre_lists(
+            parse_genre_lists(books[GENRE_COLUMN]).to_lists(), delimiter
+        )
+    books.to_csv(out_path, index=False)
+
+
+def read_books(path=BOOKS_CSV):
+    """
+    Reads the recommendation catalogue with the declared schema.
+
+    Parameters:
+        path (str): Path to final_books_recommend.csv.
+
+    Returns:
+        tuple: The book dataset (pd.DataFrame, without the genre_list column) and
+        the encoded genre lists (GenreLists, one entry per row).
+    """
+    books = pd.read_csv(path)
+    genre_lists = parse_genre_lists(books.pop(GENRE_COLUMN)) if GENRE_COLUMN in books \
+        else GenreLists.from_lists([[]] * len(books))
+    return apply_schema(books), genre_lists
+
+
+def bytes_per_row(df, genre_lists=None):
+    """
+    Memory per row of a dataset, per column and in total.
+
+    Parameters:
+        df (pd.DataFrame): The dataset.
+        genre_lists (GenreLists): Encoded genre lists, counted as column "genre_list" (optional).
+
+    Returns:
+        pd.Series: Bytes per row per column, with the sum as "gesamt".
+    """
+    usage = df.memory_usage(index=False, deep=True)
+    if genre_lists is not None:
+        usage[GENRE_COLUMN] = genre_lists.nbytes
+    usage = usage / max(len(df), 1)
+    usage["gesamt"] = usage.sum()
+    return usage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per row of the catalogue with and without schema")
+    parser.add_argument("path", nargs="?", default=BOOKS_CSV)
+    parser.add_argument("--convert", metavar="OUT",
+                        help="Write the CSV with delimiter-joined genre lists to OUT")
+    args = parser.parse_args()
+
+    if args.convert:
+        convert_catalogue(args.path, args.convert)
+        print(f"✅ Katalog mit Genre-Trennzeichen {GENRE_DELIMITER!r} gespeichert unter: {args.convert}")
+        return
+
+    start = time.perf_counter()
+    books, genre_lists = read_books(args.path)
+    print(f"Geladen in {time.perf_counter() - start:.2f}s")
+
+    plain = pd.read_csv(args.path)
+    if GENRE_COLUMN in plain:
+        plain[GENRE_COLUMN] = genre_lists.to_lists()
+
+    before = bytes_per_row(plain)
+    report = pd.DataFrame({
+        "vorher": before,
+        "nachher": bytes_per_row(books, genre_lists),
+    }).reindex(before.index).fillna(0)
+    report["faktor"] = report["vorher"] / report["nachher"].where(report["nachher"] > 0)
+    print(f"{len(books)} Bücher, Bytes pro Zeile:")
+    print(report.round(1).to_string())
+
+
+if __name__ == "__main__":
+    main()
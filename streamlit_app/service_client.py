@@ -0,0 +1,165 @@
+# service_client.py
+
+import http.client
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+import numpy as np
+
+# Client of book_service.py. Every thread keeps its own connection open (keep-alive),
+# so a page or a load test does not pay a TCP handshake per request. With
+# BOOK_MARKET_SERVICE_URL set, the pages ask the service for similar books and film
+# predictions instead of computing them in the Streamlit process.
+#
+#   client = ServiceClient("http://127.0.0.1:8765")
+#   client.recommend(title="Dune", top_n=5, min_rating=4.0)["results"]
+#   client.predict({"Publishing_Year": 2024, "Author": "...", ...})["probability"]
+
+SERVICE_URL = os.environ.get("BOOK_MARKET_SERVICE_URL")
+TIMEOUT = float(os.environ.get("BOOK_MARKET_SERVICE_TIMEOUT", 10))
+# Records per /predict/batch request (the service accepts at most 1000)
+BATCH_SIZE = 1000
+
+
+class ServiceError(Exception):
+    """Error answer of the service (HTTP status and message)."""
+
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class ServiceClient:
+    """JSON calls of the book service over one kept-alive connection per thread."""
+
+    def __init__(self, url=SERVICE_URL, timeout=TIMEOUT, keep_alive=True):
+        """
+        Parameters:
+            url (str): Base URL of the service, e.g. http://127.0.0.1:8765.
+            timeout (float): Seconds per request.
+            keep_alive (bool): Reuse the connection (False: one connection per request,
+                for comparisons in the load test).
+        """
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def close(self):
+        """Closes the connection of the calling thread."""
+        connection = getattr(self.local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+    def request(self, method, path, payload=None):
+        """
+        Sends one request and returns the decoded JSON answer.
+
+        A kept-alive connection that the service has closed meanwhile (idle timeout,
+        restarted worker) is opened again once. After any other failure (e.g. a
+        timeout) the connection is dropped as well, so the next call of the thread
+        starts on a fresh one.
+
+        Raises:
+            ServiceError: For every answer other than 200, and with status 503 if the
+                service cannot be reached or does not answer in time.
+        """
+        body = None if payload is None else json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if not self.keep_alive:
+            headers["Connection"] = "close"
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                self.close()
+                if attempt:
+                    raise ServiceError(503, f"Verbindung getrennt: {e}") from e
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                raise ServiceError(503, f"Dienst nicht erreichbar: {e}") from e
+            except BaseException:
+                # e.g. KeyboardInterrupt during a request: the connection has an
+                # unfinished request and would refuse the next one
+                self.close()
+                raise
+        if not self.keep_alive or response.will_close:
+            self.close()
+        answer = json.loads(data) if data else {}
+        if response.status != 200:
+            raise ServiceError(response.status, answer.get("error", response.reason))
+        return answer
+
+    def health(self):
+        return self.request("GET", "/health")
+
+    def recommend(self, title=None, index=None, top_n=5, **filters):
+        """
+        Similar books of a title (or row position), or with neither the best books
+        matching the filters (min_rating, years, genres, genre_mode, author).
+        """
+        payload = dict(filters, top_n=top_n)
+        if title is not None:
+            payload["title"] = title
+        elif index is not None:
+            payload["index"] = int(index)
+        return self.request("POST", "/recommend", payload)
+
+    def recommend_batch(self, requests):
+        """Many recommend requests (dicts like the keyword arguments of recommend) at once."""
+        return self.request("POST", "/recommend/batch", {"requests": list(requests)})["results"]
+
+    def predict(self, record, threshold=0.5):
+        """Probability of a film adaptation of one book (dict of the new_books columns)."""
+        return self.request("POST", "/predict", {"record": record, "threshold": threshold})
+
+    def predict_batch(self, records, threshold=0.5):
+        """Probabilities of many books, sent in requests of BATCH_SIZE records."""
+        records = list(records)
+        results = []
+        for start in range(0, len(records), BATCH_SIZE):
+            results += self.request(
+                "POST", "/predict/batch", {"records": records[start:start + BATCH_SIZE], "threshold": threshold}
+            )["results"]
+        return results
+
+    def similar_books(self, title, df=None, model=None, embeddings=None, top_n=5, **unused):
+        """
+        Similar books of a title from the service, in the form of
+        similar_books.find_similar_books: a list of (index, score, title).
+        """
+        try:
+            results = self.recommend(title=title, top_n=top_n)["results"]
+        except ServiceError as e:
+            if e.status == 404:
+                return []
+            raise
+        return [(book["index"], book["score"], book["title"]) for book in results]
+
+
+def to_records(df):
+    """Rows of a DataFrame as JSON-ready dicts (NaN -> None, numpy -> Python types)."""
+    df = df.astype(object).where(df.notna(), None)
+    return [
+        {column: value.item() if isinstance(value, np.generic) else value for column, value in row.items()}
+        for row in df.to_dict("records")
+    ]
+
+
+def load_client(url=SERVICE_URL):
+    """The client of the configured service, or None if BOOK_MARKET_SERVICE_URL is not set."""
+    return ServiceClient(url) if url else None
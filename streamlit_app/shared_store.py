@@ -0,0 +1,209 @@
+# shared_store.py
+
+import hashlib
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Read-only arrays shared by all server processes of a node. With several Streamlit
+# workers per node every process used to hold its own copy of the embedding matrix,
+# the numeric catalogue columns and the arrays of the query engine. Now the first
+# process publishes them once as .npy files and every process attaches them with
+# np.load(mmap_mode="r"): the pages live in the page cache of the operating system
+# once per node, the workers only map them. Searches run directly on these
+# zero-copy views, nothing may write into them.
+#
+#   <SHARED_DIR>/<name>_<fingerprint>/<array>.npy
+#
+# A store is written into a temporary directory and renamed into place, so a
+# worker never attaches a half-written store; if two workers publish at the same
+# time the second one discards its copy. Publishing removes the stores of older
+# fingerprints (workers that still map them keep their pages until they exit).
+# BOOK_MARKET_SHARED_DIR can point at a tmpfs such as /dev/shm/book-market.
+
+SHARED_DIR = os.environ.get("BOOK_MARKET_SHARED_DIR", os.path.join("data", "shared"))
+MASK_SUFFIX = ".mask"
+
+
+def fingerprint(*parts):
+    """
+    Fingerprint of the content of arrays or pd.Series, in the given order.
+
+    Returns:
+        str: 16 hex characters, changes whenever a value or the row order changes.
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, pd.Series):
+            part = pd.util.hash_pandas_object(part, index=False).to_numpy()
+        part = np.ascontiguousarray(part)
+        digest.update(str((part.dtype.str, part.shape)).encode("utf-8"))
+        digest.update(part.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def store_dir(name, key, shared_dir=SHARED_DIR):
+    return os.path.join(shared_dir, f"{name}_{key}")
+
+
+def attach(name, key, shared_dir=SHARED_DIR):
+    """
+    Maps a published store read-only.
+
+    Parameters:
+        name (str): Name of the store (e.g. "books").
+        key (str): Fingerprint of the content.
+        shared_dir (str): Directory of the stores.
+
+    Returns:
+        dict: Array name -> read-only np.memmap, or None if the store does not exist.
+    """
+    path = store_dir(name, key, shared_dir)
+    if not os.path.isdir(path):
+        return None
+    return {
+        file_name[:-len(".npy")]: np.load(os.path.join(path, file_name), mmap_mode="r")
+        for file_name in sorted(os.listdir(path))
+        if file_name.endswith(".npy")
+    }
+
+
+def publish(name, key, arrays, shared_dir=SHARED_DIR):
+    """
+    Writes arrays as a store (once per node) and maps it read-only.
+
+    Parameters:
+        name (str): Name of the store.
+        key (str): Fingerprint of the content.
+        arrays (dict): Array name -> np.ndarray.
+        shared_dir (str): Directory of the stores.
+
+    Returns:
+        dict: Array name -> read-only np.memmap (see attach).
+    """
+    path = store_dir(name, key, shared_dir)
+    os.makedirs(shared_dir, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix=f".{name}_{key}.", dir=shared_dir)
+    try:
+        for array_name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{array_name}.npy"), np.ascontiguousarray(array))
+        os.rename(tmp_path, path)
+    except OSError:
+        # another worker was faster (or the directory is read-only): use its store
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+    else:
+        prune(name, keep=key, shared_dir=shared_dir)
+    return attach(name, key, shared_dir)
+
+
+def replace_directory(tmp_path, path):
+    """
+    Moves a completely written directory to path, replacing the directory there.
+
+    The old directory is renamed away first and then deleted: processes that still
+    map its files keep their pages (the files are unlinked, never truncated), and a
+    reader never sees a mix of old and new files.
+    """
+    old_path = None
+    if os.path.isdir(path):
+        old_path = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}.old.", dir=os.path.dirname(tmp_path))
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    if old_path is not None:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def publish_or_attach(name, key, build, shared_dir=SHARED_DIR):
+    """
+    Attaches the store of a fingerprint, or builds and publishes it first.
+
+    Parameters:
+        name (str): Name of the store.
+        key (str): Fingerprint of the content.
+        build (callable): Returns the arrays (dict) if the store does not exist yet.
+        shared_dir (str): Directory of the stores.
+
+    Returns:
+        dict: Array name -> read-only np.memmap.
+    """
+    arrays = attach(name, key, shared_dir)
+    if arrays is None:
+        arrays = publish(name, key, build(), shared_dir)
+    return arrays
+
+
+def prune(name, keep, shared_dir=SHARED_DIR):
+    """Removes the stores of a name except the one with fingerprint `keep`."""
+    for entry in os.listdir(shared_dir):
+        if entry.startswith(f"{name}_") and entry != f"{name}_{keep}":
+            shutil.rmtree(os.path.join(shared_dir, entry), ignore_errors=True)
+
+
+def numeric_columns(df):
+    """Columns with a numeric dtype (numpy or nullable), booleans excluded."""
+    return [
+        column for column, dtype in df.dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+    ]
+
+
+def _column_arrays(series):
+    """The column as plain arrays: values, plus the mask of a nullable column."""
+    if pd.api.types.is_extension_array_dtype(series.dtype):
+        # nullable Int/Float: values (missing ones as 0) and the missing-value mask
+        array = series.array
+        mask = np.asarray(array.isna())
+        values = array.to_numpy(dtype=array.dtype.numpy_dtype, na_value=0)
+        return {series.name: values, f"{series.name}{MASK_SUFFIX}": mask}
+    return {series.name: series.to_numpy()}
+
+
+def _column_from_arrays(arrays, column):
+    values = arrays[column]
+    mask = arrays.get(f"{column}{MASK_SUFFIX}")
+    if mask is None:
+        return values
+    array_type = pd.arrays.FloatingArray if values.dtype.kind == "f" else pd.arrays.IntegerArray
+    return array_type(values, mask, copy=False)
+
+
+def share_numeric_columns(df, name="books", shared_dir=SHARED_DIR):
+    """
+    Replaces the numeric columns of a dataset by views of a shared store.
+
+    Text and categorical columns stay private to the process (Python objects cannot
+    be mapped); the numeric columns are published once per node and every worker
+    maps the same pages.
+
+    Parameters:
+        df (pd.DataFrame): The dataset as read from the CSV.
+        name (str): Name of the store.
+        shared_dir (str): Directory of the stores.
+
+    Returns:
+        pd.DataFrame: The same columns and index, the numeric ones read-only and shared.
+    """
+    columns = numeric_columns(df)
+    if not columns or df.empty:
+        return df
+    key = fingerprint(pd.Series(columns), *(df[column] for column in columns))
+
+    def build():
+        arrays = {}
+        for column in columns:
+            arrays.update(_column_arrays(df[column]))
+        return arrays
+
+    arrays = publish_or_attach(name, key, build, shared_dir)
+    data = {
+        column: _column_from_arrays(arrays, column) if column in columns else df[column]
+        for column in df.columns
+    }
+    # copy=False keeps every column as its own block, so the mapped arrays are not
+    # consolidated into a private copy
+    return pd.DataFrame(data, index=df.index, copy=False)
+
@@ -0,0 +1,101 @@
+# similar_books.py
+
+import torch
+from sentence_transformers import util
+from embedding_projection import candidate_count
+from embedding_store import cosine_scores
+from metrics import stage
+
+# Similarity-based recommendation of the embedding backend. The functions get the
+# data, embeddings and indexes as arguments and load nothing at import, so the
+# benchmarks (benchmarks/suite.py) can measure them without the Streamlit page,
+# which loads the model and the stored files when it is imported.
+
+# Function for similarity-based recommendation
+def find_similar_books(title, df, model, embeddings, top_n=5, projection=None, neighbour_table=None, catalog=None, norms=None):
+    """
+    Finds books similar to a selected title based on the description using 
+    cosine similarity between the target embedding und all other embeddings.
+
+    Parameters:
+        title (str): The title of the book to compare.
+        df (pd.DataFrame): The complete book dataset.
+        model (SentenceTransformer): The model to generate text embeddings.
+        embeddings (tensor): Computed embeddings of all book descriptions ("decription" column od a df).
+        top_n (int): Number of similar books to return (default=5).
+        projection (EmbeddingProjection): Optional reduced-dimension projection of the embeddings.
+            If given, candidates are retrieved in the reduced space first and only those
+            are re-ranked with the full embeddings.
+        neighbour_table (NeighbourTable): Optional precomputed neighbours. Books covered by
+            the table are answered with a single lookup, newer books use the live search.
+        catalog (CatalogIndex): Optional index to find the row of the title without a column scan.
+        norms: Optional row norms of the embeddings. If given, the similarities are computed
+            on the (mapped) matrix as it is, without normalizing a copy of it.
+
+    Returns:
+        list: A list of tuples of similar books (index, similarity_score, title), ranked by cosine similarity.
+    """
+    # Find the row of the selected book 
+    if catalog is not None:
+        target_pos = catalog.first("title", title)
+    else:
+        target_row = df[df['title'] == title]
+        target_pos = df.index.get_loc(target_row.index[0]) if not target_row.empty else None
+
+    # Return an empty list if the book is unknown
+    if target_pos is None:
+        return []
+
+    # The embedding of the target description is already part of the computed embeddings,
+    # so it does not need to be encoded again
+
+    stored = neighbour_table.lookup(target_pos, top_n + 1) if neighbour_table is not None else None
+    if stored is not None:
+        # Precomputed neighbours: a single array lookup
+        top_ids = stored[0][:top_n + 1].tolist()
+        top_scores = stored[1][:top_n + 1].tolist()
+    else:
+        target_embedding = embeddings[target_pos]
+
+        with stage("similarity_search"):
+            if projection is not None:
+                # First stage: candidates from the reduced space, re-ranked with the full embeddings
+                candidate_ids = torch.as_tensor(projection.search(target_embedding, candidate_count(top_n)))
+            else:
+                # Calculate cosine similarity between the target and all other books in the dataset
+                candidate_ids = None
+            cos_sim = cosine_similarity(target_embedding, embeddings, norms, candidate_ids)
+            top_results = torch.topk(cos_sim, k=min(top_n + 1, len(cos_sim)))
+
+        top_ids = top_results.indices if candidate_ids is None else candidate_ids[top_results.indices]
+        top_ids = top_ids.tolist()
+        top_scores = top_results.values.tolist()
+
+    results = []
+    for idx, score in zip(top_ids, top_scores):
+        if df.iloc[idx]['title'] != title: 
+            results.append((idx, score, df.iloc[idx]['title']))
+        if len(results) == top_n:
+            break
+
+    return results
+
+def cosine_similarity(query_embedding, embeddings, norms=None, rows=None):
+    """
+    Cosine similarity of a query embedding to all (or the given) rows of the embeddings.
+
+    Parameters:
+        query_embedding (tensor): The embedding to compare.
+        embeddings (tensor): The embeddings of all books.
+        norms: Optional row norms; then the matrix is used as it is (no normalized copy).
+        rows (tensor): Optional row positions; the similarities are then in this order.
+
+    Returns:
+        tensor: One similarity per (selected) row.
+    """
+    if norms is None:
+        selected = embeddings if rows is None else embeddings[rows]
+        return util.cos_sim(query_embedding, selected)[0]
+    return torch.from_numpy(cosine_scores(
+        query_embedding.numpy(), embeddings.numpy(), norms, None if rows is None else rows.numpy()
+    ))
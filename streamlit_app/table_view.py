@@ -0,0 +1,149 @@
+# table_view.py
+
+import numpy as np
+import pandas as pd
+
+# Paginated table for the Buchdaten pages. Instead of sending the whole filtered
+# frame to the browser (st.dataframe(df_filtered) serialises every row on every
+# rerun), the table is sorted and sliced on the server and only the visible page
+# is sent:
+#   - one sort order per column (argsort), computed on first use and kept with the table
+#   - the year filter is applied while walking that order, only until the page is full
+# So payload and serialisation time per rerun depend on the page size, not on the
+# number of books; the row count for the page navigation comes from the YearCube.
+# Charts that need the rows of a year range (scatter plots) take them from the year
+# sort order with two binary searches (year_rows) instead of masking the frame.
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# First scan window in the sort order (grows by doubling until the page is full)
+FIRST_CHUNK = 1024
+
+
+class PagedTable:
+    """
+    Server-side sort and slice of one dataset, filtered by a year range.
+    """
+
+    def __init__(self, df, year_column):
+        """
+        Parameters:
+            df (pd.DataFrame): The dataset (not copied).
+            year_column (str): Column with the (publication) year.
+        """
+        self.df = df
+        self.year_column = year_column
+        self.years = pd.to_numeric(df[year_column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        self.orders = {}
+        self.sorted_years = None
+
+    def order(self, column=None, ascending=True):
+        """
+        Row positions sorted by a column (stable, missing values last).
+        Without a column the original row order is used.
+        """
+        if column is None:
+            return np.arange(len(self.df))
+        key = (column, ascending)
+        if key not in self.orders:
+            codes, uniques = pd.factorize(self.df[column], sort=True)
+            codes = codes.astype(np.int64)
+            sort_key = codes if ascending else -codes
+            sort_key[codes < 0] = len(uniques)
+            self.orders[key] = np.argsort(sort_key, kind="stable")
+        return self.orders[key]
+
+    def page_rows(self, year_range, sort_by=None, ascending=True, page=0, page_size=50):
+        """
+        Row positions of one page.
+
+        Parameters:
+            year_range (tuple): (first, last) year, inclusive.
+            sort_by (str): Sort column (optional).
+            ascending (bool): Sort direction.
+            page (int): Page number, starting at 0.
+            page_size (int): Rows per page.
+
+        Returns:
+            np.ndarray: Up to page_size row positions.
+        """
+        order = self.order(sort_by, ascending)
+        skip = page * page_size
+        needed = skip + page_size
+        first, last = year_range
+        found = []
+        n_found = 0
+        start = 0
+        chunk = max(FIRST_CHUNK, 2 * needed)
+        while start < len(order) and n_found < needed:
+            rows = order[start:start + chunk]
+            years = self.years[rows]
+            rows = rows[(years >= first) & (years <= last)]
+            found.append(rows)
+            n_found += len(rows)
+            start += chunk
+            chunk *= 2
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)[skip:needed]
+
+    def year_rows(self, year_range):
+        """
+        Row positions of all rows in a year range, in dataset order.
+
+        Parameters:
+            year_range (tuple): (first, last) year, inclusive.
+
+        Returns:
+            np.ndarray: Row positions; found by binary search in the year sort order,
+            so the cost depends on the number of rows in the range.
+        """
+        order = self.order(self.year_column)
+        if self.sorted_years is None:
+            # ascending, rows without a year last (NaN sorts behind every year)
+            self.sorted_years = self.years[order]
+        first, last = year_range
+        start = np.searchsorted(self.sorted_years, first, side="left")
+        stop = np.searchsorted(self.sorted_years, last, side="right")
+        return np.sort(order[start:stop])
+
+    def page(self, year_range, sort_by=None, ascending=True, page=0, page_size=50):
+        """The rows of one page as DataFrame (see page_rows)."""
+        return self.df.iloc[self.page_rows(year_range, sort_by, ascending, page, page_size)]
+
+
+def show_paged_table(table, year_range, total, key):
+    """
+    Shows one page of the table with sort and page controls.
+
+    Parameters:
+        table (PagedTable): The table.
+        year_range (tuple): (first, last) year, inclusive.
+        total (int): Number of rows in the year range (from the aggregates).
+        key (str): Prefix of the widget keys.
+    """
+    import streamlit as st
+
+    columns = list(table.df.columns)
+    ctrl1, ctrl2, ctrl3, ctrl4 = st.columns([3, 2, 2, 2])
+    sort_by = ctrl1.selectbox("Sortieren nach", ["(keine)"] + columns, key=f"{key}_sort")
+    descending = ctrl2.toggle("Absteigend", key=f"{key}_desc")
+    page_size = ctrl3.selectbox("Zeilen pro Seite", PAGE_SIZES, index=1, key=f"{key}_size")
+
+    n_pages = max(1, -(-total // page_size))
+    # Nach einem kleineren Jahrbereich kann die gemerkte Seite zu groß sein
+    if st.session_state.get(f"{key}_page", 1) > n_pages:
+        st.session_state[f"{key}_page"] = n_pages
+    page = ctrl4.number_input(f"Seite (von {n_pages})", min_value=1, max_value=n_pages, step=1,
+                              key=f"{key}_page")
+
+    rows = table.page(
+        year_range,
+        sort_by=None if sort_by == "(keine)" else sort_by,
+        ascending=not descending,
+        page=int(page) - 1,
+        page_size=page_size,
+    )
+    st.dataframe(rows)
+    first_row = (int(page) - 1) * page_size
+    st.caption(f"Zeilen {min(first_row + 1, total)}–{first_row + len(rows)} von {total}")
@@ -0,0 +1,158 @@
+# tfidf_backend.py
+
+import os
+import numpy as np
+import joblib
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from custom_stopwords_sklearn import combined_stopwords
+from embedding_store import content_fingerprint
+
+# Torch-free recommendation backend: TF-IDF vectors of the cleaned descriptions
+# ("clean_description" column) and cosine similarity on the sparse matrix.
+# find_similar_books has the same interface as the embedding version in
+# similar_books.py, so lightweight deployments can switch with
+# BOOK_MARKET_BACKEND=tfidf and never import torch or sentence-transformers.
+# Vectorizer and matrix are stored under a fingerprint of the indexed texts, so an
+# edited catalogue never reuses a matrix built from other descriptions:
+#
+#   data/tfidf_vectorizer_<fingerprint>.joblib
+#   data/tfidf_matrix_<fingerprint>.npz
+
+DATA_DIR = "data"
+
+
+def tfidf_paths(fingerprint, data_dir=DATA_DIR):
+    """File paths of the stored vectorizer and matrix for a fingerprint."""
+    return (
+        os.path.join(data_dir, f"tfidf_vectorizer_{fingerprint}.joblib"),
+        os.path.join(data_dir, f"tfidf_matrix_{fingerprint}.npz"),
+    )
+
+
+def build_tfidf(df, text_column="clean_description"):
+    """
+    Fits a TF-IDF vectorizer on the cleaned book descriptions.
+
+    Parameters:
+        df (pd.DataFrame): The complete book dataset.
+        text_column (str): Column with the (stopword-free) descriptions.
+
+    Returns:
+        tuple: The fitted TfidfVectorizer and the L2-normalized sparse CSR matrix
+        (one row per book).
+    """
+    vectorizer = TfidfVectorizer(
+        stop_words=combined_stopwords,
+        min_df=2,
+        max_df=0.5,
+        sublinear_tf=True,
+        dtype=np.float32,
+    )
+    matrix = vectorizer.fit_transform(df[text_column].fillna(""))
+    return vectorizer, matrix.tocsr()
+
+
+class TfidfIndex:
+    """
+    The TF-IDF matrix in two layouts: rows per book (CSR) for looking up a book's
+    vector and the transposed matrix (term -> books) for scoring. Scoring a query
+    then only touches the books that share at least one term with it.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix.tocsr()
+        self.postings = self.matrix.T.tocsr()
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def top_k(self, query, k):
+        """
+        Cosine similarity of one sparse query row against all books and the k best matches.
+
+        Parameters:
+            query (sp.csr_matrix): L2-normalized query row (1 x vocabulary).
+            k (int): Number of results.
+
+        Returns:
+            tuple: Row positions and scores, best first. Books without any shared term
+            are never returned.
+        """
+        scores = (query @ self.postings).tocoo()
+        ids, values = scores.col, scores.data
+        if len(values) > k:
+            top = np.argpartition(-values, k - 1)[:k]
+            ids, values = ids[top], values[top]
+        order = np.argsort(-values)
+        return ids[order], values[order]
+
+
+def save_tfidf(vectorizer, matrix, vectorizer_path, matrix_path):
+    joblib.dump(vectorizer, vectorizer_path)
+    sp.save_npz(matrix_path, matrix)
+
+
+def load_or_build_tfidf(df, text_column="clean_description"):
+    """
+    Loads the stored vectorizer and sparse matrix if they were built from the same
+    texts (content fingerprint of the column), otherwise builds and stores them.
+
+    Parameters:
+        df (pd.DataFrame): The complete book dataset.
+        text_column (str): Column with the (stopword-free) descriptions.
+
+    Returns:
+        tuple: The TfidfVectorizer and the TfidfIndex over the sparse matrix.
+    """
+    fingerprint = content_fingerprint(df[text_column], model_name=f"tfidf:{text_column}")
+    vectorizer_path, matrix_path = tfidf_paths(fingerprint)
+    if os.path.exists(vectorizer_path) and os.path.exists(matrix_path):
+        return joblib.load(vectorizer_path), TfidfIndex(sp.load_npz(matrix_path))
+
+    vectorizer, matrix = build_tfidf(df, text_column)
+    try:
+        save_tfidf(vectorizer, matrix, vectorizer_path, matrix_path)
+    except OSError:
+        # read-only deployments still work, the matrix is just rebuilt next time
+        pass
+    return vectorizer, TfidfIndex(matrix)
+
+
+def find_similar_books(title, df, model, embeddings, top_n=5, projection=None, neighbour_table=None, catalog=None, norms=None):
+    """
+    Finds books similar to a selected title based on the TF-IDF vectors of the
+    cleaned descriptions (same interface as similar_books.find_similar_books).
+
+    Parameters:
+        title (str): The title of the book to compare.
+        df (pd.DataFrame): The complete book dataset.
+        model (TfidfVectorizer): The fitted vectorizer (only needed for new texts).
+        embeddings (TfidfIndex): The TF-IDF index of all books.
+        top_n (int): Number of similar books to return (default=5).
+        projection: Not used by the sparse backend, accepted for compatibility.
+        neighbour_table: Not used by the sparse backend, accepted for compatibility.
+        catalog (CatalogIndex): Optional index to find the row of the title without a column scan.
+        norms: Not used by the sparse backend, accepted for compatibility.
+
+    Returns:
+        list: A list of tuples of similar books (index, similarity_score, title), ranked by cosine similarity.
+    """
+    if catalog is not None:
+        target_pos = catalog.first("title", title)
+    else:
+        target_row = df[df['title'] == title]
+        target_pos = df.index.get_loc(target_row.index[0]) if not target_row.empty else None
+
+    if target_pos is None:
+        return []
+    ids, scores = embeddings.top_k(embeddings.matrix[target_pos], top_n + 1)
+
+    results = []
+    for idx, score in zip(ids.tolist(), scores.tolist()):
+        if df.iloc[idx]['title'] != title:
+            results.append((idx, score, df.iloc[idx]['title']))
+        if len(results) == top_n:
+            break
+
+    return results
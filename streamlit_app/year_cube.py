@@ -0,0 +1,256 @@
+# year_cube.py
+
+import os
+import numpy as np
+import pandas as pd
+
+# Per-year pre-aggregates for the Buchdaten dashboard pages. The pages only change
+# the year range between interactions, so everything they show is aggregated once
+# per dataset version and year:
+#   - number of books
+#   - counts per category (genre, author, adaptation flag, ...)
+#   - counts per value bucket (rating histogram)
+#   - count, sum and sum of squares of numeric columns (mean, std) plus min/max
+#   - sums per category of a numeric column (e.g. mean rating per author rating)
+# All of them are stored as prefix sums over the years, so any year range is
+# answered by the difference of two rows; the cost depends on the number of years
+# and categories, not on the number of books.
+
+# Dense (years x categories) prefix sums up to this many cells; columns with more
+# categories (e.g. authors of a large catalogue) are counted from year-sorted codes.
+MAX_DENSE_CELLS = 5_000_000
+
+
+def dataset_version(path):
+    """Version key of a data file (modification time and size), for cache keys."""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def _prefix(per_year):
+    """Prefix sums along the year axis with a leading zero row."""
+    per_year = np.asarray(per_year)
+    prefix = np.zeros((len(per_year) + 1,) + per_year.shape[1:], dtype=np.result_type(per_year, np.int64))
+    np.cumsum(per_year, axis=0, out=prefix[1:])
+    return prefix
+
+
+class YearCube:
+    """
+    Prefix-summed per-year aggregates of one dataset.
+    """
+
+    def __init__(
+        self,
+        df,
+        year_column,
+        categorical=(),
+        numeric=(),
+        buckets=None,
+        grouped=(),
+    ):
+        """
+        Parameters:
+            df (pd.DataFrame): The dataset.
+            year_column (str): Column with the (publication) year.
+            categorical (list): Columns counted per category.
+            numeric (list): Columns with count/sum/moments and min/max.
+            buckets (dict): Column -> bucket edges for histograms (optional).
+            grouped (list): (category column, numeric column) pairs for sums per category.
+        """
+        years = pd.to_numeric(df[year_column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(years)
+        self.first_year = int(years[valid].min()) if valid.any() else 0
+        self.last_year = int(years[valid].max()) if valid.any() else -1
+        n_years = self.last_year - self.first_year + 1
+        year_ids = (years[valid] - self.first_year).astype(np.int64)
+        self.years = np.arange(self.first_year, self.last_year + 1)
+
+        self.counts = _prefix(np.bincount(year_ids, minlength=n_years))
+
+        # categories: dense prefix (years x categories) or year-sorted codes
+        self.categories = {}
+        self.category_prefix = {}
+        self.category_codes = {}
+        by_year = np.argsort(year_ids, kind="stable")
+        self.year_starts = np.searchsorted(year_ids[by_year], np.arange(n_years + 1))
+        codes_by_column = {}
+        for column in set(categorical) | {group for group, _ in grouped}:
+            codes, uniques = pd.factorize(df[column].to_numpy()[valid], sort=True)
+            codes_by_column[column] = codes
+            self.categories[column] = pd.Index(uniques, name=column)
+            if n_years * len(uniques) <= MAX_DENSE_CELLS:
+                cells = np.bincount(
+                    year_ids[codes >= 0] * len(uniques) + codes[codes >= 0],
+                    minlength=n_years * len(uniques),
+                )
+                self.category_prefix[column] = _prefix(cells.reshape(n_years, len(uniques)))
+            else:
+                self.category_codes[column] = codes[by_year]
+
+        # numeric columns: count, sum and sum of squares (around the overall mean) and min/max
+        self.numeric = {}
+        for column in numeric:
+            values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+            present = ~np.isnan(values)
+            shift = values[present].mean() if present.any() else 0.0
+            centered = np.where(present, values - shift, 0.0)
+            minimum = np.full(n_years, np.inf)
+            maximum = np.full(n_years, -np.inf)
+            np.minimum.at(minimum, year_ids[present], values[present])
+            np.maximum.at(maximum, year_ids[present], values[present])
+            self.numeric[column] = {
+                "shift": shift,
+                "count": _prefix(np.bincount(year_ids, weights=present, minlength=n_years)),
+                "sum": _prefix(np.bincount(year_ids, weights=centered, minlength=n_years)),
+                "sumsq": _prefix(np.bincount(year_ids, weights=centered ** 2, minlength=n_years)),
+                "min": minimum,
+                "max": maximum,
+            }
+
+        # histograms: counts per (year, bucket)
+        self.buckets = {}
+        for column, edges in (buckets or {}).items():
+            edges = np.asarray(edges, dtype=np.float64)
+            values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+            present = ~np.isnan(values)
+            bucket_ids = np.clip(np.searchsorted(edges, values[present], side="right") - 1, 0, len(edges) - 2)
+            cells = np.bincount(
+                year_ids[present] * (len(edges) - 1) + bucket_ids, minlength=n_years * (len(edges) - 1)
+            )
+            self.buckets[column] = (edges, _prefix(cells.reshape(n_years, len(edges) - 1)))
+
+        # sums of a numeric column per category
+        self.grouped = {}
+        for group, column in grouped:
+            codes = codes_by_column[group]
+            values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+            use = (codes >= 0) & ~np.isnan(values)
+            n_cat = len(self.categories[group])
+            cell_ids = year_ids[use] * n_cat + codes[use]
+            sums = np.bincount(cell_ids, weights=values[use], minlength=n_years * n_cat)
+            counts = np.bincount(cell_ids, minlength=n_years * n_cat)
+            self.grouped[(group, column)] = (
+                _prefix(sums.reshape(n_years, n_cat)),
+                _prefix(counts.reshape(n_years, n_cat)),
+            )
+
+    def _bounds(self, year_range):
+        """Prefix rows (start, stop) of an inclusive year range, clipped to the data."""
+        first, last = year_range if year_range is not None else (self.first_year, self.last_year)
+        start = int(np.clip(first - self.first_year, 0, len(self.years)))
+        stop = int(np.clip(last - self.first_year + 1, start, len(self.years)))
+        return start, stop
+
+    def count(self, year_range=None):
+        """Number of books in the year range."""
+        start, stop = self._bounds(year_range)
+        return int(self.counts[stop] - self.counts[start])
+
+    def per_year(self, year_range=None, column=None, category=None, statistic="count"):
+        """
+        Value per year within the range.
+
+        Parameters:
+            year_range (tuple): (first, last) year, inclusive (default: all years).
+            column (str): Categorical or numeric column (optional).
+            category: With a categorical column, count only this category.
+            statistic (str): With a numeric column, "count", "sum" or "mean".
+
+        Returns:
+            pd.Series: Years as index (only years with at least one book).
+        """
+        start, stop = self._bounds(year_range)
+        books = np.diff(self.counts[start:stop + 1])
+        if column is None:
+            values = books
+        elif category is not None:
+            values = self.category_counts(column, year_range, per_year=True)[category].to_numpy()
+        else:
+            stats = self.numeric[column]
+            counts = np.diff(stats["count"][start:stop + 1])
+            sums = np.diff(stats["sum"][start:stop + 1]) + counts * stats["shift"]
+            values = {"count": counts, "sum": sums}.get(statistic)
+            if values is None:
+                values = np.divide(sums, counts, out=np.full(len(counts), np.nan), where=counts > 0)
+        return pd.Series(values, index=self.years[start:stop])[books > 0]
+
+    def category_counts(self, column, year_range=None, per_year=False):
+        """
+        Number of books per category in the year range (like value_counts).
+
+        Parameters:
+            column (str): A categorical column of the cube.
+            year_range (tuple): (first, last) year, inclusive (default: all years).
+            per_year (bool): Return a years x categories table instead.
+
+        Returns:
+            pd.Series: Counts per category, largest first, without zero counts
+            (or a pd.DataFrame with per_year=True).
+        """
+        start, stop = self._bounds(year_range)
+        categories = self.categories[column]
+        if column in self.category_prefix:
+            prefix = self.category_prefix[column]
+            if per_year:
+                return pd.DataFrame(np.diff(prefix[start:stop + 1], axis=0),
+                                    index=self.years[start:stop], columns=categories)
+            counts = prefix[stop] - prefix[start]
+        else:
+            codes = self.category_codes[column]
+            if per_year:
+                table = np.zeros((stop - start, len(categories)), dtype=np.int64)
+                for i in range(start, stop):
+                    table[i - start] = np.bincount(
+                        codes[self.year_starts[i]:self.year_starts[i + 1]].clip(0), minlength=len(categories))
+                return pd.DataFrame(table, index=self.years[start:stop], columns=categories)
+            chunk = codes[self.year_starts[start]:self.year_starts[stop]]
+            counts = np.bincount(chunk[chunk >= 0], minlength=len(categories))
+        counts = pd.Series(counts, index=categories, name="count")
+        return counts[counts > 0].sort_values(ascending=False, kind="stable")
+
+    def histogram(self, column, year_range=None):
+        """
+        Counts per bucket in the year range.
+
+        Returns:
+            tuple: (counts per bucket, bucket edges).
+        """
+        start, stop = self._bounds(year_range)
+        edges, prefix = self.buckets[column]
+        return prefix[stop] - prefix[start], edges
+
+    def group_mean(self, group, column, year_range=None):
+        """Mean of a numeric column per category in the year range (like groupby().mean())."""
+        start, stop = self._bounds(year_range)
+        sums, counts = self.grouped[(group, column)]
+        total = sums[stop] - sums[start]
+        n = counts[stop] - counts[start]
+        means = pd.Series(total, index=self.categories[group])[n > 0] / n[n > 0]
+        return means.sort_index()
+
+    def describe(self, year_range=None):
+        """
+        Basic statistics of the numeric columns in the year range.
+
+        Returns:
+            pd.DataFrame: count, mean, std, min and max per numeric column.
+        """
+        start, stop = self._bounds(year_range)
+        table = {}
+        for column, stats in self.numeric.items():
+            n = stats["count"][stop] - stats["count"][start]
+            centered_sum = stats["sum"][stop] - stats["sum"][start]
+            centered_sumsq = stats["sumsq"][stop] - stats["sumsq"][start]
+            mean = centered_sum / n + stats["shift"] if n else np.nan
+            var = (centered_sumsq - centered_sum ** 2 / n) / (n - 1) if n > 1 else np.nan
+            minimum = stats["min"][start:stop].min() if stop > start else np.inf
+            maximum = stats["max"][start:stop].max() if stop > start else -np.inf
+            table[column] = {
+                "count": n,
+                "mean": mean,
+                "std": np.sqrt(max(var, 0.0)) if n > 1 else np.nan,
+                "min": minimum if np.isfinite(minimum) else np.nan,
+                "max": maximum if np.isfinite(maximum) else np.nan,
+            }
+        return pd.DataFrame(table)